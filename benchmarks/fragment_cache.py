@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark rendering a dashboard with and without the fragment cache.
+
+Uses `example_app/examples/config/stresstest.json`, with its modules
+repeated to simulate a large dashboard. No database is required.
+
+Usage: python -m benchmarks.fragment_cache --copies 11 --requests 200
+"""
+
+import copy
+import json
+import os
+import timeit
+from uuid import uuid1
+
+import click
+from flask import Flask
+
+from flask_jsondash import charts_builder, utils
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG = os.path.join(ROOT, 'example_app/examples/config/stresstest.json')
+
+
+def make_dashboard(copies):
+    """Load the stress test dashboard, with all modules repeated."""
+    with open(CONFIG, 'r') as config:
+        view = json.load(config)
+    modules = []
+    for _ in range(copies):
+        for module in view['modules']:
+            module = copy.deepcopy(module)
+            module.update(guid=str(uuid1()))
+            modules.append(module)
+    view.update(modules=modules, date='2017-01-01 00:00:00')
+    return view
+
+
+def make_app(fragment_cache):
+    """Make an app with the blueprint, optionally caching fragments."""
+    app = Flask(
+        'jsondash_benchmark',
+        template_folder=os.path.join(ROOT, 'example_app/templates'))
+    conf = dict(metadata=dict(username=lambda: 'benchmark'))
+    if fragment_cache:
+        conf.update(fragment_cache=dict(maxsize=10, ttl=None))
+    app.config.update(
+        SECRET_KEY='benchmark',
+        JSONDASH_ENSURE_INDEXES=False,
+        JSONDASH=conf,
+    )
+    app.register_blueprint(charts_builder.charts)
+    return app
+
+
+def time_requests(app, url, num):
+    """Get the average time (in ms) per request for a url."""
+    client = app.test_client()
+    # Warm up (template compilation, and the cache if enabled).
+    assert client.get(url).status_code == 200
+    total = timeit.timeit(lambda: client.get(url), number=num)
+    return total / num * 1000
+
+
+@click.command()
+@click.option('--copies', default=11,
+              help='The number of times to repeat all modules.')
+@click.option('--requests', default=200,
+              help='The number of requests to time.')
+def main(copies, requests):
+    """Run the benchmark."""
+    view = make_dashboard(copies)
+    # Serve the dashboard from memory instead of the db.
+    utils.adapter.read = lambda **kwargs: copy.deepcopy(view)
+    utils.adapter.read_version = lambda c_id: dict(
+        id=c_id, date=view['date'], created_by=None)
+    utils.adapter.distinct = lambda key: []
+    url = '/charts/{}'.format(view['id'])
+    click.echo('Dashboard with {} modules, {} requests each.'.format(
+        len(view['modules']), requests))
+    uncached = time_requests(make_app(False), url, requests)
+    click.echo('No fragment cache: {:.2f}ms per request'.format(uncached))
+    cached = time_requests(make_app(True), url, requests)
+    click.echo('Fragment cache:    {:.2f}ms per request'.format(cached))
+    click.echo('Speedup: {:.1f}x'.format(uncached / cached))
+
+
+if __name__ == '__main__':
+    main()
@@ -9,7 +9,7 @@ import os
 from datetime import timedelta as td
 from datetime import datetime as dt
 from random import randrange as rr
-from random import choice, random
+from random import Random, choice, random
 import time
 
 from flask import (
@@ -22,6 +22,9 @@ from flask import (
 from flask_cors import CORS
 from flask_cors import cross_origin
 
+from flask_jsondash.data_utils import datatables
+from flask_jsondash.data_utils import timeseries as ts_utils
+
 app = Flask('endpoints_test')
 CORS(app)
 app.config['SECRET_KEY'] = 'NOTSECURELOL'
@@ -382,17 +385,26 @@ def timeline():
 
 @app.route('/dtable', methods=['GET'])
 def dtable():
-    """Fake endpoint."""
-    if 'stress' in request.args:
-        return jsonify([
-            dict(
+    """Fake endpoint.
+
+    Supports the DataTables server-side protocol, for modules
+    with `serverSide` enabled.
+    """
+    def stress_rows():
+        for _ in range(STRESS_MAX_POINTS):
+            yield dict(
                 foo=rr(1, 1000),
                 bar=rr(1, 1000),
                 baz=rr(1, 1000),
-                quux=rr(1, 1000)) for _ in range(STRESS_MAX_POINTS)
-        ])
+                quux=rr(1, 1000))
+    if 'stress' in request.args:
+        if datatables.is_request(request.args):
+            return jsonify(datatables.serve(stress_rows, request.args))
+        return jsonify(list(stress_rows()))
     fname = 'dtable-override' if 'override' in request.args else 'dtable'
     with open('{}/examples/{}.json'.format(os.getcwd(), fname), 'r') as djson:
+        if datatables.is_request(request.args) and fname == 'dtable':
+            return jsonify(datatables.serve(json.load(djson), request.args))
         return djson.read()
     return jsonify({})
 
@@ -409,6 +421,25 @@ def timeseries():
     })
 
 
+@cross_origin()
+@app.route('/timeseries-delta')
+def timeseries_delta():
+    """Fake endpoint with a new point every second (as ms timestamps).
+
+    Supports the `since` argument, for modules with `delta` enabled.
+    """
+    now = int(time.time())
+    seconds = range(now - 60, now + 1)
+    data = dict(
+        dates=[sec * 1000 for sec in seconds],
+        line1=[Random(sec).randint(0, 100) for sec in seconds],
+        line2=[Random(-sec).randint(0, 100) for sec in seconds],
+    )
+    if 'since' in request.args:
+        data = ts_utils.get_delta(data, request.args['since'])
+    return jsonify(data)
+
+
 @cross_origin()
 @app.route('/custom')
 def custompage():
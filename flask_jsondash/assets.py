@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+
+"""
+flask_jsondash.assets
+~~~~~~~~~~~~~~~~~~~~~
+
+Static asset (css/js) resolution and bundling for chart families.
+
+:copyright: (c) 2016 by Chris Tabor.
+:license: MIT, see LICENSE for more details.
+"""
+
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+# Optional minifiers; see the `bundles` extra in setup.py.
+try:
+    import rcssmin
+    import rjsmin
+except ImportError:
+    rcssmin = rjsmin = None
+
+# Matches all `url(...)` references in css.
+CSS_URL_RE = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def topological_order(chart_config):
+    """Order all chart families so that dependencies always come first.
+
+    Families are otherwise kept in the order of the config.
+
+    Args:
+        chart_config (dict): The chart config (see `settings.CHARTS_CONFIG`).
+
+    Raises:
+        ValueError: If a dependency is missing, or dependencies are circular.
+
+    Returns:
+        list: All family names.
+    """
+    order = []
+    visiting = set()
+
+    def visit(family, parents):
+        if family in order:
+            return
+        if family in visiting:
+            raise ValueError('Circular chart dependencies: {}'.format(
+                ' -> '.join(parents + [family])))
+        if family not in chart_config:
+            raise ValueError('Unknown chart dependency "{}" for "{}"'.format(
+                family, parents[-1]))
+        visiting.add(family)
+        for dep in chart_config[family].get('dependencies') or []:
+            visit(dep, parents + [family])
+        visiting.remove(family)
+        order.append(family)
+
+    for family in chart_config:
+        visit(family, [])
+    return order
+
+
+class AssetGraph(object):
+    """The dependency graph of all chart families, resolved ahead of time.
+
+    Resolved assets are memoized by the set of active families, so
+    looking up the assets for a dashboard is just a dict lookup.
+    """
+
+    def __init__(self, chart_config, required=None):
+        """Build the graph.
+
+        Args:
+            chart_config (dict): The chart config to order families from.
+            required (list, optional): Families that are always loaded.
+        """
+        self.required = frozenset(required or [])
+        self.order = topological_order(chart_config)
+        # The transitive dependencies for each family, including itself.
+        self.closures = dict()
+        for family in self.order:
+            closure = set([family])
+            for dep in chart_config[family].get('dependencies') or []:
+                closure |= self.closures[dep]
+            self.closures[family] = frozenset(closure)
+        self._memo = dict()
+
+    def resolve(self, families):
+        """Get all families needed for the given ones, dependencies first.
+
+        Args:
+            families (iterable): The family names. Unknown names are ignored.
+
+        Returns:
+            list: The ordered family names.
+        """
+        needed = set()
+        for family in self.required.union(families):
+            needed |= self.closures.get(family, frozenset())
+        return [family for family in self.order if family in needed]
+
+    def assets(self, families, chart_config):
+        """Get the css/js urls for a set of families, in load order.
+
+        Args:
+            families (iterable): The family names.
+            chart_config (dict): The config to get urls from, which must
+                not be modified after being used here.
+
+        Returns:
+            dict: The `css` and `js` url lists.
+        """
+        key = (id(chart_config), frozenset(families))
+        if key not in self._memo:
+            css, js = [], []
+            for family in self.resolve(key[1]):
+                data = chart_config[family]
+                css += [url for url in data['css_url'] or [] if url not in css]
+                js += [url for url in data['js_url'] or [] if url not in js]
+            self._memo[key] = dict(css=tuple(css), js=tuple(js))
+        assets = self._memo[key]
+        return dict(css=list(assets['css']), js=list(assets['js']))
+
+
+def is_remote(url):
+    """Check if a url is served from somewhere else (e.g. a cdn)."""
+    return url.startswith(('//', 'http://', 'https://', 'data:'))
+
+
+def rebase_css_urls(css, css_url):
+    """Make all relative `url(...)` references in css absolute.
+
+    This keeps css working when it is served from a different path,
+    e.g. when it has been bundled.
+
+    Args:
+        css (str): The css content.
+        css_url (str): The url the css was originally served from.
+
+    Returns:
+        str: The updated css.
+    """
+    base = posixpath.dirname(css_url.split('?')[0])
+
+    def rebase(match):
+        quote, url = match.groups()
+        if is_remote(url) or url.startswith(('/', '#')):
+            return match.group(0)
+        url = posixpath.normpath(posixpath.join(base, url))
+        return 'url({0}{1}{0})'.format(quote, url)
+    return CSS_URL_RE.sub(rebase, css)
+
+
+class Bundler(object):
+    """Concatenates local css/js files into content-hashed bundles.
+
+    Bundles are written to disk once, named by the hash of their content,
+    so they can be cached by browsers forever.
+    """
+
+    def __init__(self, path, minify=False):
+        """Setup the bundler.
+
+        Args:
+            path (str): The folder to write bundles to.
+            minify (bool, optional): Minify bundles. This requires the
+                `rjsmin` and `rcssmin` packages.
+
+        Raises:
+            ImportError: If minifying, but the minifiers aren't installed.
+        """
+        if minify and rjsmin is None:
+            raise ImportError(
+                'Minifying bundles requires `rjsmin` and `rcssmin`. '
+                'Install with `pip install flask_jsondash[bundles]`.')
+        self.path = path
+        self.minify = minify
+        self._memo = dict()
+
+    def bundle(self, urls, kind, get_path, get_url):
+        """Replace all consecutive local urls with bundles.
+
+        Remote urls are kept in place, so the load order never changes.
+
+        Args:
+            urls (list): The asset urls, in load order.
+            kind (str): The asset type, either `css` or `js`.
+            get_path (function): A function that returns the local file
+                path for a url, or None if it can't be bundled.
+            get_url (function): A function that returns the url for
+                a bundle filename.
+
+        Returns:
+            list: The new urls.
+        """
+        key = (kind, tuple(urls))
+        if key not in self._memo:
+            bundled, files = [], []
+            for url in urls:
+                path = None if is_remote(url) else get_path(url)
+                if path is not None:
+                    files.append((url, path))
+                    continue
+                if files:
+                    bundled.append(get_url(self.build(files, kind)))
+                    files = []
+                bundled.append(url)
+            if files:
+                bundled.append(get_url(self.build(files, kind)))
+            self._memo[key] = tuple(bundled)
+        return list(self._memo[key])
+
+    def build(self, files, kind):
+        """Build a single bundle, if it doesn't exist already.
+
+        Args:
+            files (list): A list of (url, path) 2-tuples to bundle.
+            kind (str): The asset type, either `css` or `js`.
+
+        Returns:
+            str: The bundle filename.
+        """
+        parts = []
+        for url, path in files:
+            with open(path, 'rb') as asset:
+                content = asset.read().decode('utf-8')
+            if kind == 'css':
+                content = rebase_css_urls(content, url)
+            if self.minify:
+                minifier = rcssmin.cssmin if kind == 'css' else rjsmin.jsmin
+                content = minifier(content)
+            parts.append(content)
+        # Guard against js files that don't end with a semicolon.
+        data = (';\n' if kind == 'js' else '\n').join(parts).encode('utf-8')
+        filename = '{}.{}'.format(hashlib.sha256(data).hexdigest()[:20], kind)
+        fullpath = os.path.join(self.path, filename)
+        if not os.path.exists(fullpath):
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+            # Write atomically, since other processes may serve it.
+            fd, tmp = tempfile.mkstemp(dir=self.path)
+            with os.fdopen(fd, 'wb') as bundle:
+                bundle.write(data)
+            os.chmod(tmp, 0o644)
+            os.rename(tmp, fullpath)
+        return filename
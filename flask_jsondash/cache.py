@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""
+flask_jsondash.cache
+~~~~~~~~~~~~~~~~~~~~
+
+In-process caches used to avoid repeated database reads.
+
+:copyright: (c) 2016 by Chris Tabor.
+:license: MIT, see LICENSE for more details.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """A thread-safe, bounded LRU cache where entries also expire.
+
+    Each entry can optionally store a version (e.g. a record date),
+    so that stale entries can be detected when a newer version is known.
+    """
+
+    def __init__(self, maxsize=128, ttl=60, revalidate=False):
+        """Setup the cache.
+
+        Args:
+            maxsize (int, optional): The max number of entries to keep.
+            ttl (int, optional): The number of seconds entries are valid for.
+                If None, entries never expire.
+            revalidate (bool, optional): A flag for users of the cache
+                to check an entries version before trusting it.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.revalidate = revalidate
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Get the number of entries, including any expired ones."""
+        return len(self._entries)
+
+    def get(self, key, version=None):
+        """Get a value from the cache.
+
+        Args:
+            key (str): The key to look up.
+            version (None, optional): If specified, the entry is only
+                returned if it was stored with the same version.
+
+        Returns:
+            The cached value, or None if missing, expired or stale.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, entry_version, expires = entry
+                expired = expires is not None and expires <= time.time()
+                stale = version is not None and version != entry_version
+                if expired or stale:
+                    del self._entries[key]
+                    self.evictions += 1
+                else:
+                    # Re-insert to mark as most recently used.
+                    self._entries[key] = self._entries.pop(key)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def set(self, key, value, version=None, ttl=None):
+        """Add a value to the cache, evicting the oldest entries if full.
+
+        Args:
+            key (str): The key to store the value under.
+            value: The value.
+            version (None, optional): The version of this value.
+            ttl (None, optional): The seconds this entry is valid for,
+                if different from the default ttl.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires = None if ttl is None else time.time() + ttl
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, version, expires)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        """Remove a single entry, if it exists."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Get the cache counters.
+
+        Returns:
+            dict: The hits, misses, evictions and current size.
+        """
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            size=len(self._entries),
+            maxsize=self.maxsize,
+        )
@@ -15,17 +15,32 @@ import os
 import uuid
 from datetime import datetime as dt
 
+import click
 import jinja2
-from flask import (Blueprint, current_app, flash, redirect, render_template,
-                   request, send_from_directory, url_for)
+from flask import (Blueprint, Markup, abort, current_app, flash, jsonify,
+                   make_response, redirect, render_template, request,
+                   send_from_directory, session, url_for)
+import requests
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import is_resource_modified
+from werkzeug.security import safe_join
 
-from flask_jsondash import static, templates
+from flask_jsondash import __version__, static, templates
 
+from flask_jsondash import assets
+from flask_jsondash import cache
+from flask_jsondash import data_proxy
 from flask_jsondash import db
+from flask_jsondash import export
+from flask_jsondash import prewarm
+from flask_jsondash import scheduler
 from flask_jsondash import settings
+from flask_jsondash import snapshots
 from flask_jsondash.utils import setting
 from flask_jsondash.utils import adapter
 from flask_jsondash import utils
+from flask_jsondash.data_utils import columnar
+from flask_jsondash.data_utils import datatables
 from flask_jsondash.schema import (
     validate_raw_json, InvalidSchemaError,
 )
@@ -40,6 +55,32 @@ STATIC_DIR = os.path.dirname(static.__file__)
 # Note these are just LABELS, not files.
 REQUIRED_STATIC_FAMILES = ['D3']
 
+# Internal assets loaded on every page, relative to `STATIC_DIR`.
+# Chart family assets are loaded between the vendor and app assets.
+VENDOR_CSS = ['css/vendor/jquery-ui.min.css', 'css/vendor/font-awesome.css']
+APP_CSS = ['css/app.css', 'css/overrides.css']
+# Only needed when viewing a dashboard.
+VENDOR_JS = [
+    'js/vendor/packery.pkgd.min.js',
+    'js/vendor/jquery-ui.min.js',
+    'js/vendor/jRespond.min.js',
+]
+APP_JS = ['js/app.js', 'js/api.js', 'js/handlers.js', 'js/utils.js']
+
+# Bundles are served from this sub path of the `_static` route.
+BUNDLE_PREFIX = 'bundles/'
+BUNDLE_MAX_AGE = 60 * 60 * 24 * 365
+
+# Extensions that change what dashboard pages render.
+APP_FEATURES = [
+    'jsondash_data_proxy', 'jsondash_scheduler', 'jsondash_snapshots',
+    'jsondash_bundler',
+]
+
+# The order dashboards are paginated in on the index page. This matches
+# the category grouping of the page so each category stays contiguous.
+INDEX_SORT = [('category', 1), ('name', 1)]
+
 charts = Blueprint(
     'jsondash',
     __name__,
@@ -49,6 +90,189 @@ charts = Blueprint(
 )
 
 
+@charts.record_once
+def ensure_indexes(state):
+    """Create the db indexes when the blueprint is first registered.
+
+    This is enabled with `JSONDASH_ENSURE_INDEXES`. It's off by default,
+    since it blocks startup while the db is unreachable; indexes can be
+    created separately instead (see `model_factories --indexes`).
+    """
+    enabled = state.app.config.get(
+        'JSONDASH_ENSURE_INDEXES',
+        utils.default_config['JSONDASH_ENSURE_INDEXES'])
+    if not enabled:
+        return
+    try:
+        adapter.ensure_indexes()
+    except Exception as e:
+        state.app.logger.warning('Could not ensure db indexes: {}'.format(e))
+
+
+@charts.record_once
+def setup_cache(state):
+    """Add a read cache to the db adapter, if configured.
+
+    Configured with a `cache` dict in `JSONDASH`, where all keys
+    are passed to `cache.LRUCache` (e.g. maxsize, ttl, revalidate).
+    """
+    cache_conf = state.app.config.get('JSONDASH', {}).get('cache')
+    if cache_conf is None:
+        return
+    adapter.cache = cache.LRUCache(**cache_conf)
+
+
+@charts.record_once
+def setup_assets(state):
+    """Resolve all chart family asset dependencies once, up front."""
+    state.app.extensions['jsondash_assets'] = assets.AssetGraph(
+        settings.CHARTS_CONFIG, required=REQUIRED_STATIC_FAMILES)
+
+
+@charts.record_once
+def setup_bundles(state):
+    """Setup asset bundling, if configured.
+
+    Configured with a `bundles` dict in `JSONDASH`, with an optional
+    `path` to write bundles to, and a `minify` flag.
+    """
+    conf = state.app.config.get('JSONDASH', {}).get('bundles')
+    if conf is None:
+        return
+    path = conf.get('path') or os.path.join(
+        state.app.instance_path, 'jsondash_bundles')
+    state.app.extensions['jsondash_bundler'] = assets.Bundler(
+        path, minify=conf.get('minify', False))
+
+
+@charts.record_once
+def setup_fragment_cache(state):
+    """Cache rendered dashboard modules, if configured.
+
+    Configured with a `fragment_cache` dict in `JSONDASH`, where all keys
+    are passed to `cache.LRUCache` (e.g. maxsize, ttl).
+    """
+    conf = state.app.config.get('JSONDASH', {}).get('fragment_cache')
+    if conf is None:
+        return
+    state.app.extensions['jsondash_fragments'] = cache.LRUCache(**conf)
+
+
+@charts.record_once
+def setup_data_proxy(state):
+    """Fetch module data through this app, if configured.
+
+    Configured with a `data_proxy` dict in `JSONDASH`, where all keys
+    are passed to `data_proxy.DataProxy` (e.g. timeout, ttl, maxsize).
+    Dashboards must also opt in with `"proxy": true`.
+
+    The allowed hosts must be set, so editors can't reach internal hosts
+    unless allowed. The url root defaults to the one of `SERVER_NAME`,
+    rather than the host of each request, which clients can set.
+    """
+    conf = state.app.config.get('JSONDASH', {}).get('data_proxy')
+    if conf is None:
+        return
+    if 'allowed_hosts' not in conf:
+        raise ValueError('The `data_proxy` config requires `allowed_hosts` '
+                         '(e.g. `["*"]` to allow all hosts).')
+    conf = dict(conf)
+    if not conf.get('url_root'):
+        conf['url_root'] = get_url_root(state.app)
+    state.app.extensions['jsondash_data_proxy'] = data_proxy.DataProxy(**conf)
+
+
+@charts.record_once
+def setup_scheduler(state):
+    """Push refreshed module data to viewers, if configured.
+
+    Configured with a `push` dict in `JSONDASH`, where all keys are passed
+    to `scheduler.RefreshScheduler` (e.g. min_interval, keepalive).
+    This requires the data proxy.
+    """
+    conf = state.app.config.get('JSONDASH', {}).get('push')
+    if conf is None:
+        return
+    proxy = state.app.extensions.get('jsondash_data_proxy')
+    if proxy is None:
+        raise ValueError('The `push` config requires `data_proxy`.')
+    state.app.extensions['jsondash_scheduler'] = scheduler.RefreshScheduler(
+        proxy, **conf)
+
+
+@charts.record_once
+def setup_snapshots(state):
+    """Store dashboard snapshots, if configured.
+
+    Configured with a `snapshots` dict in `JSONDASH`, where all keys
+    are passed to `snapshots.SnapshotStore` (e.g. path, level).
+    This requires the data proxy, which the data is fetched through.
+    """
+    conf = state.app.config.get('JSONDASH', {}).get('snapshots')
+    if conf is None:
+        return
+    if state.app.extensions.get('jsondash_data_proxy') is None:
+        raise ValueError('The `snapshots` config requires `data_proxy`.')
+    state.app.extensions['jsondash_snapshots'] = snapshots.SnapshotStore(
+        **conf)
+
+
+def get_url_root(app):
+    """Get the root url of an app from its config, like `request.url_root`.
+
+    Args:
+        app (Flask): The app.
+
+    Returns:
+        str: The url, or None without a `SERVER_NAME`.
+    """
+    if not app.config.get('SERVER_NAME'):
+        return None
+    return '{}://{}{}/'.format(
+        app.config.get('PREFERRED_URL_SCHEME') or 'http',
+        app.config['SERVER_NAME'],
+        (app.config.get('APPLICATION_ROOT') or '').rstrip('/'))
+
+
+@charts.record_once
+def setup_prewarm(state):
+    """Pre-warm dashboard data daily, if configured.
+
+    Configured with a `prewarm` dict in `JSONDASH`, where all keys are
+    passed to `prewarm.PrewarmScheduler` (e.g. times, until, dashboards,
+    categories). This requires the data proxy, whose cache is warmed.
+    The url root defaults to the one of the data proxy.
+    The scheduler is started on the first request (see `start_prewarm`).
+    """
+    conf = state.app.config.get('JSONDASH', {}).get('prewarm')
+    if conf is None:
+        return
+    proxy = state.app.extensions.get('jsondash_data_proxy')
+    if proxy is None:
+        raise ValueError('The `prewarm` config requires `data_proxy`.')
+    conf = dict(conf)
+    if not conf.get('url_root'):
+        conf['url_root'] = proxy.url_root
+    if not conf['url_root']:
+        raise ValueError(
+            'The `prewarm` config requires `url_root` or `SERVER_NAME`.')
+    warmer = prewarm.PrewarmScheduler(
+        proxy, adapter, logger=state.app.logger, **conf)
+    state.app.extensions['jsondash_prewarm'] = warmer
+
+
+@charts.before_app_request
+def start_prewarm():
+    """Start the pre-warm scheduler, if configured.
+
+    This is done lazily, so with a pre-forking server (e.g. gunicorn
+    with `--preload`), it runs in the workers rather than in the master.
+    """
+    warmer = current_app.extensions.get('jsondash_prewarm')
+    if warmer is not None:
+        warmer.start()
+
+
 def auth(**kwargs):
     """Check if general auth functions have been specified.
 
@@ -110,19 +334,47 @@ def local_static(chart_config, static_config):
     '//cdnjs.cloudflare.com/foo/bar/foo.js'
     becomes
     '/static/js/vendor/foo.js'
+
+    A new config is returned; `chart_config` is not modified.
     """
     js_path = static_config.get('js_path')
     css_path = static_config.get('css_path')
+    localized = dict()
     for family, config in chart_config.items():
+        config = dict(config)
         if config['js_url']:
-            for i, url in enumerate(config['js_url']):
-                url = '{}{}'.format(js_path, url.split('/')[-1])
-                config['js_url'][i] = url_for('static', filename=url)
+            config['js_url'] = tuple([
+                url_for('static', filename='{}{}'.format(
+                    js_path, url.split('/')[-1]))
+                for url in config['js_url']
+            ])
         if config['css_url']:
-            for i, url in enumerate(config['css_url']):
-                url = '{}{}'.format(css_path, url.split('/')[-1])
-                config['css_url'][i] = url_for('static', filename=url)
-    return chart_config
+            config['css_url'] = tuple([
+                url_for('static', filename='{}{}'.format(
+                    css_path, url.split('/')[-1]))
+                for url in config['css_url']
+            ])
+        localized[family] = config
+    return localized
+
+
+def get_charts_config():
+    """Get the chart config for the current app.
+
+    If static overrides are set, the urls are localized only once per app
+    and url prefix (e.g. SCRIPT_NAME), then re-used for every request.
+
+    Returns:
+        dict: The chart config, which should be treated as read-only.
+    """
+    static = (setting('JSONDASH') or {}).get('static')
+    if not static:
+        return settings.CHARTS_CONFIG
+    configs = current_app.extensions.setdefault('jsondash_charts_config', {})
+    key = (request.script_root, static.get('js_path'), static.get('css_path'))
+    if key not in configs:
+        configs[key] = local_static(settings.CHARTS_CONFIG, static)
+    return configs[key]
 
 
 @charts.context_processor
@@ -130,12 +382,9 @@ def ctx():
     """Inject any context needed for this blueprint."""
     filter_user = setting('JSONDASH_FILTERUSERS')
     static = setting('JSONDASH').get('static')
-    # Rewrite the static config paths to be local if the overrides are set.
-    config = (settings.CHARTS_CONFIG if not static
-              else local_static(settings.CHARTS_CONFIG, static))
     return dict(
         static_config=static,
-        charts_config=config,
+        charts_config=get_charts_config(),
         page_title='dashboards',
         docs_url=('https://github.com/christabor/flask_jsondash/'
                   'blob/master/docs/'),
@@ -197,13 +446,110 @@ def jsonstring(ctx, data):
 @charts.route('/jsondash/<path:filename>')
 def _static(filename):
     """Send static files directly for this blueprint."""
+    bundler = current_app.extensions.get('jsondash_bundler')
+    if bundler is not None and filename.startswith(BUNDLE_PREFIX):
+        # Bundles are content-hashed, so they never change.
+        res = send_from_directory(
+            bundler.path, filename[len(BUNDLE_PREFIX):],
+            cache_timeout=BUNDLE_MAX_AGE)
+        res.cache_control.public = True
+        res.cache_control.immutable = True
+        return res
     return send_from_directory(STATIC_DIR, filename)
 
 
+def get_local_path(url):
+    """Get the file path for a url served by this app's static routes.
+
+    Args:
+        url (str): The url, as generated by `url_for`.
+
+    Returns:
+        str: The file path, or None if the url is not a local static file.
+    """
+    path = url.split('?')[0]
+    if request.script_root and path.startswith(request.script_root):
+        path = path[len(request.script_root):]
+    try:
+        endpoint, args = current_app.url_map.bind('').match(path)
+    except HTTPException:
+        return None
+    folders = {
+        'static': current_app.static_folder,
+        'jsondash._static': STATIC_DIR,
+    }
+    filename = args.get('filename')
+    bundler = current_app.extensions.get('jsondash_bundler')
+    if endpoint == 'jsondash._static' and bundler is not None and (
+            filename.startswith(BUNDLE_PREFIX)):
+        folders[endpoint] = bundler.path
+        filename = filename[len(BUNDLE_PREFIX):]
+    if endpoint not in folders or folders[endpoint] is None:
+        return None
+    path = safe_join(folders[endpoint], filename)
+    return path if path is not None and os.path.isfile(path) else None
+
+
+def get_bundled_assets(active_assets=None):
+    """Get all page assets, with local files combined into bundles.
+
+    Args:
+        active_assets (dict, optional): The chart assets for a dashboard,
+            as returned by `get_active_assets`.
+
+    Returns:
+        dict: The `css` and `js` urls in load order, or None if
+            bundling is not enabled.
+    """
+    bundler = current_app.extensions.get('jsondash_bundler')
+    if bundler is None:
+        return None
+
+    def _url(filename):
+        return url_for('jsondash._static', filename=filename)
+
+    def _bundle_url(filename):
+        return _url(BUNDLE_PREFIX + filename)
+    css = [_url(f) for f in VENDOR_CSS]
+    js = []
+    if active_assets is not None:
+        css += active_assets['css']
+        js += [_url(f) for f in VENDOR_JS] + active_assets['js']
+    css += [_url(f) for f in APP_CSS]
+    js += [_url(f) for f in APP_JS]
+    return dict(
+        css=bundler.bundle(css, 'css', get_local_path, _bundle_url),
+        js=bundler.bundle(js, 'js', get_local_path, _bundle_url),
+    )
+
+
+@charts.cli.command('bundle')
+@click.option('--script-name',
+              default='',
+              help='The url prefix the app is served under, if any.')
+def prebuild_bundles(script_name):
+    """Build asset bundles for all chart families used by dashboards."""
+    if current_app.extensions.get('jsondash_bundler') is None:
+        click.echo('Bundling is not enabled (see JSONDASH["bundles"]).')
+        return
+    family_sets = set([
+        frozenset(view.get('families') or [])
+        for view in adapter.read_summary()
+    ])
+    with current_app.test_request_context(
+            '/', environ_overrides=dict(SCRIPT_NAME=script_name)):
+        get_bundled_assets()
+        for families in family_sets:
+            bundles = get_bundled_assets(get_active_assets(families))
+            click.echo('Bundled {}: {}'.format(
+                ', '.join(sorted(families)) or '(none)',
+                ' '.join(bundles['css'] + bundles['js'])))
+
+
 def get_all_assets():
     """Load ALL asset files for css/js from config."""
     cssfiles, jsfiles = [], []
-    for c in settings.CHARTS_CONFIG.values():
+    for c in get_charts_config().values():
         if c['css_url'] is not None:
             cssfiles += c['css_url']
         if c['js_url'] is not None:
@@ -214,70 +560,56 @@ def get_all_assets():
     )
 
 
+def get_asset_graph():
+    """Get the asset graph for the current app."""
+    graph = current_app.extensions.get('jsondash_assets')
+    if graph is None:
+        graph = assets.AssetGraph(
+            settings.CHARTS_CONFIG, required=REQUIRED_STATIC_FAMILES)
+        current_app.extensions['jsondash_assets'] = graph
+    return graph
+
+
 def get_active_assets(families):
-    """Given a list of chart families, determine what needs to be loaded."""
-    families += REQUIRED_STATIC_FAMILES  # Always load internal, shared libs.
-    assets = dict(css=[], js=[])
-    families = set(families)
-    for family, data in settings.CHARTS_CONFIG.items():
-        if family in families:
-            # Also add all dependency assets.
-            if data['dependencies']:
-                for dep in data['dependencies']:
-                    assets['css'] += [
-                        css for css in settings.CHARTS_CONFIG[dep]['css_url']
-                        if css not in assets['css']]
-
-                    assets['js'] += [
-                        js for js in settings.CHARTS_CONFIG[dep]['js_url']
-                        if js not in assets['js']
-                    ]
-            assets['css'] += [
-                css for css in data['css_url'] if css not in assets['css']]
-            assets['js'] += [
-                js for js in data['js_url'] if js not in assets['js']]
-    assets['css'] = list(assets['css'])
-    assets['js'] = list(assets['js'])
-    return assets
+    """Given a list of chart families, determine what needs to be loaded.
+
+    Internal, shared libs are always loaded, and all (transitive)
+    dependencies are loaded before the families that need them.
+    """
+    return get_asset_graph().assets(families, get_charts_config())
 
 
 def get_categories():
     """Get all categories."""
-    views = list(adapter.filter({}, {'category': 1}))
-    return set([
-        v['category'] for v in views if v.get('category')
-        not in [None, 'uncategorized']
-    ])
+    return set(utils.categories.get())
 
 
 @charts.route('/charts', methods=['GET'])
 @charts.route('/charts/', methods=['GET'])
 def dashboard():
     """Load all views."""
-    opts = dict()
+    opts = dict(sort=INDEX_SORT)
     views = []
     # Allow query parameter overrides.
     page = int(request.args.get('page', 0))
     per_page = int(request.args.get(
         'per_page', setting('JSONDASH_PERPAGE')))
     if setting('JSONDASH_FILTERUSERS'):
-        opts.update(filter=dict(created_by=metadata(key='username')))
-        views = list(adapter.read(**opts))
+        owners = [metadata(key='username')]
         if setting('JSONDASH_GLOBALDASH'):
-            opts.update(
-                filter=dict(created_by=setting('JSONDASH_GLOBAL_USER')))
-            views += list(adapter.read(**opts))
-    else:
-        views = list(adapter.read(**opts))
-    if views:
-        pagination = utils.paginator(count=len(views),
-                                     page=page, per_page=per_page)
+            owners.append(setting('JSONDASH_GLOBAL_USER'))
+        opts.update(filter=dict(created_by={'$in': owners}))
+    pagination = utils.paginator(page=page, per_page=per_page,
+                                 query=opts.get('filter'))
+    if pagination.count:
+        # Only fetch the current page from the db.
         opts.update(limit=pagination.limit, skip=pagination.skip)
-        views = views[pagination.skip:pagination.next]
+        views = list(adapter.read_summary(**opts))
     else:
         pagination = None
     categorized = utils.categorize_views(views)
     kwargs = dict(
+        bundled=get_bundled_assets(),
         total=len(views),
         views=categorized,
         view=None,
@@ -285,7 +617,7 @@ def dashboard():
         creating=True,
         can_edit_global=auth(authtype='edit_global'),
         total_modules=sum([
-            len(view.get('modules', [])) for view in views
+            view.get('module_count') or 0 for view in views
             if isinstance(view, dict)
         ]),
     )
@@ -298,6 +630,30 @@ def view(c_id):
     if not auth(authtype='view', view_id=c_id):
         flash('You do not have access to view this dashboard.', 'error')
         return redirect(url_for('jsondash.dashboard'))
+    version = adapter.read_version(c_id)
+    if not version:
+        flash('Could not find view: {}'.format(c_id), 'error')
+        return redirect(url_for('jsondash.dashboard'))
+    # If the logged in user is also the creator of this dashboard,
+    # let me edit it. Otherwise, defer to any user-supplied auth function
+    # for this specific view.
+    if metadata(key='username') == version.get('created_by'):
+        can_edit = True
+    else:
+        can_edit = auth(authtype='edit_others', view_id=c_id)
+    can_edit_global = auth(authtype='edit_global')
+    # The page only changes if the dashboard, permissions, categories or
+    # app changed, so let the browser use its copy without loading or
+    # rendering it. There is no Last-Modified, since the dashboard date
+    # alone doesn't cover the rest.
+    etag = utils.get_view_etag(
+        version, can_edit, can_edit_global, sorted(get_categories()),
+        get_app_version())
+    has_messages = bool(session.get('_flashes'))
+    if not has_messages and not is_resource_modified(
+            request.environ, etag=etag):
+        return make_view_response(
+            current_app.response_class(status=304), etag)
     viewjson = adapter.read(c_id=c_id)
     if not viewjson:
         flash('Could not find view: {}'.format(c_id), 'error')
@@ -308,19 +664,84 @@ def view(c_id):
     if 'modules' not in viewjson:
         flash('Invalid configuration - missing modules.', 'error')
         return redirect(url_for('jsondash.dashboard'))
+    kwargs = get_view_kwargs(c_id, viewjson, can_edit, can_edit_global)
+    store = current_app.extensions.get('jsondash_snapshots')
+    kwargs.update(can_snapshot=store is not None)
+    proxy_url = get_proxy_url(viewjson)
+    if viewjson.get('snapshot') and store is not None:
+        # All data is inlined, so nothing is fetched.
+        kwargs.update(snapshot_data=Markup(
+            store.get_inline_data(viewjson['snapshot'])))
+    elif proxy_url is not None:
+        kwargs.update(
+            proxy_url=proxy_url,
+            batch_url=url_for('jsondash.batch_data', c_id=c_id),
+            circuits_url=url_for('jsondash.circuits', c_id=c_id),
+        )
+        if current_app.extensions.get('jsondash_scheduler') is not None:
+            kwargs.update(events_url=url_for('jsondash.events', c_id=c_id))
+    kwargs.update(modules_html=render_modules(**kwargs))
+    res = make_response(render_template('pages/chart_detail.html', **kwargs))
+    return make_view_response(res, etag)
+
+
+def get_app_version():
+    """Get everything (besides the dashboard and user) that changes how
+    a dashboard page renders, for its etag.
+
+    This is the package version, the content of all template and static
+    files (which are only hashed once per process, since they only change
+    on deploys, and are the same on all hosts),
+    and the config that changes pages.
+
+    Returns:
+        list: The version parts.
+    """
+    files = current_app.extensions.get('jsondash_files_version')
+    if files is None:
+        app = current_app
+        files = utils.get_files_version(
+            TEMPLATE_DIR, STATIC_DIR, app.static_folder,
+            None if app.template_folder is None else os.path.join(
+                app.root_path, app.template_folder))
+        current_app.extensions['jsondash_files_version'] = files
+    features = [
+        name for name in APP_FEATURES
+        if current_app.extensions.get(name) is not None
+    ]
+    config = setting('JSONDASH') or dict()
+    return [
+        __version__,
+        files,
+        features,
+        config.get('static'),
+        str(config.get('bundles')),
+        setting('JSONDASH_GLOBALDASH'),
+        setting('JSONDASH_GLOBAL_USER'),
+        setting('JSONDASH_FILTERUSERS'),
+    ]
+
+
+def get_view_kwargs(c_id, viewjson, can_edit=False, can_edit_global=False):
+    """Get the template context for a dashboard page, without any data urls.
+
+    Args:
+        c_id (str): The dashboard id.
+        viewjson (dict): The dashboard.
+        can_edit (bool, optional): If the user can edit the dashboard.
+        can_edit_global (bool, optional): If the user can edit
+            global dashboards.
+
+    Returns:
+        dict: The template context.
+    """
     # Chart family is encoded in chart type value for lookup.
     active_charts = [v.get('family') for v in viewjson['modules']
                      if v.get('family') is not None]
-    # If the logged in user is also the creator of this dashboard,
-    # let me edit it. Otherwise, defer to any user-supplied auth function
-    # for this specific view.
-    if metadata(key='username') == viewjson.get('created_by'):
-        can_edit = True
-    else:
-        can_edit = auth(authtype='edit_others', view_id=c_id)
     # Backwards compatible layout type
     layout_type = viewjson.get('layout', 'freeform')
-    kwargs = dict(
+    active_assets = get_active_assets(active_charts)
+    return dict(
         id=c_id,
         view=viewjson,
         categories=get_categories(),
@@ -328,12 +749,342 @@ def view(c_id):
             None if layout_type == 'freeform' else utils.get_num_rows(viewjson)
         ),
         modules=utils.sort_modules(viewjson),
-        assets=get_active_assets(active_charts),
+        assets=active_assets,
+        bundled=get_bundled_assets(active_assets),
         can_edit=can_edit,
-        can_edit_global=auth(authtype='edit_global'),
+        can_edit_global=can_edit_global,
         is_global=utils.is_global_dashboard(viewjson),
     )
-    return render_template('pages/chart_detail.html', **kwargs)
+
+
+def get_proxy_url(view):
+    """Get the data proxy url template for a dashboard, if it uses it.
+
+    The guid placeholder is replaced for each module in the browser.
+    """
+    if current_app.extensions.get('jsondash_data_proxy') is None:
+        return None
+    if not view.get('proxy'):
+        return None
+    return url_for('jsondash.data', c_id=view['id'], guid='__guid__')
+
+
+def get_module_url(module, query_string=''):
+    """Get the absolute url to fetch data from for a module.
+
+    Relative dataSources are served by this app (e.g. the endpoints), at
+    the url root of the data proxy (not the host of the request).
+    """
+    url = data_proxy.get_url(module['dataSource'], query_string)
+    return current_app.extensions['jsondash_data_proxy'].join_url(url)
+
+
+def get_proxied_view(c_id):
+    """Get a dashboard that uses the data proxy, with its proxy.
+
+    Aborts if the proxy isn't enabled for it, or it can't be viewed.
+
+    Returns:
+        tuple: The proxy and the dashboard config.
+    """
+    proxy = current_app.extensions.get('jsondash_data_proxy')
+    if proxy is None:
+        abort(404)
+    if not auth(authtype='view', view_id=c_id):
+        abort(403)
+    viewjson = adapter.read(c_id=c_id)
+    if not viewjson or not viewjson.get('proxy'):
+        abort(404)
+    return proxy, viewjson
+
+
+@charts.route('/charts/<c_id>/data/<guid>', methods=['GET'])
+def data(c_id, guid):
+    """Fetch the dataSource of a module, through the shared cache.
+
+    Any query string replaces the one on the saved dataSource,
+    so module inputs work the same as they do in the browser. Only the
+    args the module can send are kept (see `data_proxy.get_query`).
+    Modules with a `key` only get their part of a shared payload, modules
+    with `downsample` or `bins` get fewer points, modules with `delta`
+    enabled only get the points after `since`, and modules with
+    `serverSide` enabled only get the requested page of rows (or a
+    DataTables `error` if the data isn't a list of rows).
+    Clients that accept the columnar format get numeric series encoded
+    as binary columns (see `data_utils.columnar`). If the last good data
+    is served instead (see `DataProxy.fetch`), it has a `Warning` header.
+    """
+    proxy, viewjson = get_proxied_view(c_id)
+    module = data_proxy.get_module(viewjson, guid)
+    if module is None or not module.get('dataSource'):
+        abort(404)
+    args, since = request.args, None
+    paged = bool(module.get('serverSide')) and datatables.is_request(
+        request.args)
+    if module.get('delta') and 'since' in request.args:
+        args = request.args.copy()
+        since = args.pop('since')
+    elif paged:
+        try:
+            table = datatables.parse_request(request.args)
+        except ValueError as exc:
+            res = jsonify(error='Invalid DataTables request: {}'.format(exc))
+            res.status_code = 400
+            return res
+        args = datatables.strip_args(request.args)
+    url = get_module_url(module, data_proxy.get_query(module, args))
+    if since is not None:
+        # New points are sent as is, not downsampled.
+        module = dict(module, downsample=None)
+    try:
+        payload = proxy.fetch_module(url, module, ttl=proxy.get_ttl(module))
+    except data_proxy.HostNotAllowedError as exc:
+        res = jsonify(error=str(exc))
+        res.status_code = 403
+        return res
+    except requests.RequestException as exc:
+        res = jsonify(error='Could not fetch data: {}'.format(exc))
+        res.status_code = 502
+        return res
+    if since is not None:
+        payload = data_proxy.delta_payload(payload, since, module.get('type'))
+    if paged and payload.status == 200:
+        rows = proxy.get_json(url, module, payload)
+        if not isinstance(rows, list):
+            return jsonify(
+                draw=table.draw, recordsTotal=0, recordsFiltered=0, data=[],
+                error='The dataSource did not return a list of rows.')
+        return jsonify(datatables.serve(rows, request.args))
+    elif since is None and payload.status == 200 and columnar.is_accepted(
+            request.accept_mimetypes):
+        payload = proxy.get_columnar(url, module, payload) or payload
+    res = current_app.response_class(
+        payload.content, status=payload.status,
+        content_type=payload.content_type)
+    res.vary.add('Accept')
+    if isinstance(payload, data_proxy.StalePayload):
+        res.headers['Warning'] = '110 - "Response is Stale"'
+    return res
+
+
+def group_module_urls(proxy, modules):
+    """Group modules by the url their data is fetched from.
+
+    Args:
+        proxy (DataProxy): The proxy, to get the ttl of each module from.
+        modules (list): The modules, excluding any that aren't cacheable.
+
+    Returns:
+        tuple: The module guids, the ttl and the `timeout` and `budget`
+            to fetch with (see `DataProxy.fetch`), each keyed by url.
+            Shared urls use the shortest ttl, timeout and latency budget
+            of all their modules.
+    """
+    guids, ttls, options = dict(), dict(), dict()
+    for module in modules:
+        if module.get('family') == 'Basic' or not module.get('dataSource'):
+            continue
+        if module.get('serverSide') and module.get('family') == 'DataTable':
+            # Only requested a page at a time.
+            continue
+        url = get_module_url(module)
+        guids.setdefault(url, []).append(module.get('guid'))
+        ttl = proxy.get_ttl(module)
+        ttls[url] = min(ttl, ttls.get(url, ttl))
+        timeout = data_proxy.get_timeout(module) or proxy.timeout
+        budget = data_proxy.get_latency_budget(module)
+        opts = options.setdefault(url, dict(timeout=timeout, budget=budget))
+        opts['timeout'] = min(opts['timeout'], timeout)
+        if opts['budget'] is None or (
+                budget is not None and budget < opts['budget']):
+            opts['budget'] = budget
+    return guids, ttls, options
+
+
+@charts.route('/charts/<c_id>/data', methods=['GET'])
+def batch_data(c_id):
+    """Fetch the data for all modules of a dashboard in one request.
+
+    Each unique dataSource is fetched once, in the shared thread pool,
+    and streamed as a line of json as soon as it is ready. Modules using
+    the columnar format are loaded on their own instead.
+    """
+    proxy, viewjson = get_proxied_view(c_id)
+    guids, ttls, options = group_module_urls(proxy, [
+        module for module in viewjson['modules']
+        if not module.get('columnar')])
+    # These get their own, smaller, version of the data.
+    downsampled = dict(
+        (module.get('guid'), module) for module in viewjson['modules']
+        if data_proxy.is_reduced(module))
+
+    def generate():
+        for url, payload, error in proxy.fetch_all(ttls, options):
+            shared = [guid for guid in guids[url] if guid not in downsampled]
+            if shared:
+                yield data_proxy.batch_line(shared, payload, error)
+            for guid in [guid for guid in guids[url] if guid in downsampled]:
+                reduced = payload
+                if error is None:
+                    reduced = proxy.fetch_module(
+                        url, downsampled[guid], ttl=ttls[url])
+                yield data_proxy.batch_line([guid], reduced, error)
+    res = current_app.response_class(
+        generate(), mimetype='application/x-ndjson')
+    res.cache_control.no_cache = True
+    return res
+
+
+@charts.route('/charts/<c_id>/events', methods=['GET'])
+def events(c_id):
+    """Stream refreshed data for all refreshing modules of a dashboard.
+
+    This is a Server-Sent Events stream, where each `data` event has the
+    same format as a line of `batch_data`, and is only sent if the data
+    changed. The data of each url is refreshed once per interval
+    for all viewers. Modules with `downsample` or `bins` get their own,
+    smaller, version of the data, the same as in `batch_data`.
+    """
+    refresher = current_app.extensions.get('jsondash_scheduler')
+    if refresher is None:
+        abort(404)
+    proxy, viewjson = get_proxied_view(c_id)
+    guids, intervals, _ = group_module_urls(proxy, [
+        module for module in viewjson['modules']
+        if module.get('refresh') and module.get('refreshInterval') and
+        # These are refreshed by the browser, to only get new points.
+        not module.get('delta')
+    ])
+    if not intervals:
+        # Tells the browser not to reconnect.
+        return current_app.response_class(status=204)
+    reduced = dict(
+        (module.get('guid'), module) for module in viewjson['modules']
+        if data_proxy.is_reduced(module))
+    subscription = refresher.subscribe(intervals)
+
+    def get_lines(url, payload, error):
+        shared = [guid for guid in guids[url] if guid not in reduced]
+        if shared:
+            yield data_proxy.batch_line(shared, payload, error)
+        for guid in [guid for guid in guids[url] if guid in reduced]:
+            module_payload = payload
+            if error is None:
+                module_payload = proxy.get_reduced(
+                    url, reduced[guid], payload)
+            yield data_proxy.batch_line([guid], module_payload, error)
+
+    def generate():
+        try:
+            while True:
+                result = subscription.get(timeout=refresher.keepalive)
+                if result is None:
+                    yield ': keepalive\n\n'
+                    continue
+                for line in get_lines(*result):
+                    yield 'event: data\ndata: {}\n'.format(line)
+        finally:
+            refresher.unsubscribe(subscription)
+    res = current_app.response_class(
+        generate(), mimetype='text/event-stream')
+    res.cache_control.no_cache = True
+    # Don't let proxies (e.g. nginx) buffer events.
+    res.headers['X-Accel-Buffering'] = 'no'
+    return res
+
+
+@charts.route('/charts/<c_id>/circuits', methods=['GET'])
+def circuits(c_id):
+    """Get the circuit breaker state of all modules with failing hosts.
+
+    Modules whose host is fine are not included.
+    """
+    proxy, viewjson = get_proxied_view(c_id)
+    states = proxy.breaker.stats()
+    modules = dict()
+    for module in viewjson['modules']:
+        if module.get('family') == 'Basic' or not module.get('dataSource'):
+            continue
+        host = data_proxy.get_host(get_module_url(module))
+        if host in states:
+            modules[module.get('guid')] = dict(states[host], host=host)
+    res = jsonify(modules)
+    res.cache_control.no_cache = True
+    return res
+
+
+@charts.route('/charts/data/stats', methods=['GET'])
+def data_stats():
+    """Get the data proxy cache and request coalescing stats."""
+    proxy = current_app.extensions.get('jsondash_data_proxy')
+    if proxy is None:
+        abort(404)
+    if not auth(authtype='stats'):
+        abort(403)
+    return jsonify(proxy.stats())
+
+
+def render_modules(cached=True, **kwargs):
+    """Render the module grid markup for a dashboard.
+
+    If the fragment cache is enabled, the markup is cached per dashboard
+    date, and per variant of anything else that changes it
+    (layout, permissions, embeddable and demo mode).
+
+    Args:
+        cached (bool, optional): Use the fragment cache, if enabled.
+            This is off for altered copies of a dashboard (e.g. exports).
+        **kwargs: The template context (e.g. view, modules, can_edit).
+
+    Returns:
+        Markup: The rendered modules.
+    """
+    template = 'partials/dashboard-modules.html'
+    fragments = current_app.extensions.get('jsondash_fragments')
+    if fragments is None or not cached:
+        return Markup(render_template(template, **kwargs))
+    viewjson = kwargs['view']
+    c_id = viewjson.get('id')
+    version = str(viewjson.get('date'))
+    variant = (
+        viewjson.get('layout', 'freeform'),
+        kwargs.get('can_edit'),
+        kwargs.get('can_edit_global'),
+        bool(request.args.get('embeddable', False)),
+        bool(request.args.get('jsondash_demo_mode', False)),
+    )
+    variants = fragments.get(c_id, version=version)
+    if variants is None:
+        variants = dict()
+        fragments.set(c_id, variants, version=version)
+    if variant not in variants:
+        variants[variant] = render_template(template, **kwargs)
+    return Markup(variants[variant])
+
+
+def invalidate_modules(c_id):
+    """Remove any cached module markup for a dashboard."""
+    fragments = current_app.extensions.get('jsondash_fragments')
+    if fragments is not None:
+        fragments.delete(c_id)
+
+
+def make_view_response(res, etag):
+    """Add conditional GET headers to a dashboard response.
+
+    Args:
+        res (Response): The response.
+        etag (str): The etag for the dashboard.
+
+    Returns:
+        Response: The updated response.
+    """
+    res.set_etag(etag)
+    # Pages depend on the user, so only the browser should keep them,
+    # and it should always check they are still valid.
+    res.cache_control.private = True
+    res.cache_control.no_cache = True
+    return res
 
 
 @charts.route('/charts/<c_id>/delete', methods=['POST'])
@@ -344,6 +1095,9 @@ def delete(c_id):
         flash('You do not have access to delete dashboards.', 'error')
         return redirect(dash_url)
     adapter.delete(c_id)
+    invalidate_modules(c_id)
+    # The deleted dashboard may have been the last in its category.
+    utils.categories.invalidate()
     flash('Deleted dashboard "{}"'.format(c_id))
     return redirect(dash_url)
 
@@ -403,6 +1157,9 @@ def update(c_id):
         adapter.update(c_id, data=data, fmt_charts=False)
     else:
         adapter.update(c_id, data=data)
+    invalidate_modules(c_id)
+    if data.get('category') != viewjson.get('category'):
+        utils.categories.invalidate()
     flash('Updated view "{}"'.format(c_id))
     return redirect(view_url)
 
@@ -444,6 +1201,7 @@ def create():
     d.update(**check_global())
     # Add to DB
     adapter.create(data=d)
+    utils.categories.add(d.get('category'))
     flash('Created new dashboard "{}"'.format(data['name']))
     return redirect(url_for('jsondash.view', c_id=new_id))
 
@@ -470,5 +1228,147 @@ def clone(c_id):
     data.update(**metadata())
     # Add to DB
     adapter.create(data=data)
+    utils.categories.add(data.get('category'))
     flash('Created new dashboard clone "{}"'.format(newname))
     return redirect(url_for('jsondash.view', c_id=data['id']))
+
+
+@charts.route('/charts/<c_id>/snapshot', methods=['POST'])
+def snapshot(c_id):
+    """Save a copy of a dashboard, along with the current data of all modules.
+
+    Each dataSource is fetched once, and its payload is stored in the
+    snapshot store. The copy is shown with all of its data inlined,
+    so viewing it never requests any dataSources.
+    """
+    store = current_app.extensions.get('jsondash_snapshots')
+    proxy = current_app.extensions.get('jsondash_data_proxy')
+    if store is None or proxy is None:
+        abort(404)
+    if not auth(authtype='snapshot'):
+        flash('You do not have access to snapshot dashboards.', 'error')
+        return redirect(url_for('jsondash.dashboard'))
+    viewjson = adapter.read(c_id=c_id)
+    if not viewjson:
+        flash('Could not find view: {}'.format(c_id), 'error')
+        return redirect(url_for('jsondash.dashboard'))
+    payloads, failed = get_module_payloads(proxy, viewjson)
+    digests = dict((guid, store.put(content))
+                   for guid, content in payloads.items())
+    now = str(dt.now())
+    newname = 'Snapshot of {}'.format(viewjson['name'])
+    data = dict(
+        name=newname,
+        # Frozen data is never refreshed.
+        modules=[dict(module, refresh=False)
+                 for module in viewjson['modules']],
+        date=now,
+        id=str(uuid.uuid1()),
+        layout=viewjson['layout'],
+        snapshot=dict(source=c_id, date=now, data=digests),
+    )
+    data.update(**metadata())
+    adapter.create(data=data)
+    utils.categories.add(data.get('category'))
+    flash('Created new dashboard snapshot "{}"'.format(newname))
+    if failed:
+        flash('Could not get data for: {}. These are loaded live.'.format(
+            ', '.join(failed)), 'error')
+    return redirect(url_for('jsondash.view', c_id=data['id']))
+
+
+def get_module_payloads(proxy, viewjson, workers=4):
+    """Fetch the current data of all modules of a dashboard.
+
+    Each dataSource is fetched once, bypassing any cached response.
+    Relative dataSources are fetched from the url root of the proxy.
+    Each module only gets the data it uses, as when viewed through the
+    proxy (see `data_proxy.reduce_payload`). The last good data served
+    for failing hosts is not used.
+
+    Args:
+        proxy (DataProxy): The proxy to fetch through.
+        viewjson (dict): The dashboard.
+        workers (int, optional): The max number of urls to fetch at once.
+
+    Returns:
+        tuple: The json payload of each module, keyed by guid, and the
+            names of the modules it couldn't be fetched for.
+    """
+    modules = prewarm.get_modules([viewjson], url_root=proxy.url_root)
+    fetched = prewarm.fetch_urls(proxy, dict(
+        (url, proxy.get_ttl(module)) for _, module, url in modules),
+        workers=workers)
+    payloads, failed = dict(), []
+    for _, module, url in modules:
+        payload, error, _ = fetched[url]
+        # The last good data of a failing host isn't current.
+        if error is None and not isinstance(payload, data_proxy.StalePayload):
+            payload = data_proxy.reduce_payload(payload, module)
+            if payload.status == 200 and snapshots.is_json(payload.content):
+                payloads[module['guid']] = payload.content
+                continue
+        failed.append(module.get('name') or module['guid'])
+    return payloads, failed
+
+
+@charts.cli.command('export')
+@click.argument('c_id')
+@click.argument('path')
+@click.option('--url-root', default='http://localhost/',
+              help='The root url of the app, for relative dataSources.')
+@click.option('--workers', default=4,
+              help='The max number of dataSources to fetch at once.')
+@click.option('--timeout', default=10,
+              help='The seconds to wait for each dataSource.')
+def export_dashboard(c_id, path, url_root, workers, timeout):
+    """Export a dashboard as static files, to serve from anywhere.
+
+    The embeddable page is written to PATH/index.html, along with the
+    local assets it uses, and the data of each module in PATH/data.
+    Re-exporting to the same PATH only rewrites changed files.
+    """
+    viewjson = adapter.read(c_id=c_id)
+    if not viewjson or 'modules' not in viewjson:
+        raise click.ClickException('Could not find view: {}'.format(c_id))
+    viewjson.pop('_id', None)
+    with current_app.test_request_context(
+            '/charts/{}'.format(c_id), base_url=url_root,
+            query_string=dict(embeddable=1)):
+        payloads = dict()
+        store = current_app.extensions.get('jsondash_snapshots')
+        if viewjson.get('snapshot') and store is not None:
+            for guid, digest in viewjson['snapshot'].get('data', {}).items():
+                content = store.get(digest)
+                if content is not None:
+                    payloads[guid] = content
+        # The same hosts are allowed as for the app.
+        allowed_hosts = getattr(current_app.extensions.get(
+            'jsondash_data_proxy'), 'allowed_hosts', None)
+        proxy = data_proxy.DataProxy(
+            timeout=timeout, workers=workers, url_root=url_root,
+            allowed_hosts=allowed_hosts)
+        fetched, failed = get_module_payloads(proxy, dict(
+            viewjson, modules=[module for module in viewjson['modules']
+                               if module.get('guid') not in payloads]),
+            workers=workers)
+        payloads.update(fetched)
+        exporter = export.Exporter(path)
+        sources = dict()
+        for guid, content in payloads.items():
+            sources[guid] = export.get_data_name(guid)
+            exporter.write(sources[guid], content)
+        exported = export.export_view(viewjson, sources)
+        kwargs = get_view_kwargs(c_id, exported)
+        kwargs.update(modules_html=render_modules(cached=False, **kwargs))
+        html = export.export_assets(
+            exporter, render_template('pages/chart_detail.html', **kwargs),
+            get_local_path, script_root=request.script_root)
+        exporter.write('index.html', html.encode('utf-8'))
+    removed = exporter.finish()
+    click.echo('Exported {} to {}: {} written, {} unchanged, {} removed.'
+               .format(c_id, path, len(exporter.written),
+                       len(exporter.unchanged), len(removed)))
+    if failed:
+        click.echo('Could not get data for: {}. These are loaded live.'.format(
+            ', '.join(failed)))
@@ -0,0 +1,1027 @@
+# -*- coding: utf-8 -*-
+
+"""
+flask_jsondash.data_proxy
+~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Server-side fetching of module dataSources, with a shared response cache.
+
+:copyright: (c) 2016 by Chris Tabor.
+:license: MIT, see LICENSE for more details.
+"""
+
+import fnmatch
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+from werkzeug.http import HTTP_STATUS_CODES
+from werkzeug.datastructures import MultiDict
+from werkzeug.urls import url_decode, url_encode, url_join, url_parse
+
+from flask_jsondash import cache
+from flask_jsondash.data_utils import binning
+from flask_jsondash.data_utils import columnar
+from flask_jsondash.data_utils import downsample
+from flask_jsondash.data_utils import timeseries
+
+Payload = namedtuple('Payload', 'content status content_type')
+
+# The assumed width of a grid layout, for modules with `col-N` widths.
+GRID_WIDTH = 1140
+# Chart types that can be downsampled (for the C3 family).
+DOWNSAMPLE_TYPES = ['line', 'timeseries']
+# Chart families that can be binned.
+BINNED_FAMILIES = ['PlotlyStandard']
+# The max number of redirects followed for a request.
+MAX_REDIRECTS = 5
+
+
+def get_module(view, guid):
+    """Get a single module from a dashboard.
+
+    Args:
+        view (dict): The dashboard configuration.
+        guid (str): The module guid.
+
+    Returns:
+        dict: The module, or None if it doesn't exist.
+    """
+    for module in (view or {}).get('modules', []):
+        if module.get('guid') == guid:
+            return module
+    return None
+
+
+def get_url(data_source, query_string=''):
+    """Get the url to fetch for a dataSource.
+
+    A query string replaces any query string on the dataSource,
+    which is the same way module inputs work in the browser.
+
+    Args:
+        data_source (str): The dataSource of a module.
+        query_string (str, optional): The query string to use instead.
+
+    Returns:
+        str: The url.
+    """
+    if not query_string:
+        return data_source
+    return '{}?{}'.format(data_source.split('?')[0], query_string)
+
+
+def get_query(module, args):
+    """Get the query string to fetch a module's dataSource with.
+
+    Only the args a module can send are kept: the names of its `inputs`
+    and the args of its saved dataSource. They are sorted, so the same
+    args always make the same url, and so the same cache key.
+
+    Args:
+        module (dict): The module config.
+        args (MultiDict): The request args (e.g. `request.args`).
+
+    Returns:
+        str: The query string, which is empty if no args are kept.
+    """
+    names = set(url_decode(module['dataSource'].partition('?')[2]).keys())
+    for option in (module.get('inputs') or {}).get('options') or []:
+        names.add(option.get('name'))
+    return url_encode(MultiDict([
+        (key, value) for key, value in args.items(multi=True)
+        if key in names
+    ]), sort=True)
+
+
+def get_host(url):
+    """Get the host (and port) of a url, which circuits are kept for."""
+    return url_parse(url).netloc
+
+
+def get_timeout(module):
+    """Get the seconds to wait for a module's dataSource to respond.
+
+    Args:
+        module (dict): The module config, with `timeout` in milliseconds.
+
+    Returns:
+        float: The timeout, or None to use the default.
+    """
+    if not module.get('timeout'):
+        return None
+    return float(module['timeout']) / 1000
+
+
+def get_latency_budget(module):
+    """Get the seconds to wait for new data before serving stale data.
+
+    Args:
+        module (dict): The module config, with `latencyBudget`
+            in milliseconds.
+
+    Returns:
+        float: The budget, or None to always wait.
+    """
+    if module.get('latencyBudget') is None:
+        return None
+    return float(module['latencyBudget']) / 1000
+
+
+def get_point_budget(module, grid_width=GRID_WIDTH):
+    """Get the number of points to downsample a module's data to.
+
+    Modules enable downsampling with `downsample`, which is either a
+    number of points, or true to use one point per pixel of width.
+
+    Args:
+        module (dict): The module config.
+        grid_width (int, optional): The width of a full grid row in pixels.
+
+    Returns:
+        int: The number of points, or None if it isn't downsampled.
+    """
+    value = module.get('downsample')
+    if not value or module.get('override'):
+        return None
+    if module.get('family') != 'C3':
+        return None
+    if module.get('type') not in DOWNSAMPLE_TYPES:
+        return None
+    # New points for these are requested by the number of points loaded.
+    if module.get('delta') and module.get('type') == 'line':
+        return None
+    try:
+        if value is not True:
+            return max(int(value), 3)
+        width = str(module.get('width'))
+        if width.startswith('col-'):
+            return max(grid_width * int(width[4:]) // 12, 3)
+        return max(int(float(width)), 3)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def get_bins(module):
+    """Get the number of bins for a module's histogram/heatmap data.
+
+    Args:
+        module (dict): The module config.
+
+    Returns:
+        int/tuple: The number of bins, a tuple of (x, y) bins,
+            or None if it isn't binned (or the bins are invalid).
+    """
+    bins = module.get('bins')
+    if not bins or module.get('family') not in BINNED_FAMILIES:
+        return None
+    try:
+        if isinstance(bins, (list, tuple)):
+            bins = tuple(int(count) for count in bins[:2])
+            return bins if min(bins) > 0 else None
+        bins = int(bins)
+    except (TypeError, ValueError):
+        return None
+    return bins if bins > 0 else None
+
+
+def slice_payload(payload, key):
+    """Get only the data for a single key of a shared (multicharts) payload.
+
+    Args:
+        payload (Payload): The full response.
+        key (str): The key of the module.
+
+    Returns:
+        Payload: The sliced response, or the original one if it
+            doesn't have data for the key.
+    """
+    if payload.status != 200:
+        return payload
+    try:
+        data = json.loads(payload.content.decode('utf-8'))
+    except ValueError:
+        return payload
+    if not isinstance(data, dict) or not isinstance(
+            data.get('multicharts'), dict) or key not in data['multicharts']:
+        return payload
+    content = json.dumps(data['multicharts'][key]).encode('utf-8')
+    return Payload(content, 200, 'application/json')
+
+
+def delta_payload(payload, since, chart_type):
+    """Get only the points added after a given point (see `get_delta`).
+
+    Args:
+        payload (Payload): The full response.
+        since (str): The last date, or the number of points, the client has.
+        chart_type (str): The chart type.
+
+    Returns:
+        Payload: The new points, or the original response if it isn't
+            in the expected format.
+    """
+    if payload.status != 200:
+        return payload
+    try:
+        data = json.loads(payload.content.decode('utf-8'))
+        data = timeseries.get_delta(data, since, chart_type)
+    except (ValueError, TypeError, AttributeError):
+        return payload
+    return Payload(json.dumps(data).encode('utf-8'), 200, 'application/json')
+
+
+def downsample_payload(payload, threshold, chart_type):
+    """Reduce the points of a response (see `downsample.downsample`).
+
+    Args:
+        payload (Payload): The full response.
+        threshold (int): The max number of points to keep.
+        chart_type (str): The chart type.
+
+    Returns:
+        Payload: The reduced response, or the original response if it isn't
+            in the expected format, or numpy isn't installed.
+    """
+    if payload.status != 200 or downsample.np is None:
+        return payload
+    try:
+        data = json.loads(payload.content.decode('utf-8'))
+        data = downsample.downsample(data, threshold, chart_type)
+    except (ValueError, TypeError, AttributeError):
+        return payload
+    return Payload(json.dumps(data).encode('utf-8'), 200, 'application/json')
+
+
+def bin_payload(payload, bins):
+    """Bin the histogram/heatmap traces of a response (see `bin_traces`).
+
+    Args:
+        payload (Payload): The full response.
+        bins (int/tuple): The number of bins, or a tuple of (x, y) bins.
+
+    Returns:
+        Payload: The binned response, or the original response if it isn't
+            in the expected format, or numpy isn't installed.
+    """
+    if payload.status != 200 or binning.np is None:
+        return payload
+    try:
+        data = binning.bin_traces(
+            json.loads(payload.content.decode('utf-8')), bins)
+    except ValueError:
+        return payload
+    return Payload(json.dumps(data).encode('utf-8'), 200, 'application/json')
+
+
+def is_reduced(module, key=False):
+    """Check if a module only gets a smaller version of its response.
+
+    Args:
+        module (dict): The module config.
+        key (bool, optional): Count modules that only get their `key`
+            of a shared response.
+
+    Returns:
+        bool: If the module is downsampled or binned (or has a key).
+    """
+    return bool(get_point_budget(module) or get_bins(module) or (
+        key and module.get('key')))
+
+
+def get_reduced_key(url, module):
+    """Get the cache key of a module's reduced response."""
+    return (url, module.get('key'), get_point_budget(module),
+            get_bins(module), module.get('type'))
+
+
+def reduce_payload(payload, module):
+    """Get only the data a module uses, from its full response.
+
+    This is the part of a shared payload for modules with a `key`,
+    downsampled for modules with `downsample` enabled, and binned for
+    modules with `bins`.
+
+    Args:
+        payload (Payload): The full response.
+        module (dict): The module config.
+
+    Returns:
+        Payload: The reduced response.
+    """
+    key, budget = module.get('key'), get_point_budget(module)
+    bins = get_bins(module)
+    if key:
+        payload = slice_payload(payload, key)
+    if budget:
+        payload = downsample_payload(payload, budget, module.get('type'))
+    if bins:
+        payload = bin_payload(payload, bins)
+    return payload
+
+
+def columnar_payload(data):
+    """Encode parsed response data in the columnar format (see `encode`).
+
+    Args:
+        data: The parsed response data.
+
+    Returns:
+        Payload: The encoded response, or None if numpy isn't installed.
+    """
+    if columnar.np is None:
+        return None
+    return Payload(columnar.encode(data), 200, columnar.MIMETYPE)
+
+
+def batch_line(guids, payload=None, error=None):
+    """Format the result of a fetch as a line of newline-delimited json.
+
+    Args:
+        guids (list): The guids of all modules using this result.
+        payload (Payload, optional): The response, if the fetch succeeded.
+        error (Exception, optional): The error, if the fetch failed.
+
+    Returns:
+        str: The json line, including the newline.
+    """
+    line = dict(guids=guids)
+    if error is not None:
+        line.update(status=getattr(error, 'status', 502),
+                    statusText='Could not fetch data: {}'.format(error))
+    elif payload.status != 200:
+        line.update(status=payload.status,
+                    statusText=HTTP_STATUS_CODES.get(payload.status, ''))
+    else:
+        try:
+            line.update(status=200, data=json.loads(
+                payload.content.decode('utf-8')))
+        except ValueError:
+            line.update(status=502, statusText='Invalid JSON response')
+    return json.dumps(line) + '\n'
+
+
+class StalePayload(Payload):
+    """The last good response for a url, served when new data isn't ready."""
+
+    __slots__ = ()
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised when a host is failing, and there is no stale data to serve."""
+
+
+class HostNotAllowedError(requests.RequestException):
+    """Raised for urls on hosts the proxy is not allowed to request."""
+
+    status = 403
+
+
+class CircuitBreaker(object):
+    """Stops requests to hosts that keep failing, for a while.
+
+    After `max_failures` consecutive failures, a host's circuit opens and
+    no requests are made to it. Once `reset_timeout` seconds have passed,
+    it's half-open: a single request is let through to probe the host,
+    which closes the circuit if it succeeds, or opens it again if not.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, max_failures=5, reset_timeout=30):
+        """Setup the circuits.
+
+        Args:
+            max_failures (int, optional): The consecutive failures
+                before a circuit opens.
+            reset_timeout (int, optional): The seconds before an open
+                circuit lets a probe request through.
+        """
+        self.max_failures = max_failures
+        self.reset_timeout = reset_timeout
+        # The failures, time opened and probe status, keyed by host.
+        self._circuits = dict()
+        self._lock = threading.Lock()
+
+    def _state(self, circuit, now):
+        if circuit['failures'] < self.max_failures:
+            return self.CLOSED
+        if circuit['probing'] or now - circuit['opened'] >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def state(self, host, now=None):
+        """Get the state of a host's circuit.
+
+        Args:
+            host (str): The host.
+            now (float, optional): The current time.
+
+        Returns:
+            str: One of CLOSED, OPEN or HALF_OPEN.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            circuit = self._circuits.get(host)
+            return self.CLOSED if circuit is None else self._state(
+                circuit, now)
+
+    def allow(self, host, now=None):
+        """Check if a request can be made to a host.
+
+        Args:
+            host (str): The host.
+            now (float, optional): The current time.
+
+        Returns:
+            bool: True if the circuit is closed, or if this is the probe
+                request of a half-open circuit.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is None:
+                return True
+            state = self._state(circuit, now)
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not circuit['probing']:
+                circuit['probing'] = True
+                return True
+            return False
+
+    def record(self, host, success, now=None):
+        """Record the result of a request to a host.
+
+        Args:
+            host (str): The host.
+            success (bool): If the request succeeded.
+            now (float, optional): The current time.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if success:
+                self._circuits.pop(host, None)
+                return
+            circuit = self._circuits.setdefault(
+                host, dict(failures=0, opened=None, probing=False))
+            circuit['failures'] += 1
+            circuit['probing'] = False
+            if circuit['failures'] >= self.max_failures:
+                circuit['opened'] = now
+
+    def release(self, host):
+        """End the probe request of a host's circuit, if any, without
+        recording a result, so another request can probe it."""
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is not None:
+                circuit['probing'] = False
+
+    def stats(self, now=None):
+        """Get the state of all circuits that aren't closed.
+
+        Returns:
+            dict: The state, failures, and seconds until a probe is let
+                through, keyed by host.
+        """
+        now = time.time() if now is None else now
+        stats = dict()
+        with self._lock:
+            for host, circuit in self._circuits.items():
+                state = self._state(circuit, now)
+                if state == self.CLOSED:
+                    continue
+                stats[host] = dict(
+                    state=state,
+                    failures=circuit['failures'],
+                    retry_in=max(
+                        circuit['opened'] + self.reset_timeout - now, 0),
+                )
+        return stats
+
+
+class SingleFlight(object):
+    """Coalesces concurrent calls for the same key into a single call.
+
+    The first caller for a key runs the function, and any others that
+    arrive while it is running wait for, and share, its result (or error).
+    """
+
+    class Call(object):
+        """A call in progress."""
+
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        """Setup the in-progress calls and counters."""
+        self.calls = 0
+        self.executions = 0
+        self._inflight = dict()
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """Call a function, unless it's already being called for this key.
+
+        Args:
+            key (str): The key to coalesce calls on (e.g. a url).
+            func (function): The function to call.
+            *args: The args to call the function with.
+            **kwargs: The kwargs to call the function with.
+
+        Returns:
+            The function result.
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = self.Call()
+                self.executions += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func(*args, **kwargs)
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        """Get the coalescing counters.
+
+        Returns:
+            dict: The total calls, how many ran, how many shared a result,
+                and the ratio of shared calls.
+        """
+        with self._lock:
+            calls, executions = self.calls, self.executions
+        shared = calls - executions
+        return dict(
+            calls=calls,
+            executions=executions,
+            shared=shared,
+            ratio=float(shared) / calls if calls else 0.0,
+        )
+
+
+class SharedCache(object):
+    """A cache of responses on disk, shared by all processes using it
+    (e.g. the workers of an app, and the pre-warm command line).
+
+    Each response is a file named by the sha256 of its url, with a json
+    header line (the expiry time, status and content type) and then the
+    content.
+    """
+
+    def __init__(self, path):
+        """Setup the cache.
+
+        Args:
+            path (str): The folder to store responses in.
+                It's created if it doesn't exist.
+        """
+        self.path = path
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def get_path(self, url):
+        """Get the file path of the response for a url."""
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, digest + '.cache')
+
+    def get(self, url):
+        """Get the response for a url, if it's cached and not expired.
+
+        Args:
+            url (str): The url.
+
+        Returns:
+            tuple: The Payload and the seconds it's still valid for
+                (or None if it never expires), or None if not cached.
+        """
+        try:
+            with open(self.get_path(url), 'rb') as cached:
+                header = json.loads(cached.readline().decode('utf-8'))
+                content = cached.read()
+        except (IOError, OSError, ValueError):
+            return None
+        expires = header.get('expires')
+        ttl = None if expires is None else expires - time.time()
+        if ttl is not None and ttl <= 0:
+            return None
+        payload = Payload(content=content, status=header.get('status'),
+                          content_type=header.get('content_type'))
+        return payload, ttl
+
+    def set(self, url, payload, ttl=None):
+        """Store the response for a url.
+
+        Args:
+            url (str): The url.
+            payload (Payload): The response.
+            ttl (None, optional): The seconds it's valid for,
+                or None if it never expires.
+        """
+        header = json.dumps(dict(
+            expires=None if ttl is None else time.time() + ttl,
+            status=payload.status,
+            content_type=payload.content_type,
+        ))
+        # Write to a temp file first, so a partial file is never read.
+        fd, tmp = tempfile.mkstemp(dir=self.path)
+        with os.fdopen(fd, 'wb') as tmpfile:
+            tmpfile.write(header.encode('utf-8') + b'\n')
+            tmpfile.write(payload.content)
+        os.rename(tmp, self.get_path(url))
+
+
+class DataProxy(object):
+    """Fetches dataSources through a pooled session and a shared cache."""
+
+    def __init__(self, timeout=10, ttl=60, maxsize=256, pool_size=10,
+                 workers=8, max_failures=5, reset_timeout=30,
+                 allowed_hosts=None, cache_dir=None, url_root=None):
+        """Setup the proxy.
+
+        Args:
+            timeout (int, optional): The seconds to wait for a response.
+            ttl (int, optional): The default seconds to cache responses for.
+            maxsize (int, optional): The max number of responses to cache.
+            pool_size (int, optional): The max connections to keep per host.
+            workers (int, optional): The max number of threads used to
+                fetch urls for batch requests, shared by all requests.
+            max_failures (int, optional): The consecutive failures before
+                requests to a host are stopped (see `CircuitBreaker`).
+            reset_timeout (int, optional): The seconds before a failing
+                host is tried again.
+            allowed_hosts (list, optional): The only hosts (or host:port)
+                that may be requested, which may contain wildcards
+                (e.g. `*.example.com`). Since dataSources are requested from
+                the server, this keeps editors from reaching internal hosts.
+                All hosts are allowed if not given.
+            cache_dir (str, optional): A folder to also cache responses in,
+                which is shared by all processes using it (see
+                `SharedCache`), e.g. so pre-warmed data is used by all
+                workers of an app.
+            url_root (str, optional): The root url of the app, which
+                relative dataSources are joined to. They can't be requested
+                without it.
+        """
+        self.timeout = timeout
+        self.url_root = url_root
+        self.allowed_hosts = None if allowed_hosts is None else [
+            host.lower() for host in allowed_hosts]
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.cache = cache.LRUCache(maxsize=maxsize, ttl=ttl)
+        # The last good response of each url, which never expires.
+        self.last_good = cache.LRUCache(maxsize=maxsize, ttl=None)
+        self.shared = None if cache_dir is None else SharedCache(cache_dir)
+        self.breaker = CircuitBreaker(
+            max_failures=max_failures, reset_timeout=reset_timeout)
+        self.flights = SingleFlight()
+        self.session = requests.Session()
+        pool = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', pool)
+        self.session.mount('https://', pool)
+
+    def is_allowed(self, url):
+        """Check if a url is on a host the proxy may request.
+
+        Only absolute http(s) urls can be requested.
+        """
+        parsed = url_parse(url)
+        if parsed.scheme not in ('http', 'https') or not parsed.host:
+            return False
+        if self.allowed_hosts is None:
+            return True
+        hosts = [(parsed.host or '').lower(), parsed.netloc.lower()]
+        return any(fnmatch.fnmatchcase(host, pattern)
+                   for host in hosts for pattern in self.allowed_hosts)
+
+    def check_allowed(self, url):
+        """Check that a url may be requested (see `is_allowed`).
+
+        Raises:
+            HostNotAllowedError: If it may not.
+        """
+        if not self.is_allowed(url):
+            raise HostNotAllowedError(
+                'Requests to {} are not allowed'.format(
+                    get_host(url) or url))
+
+    def join_url(self, url):
+        """Get the absolute url for a (possibly relative) dataSource url."""
+        if self.url_root is None:
+            return url
+        return url_join(self.url_root, url)
+
+    def get_ttl(self, module):
+        """Get how long to cache the data for a module.
+
+        Refreshing modules are cached for their refresh interval, so each
+        refresh gets new data; others use the default ttl.
+
+        Args:
+            module (dict): The module config.
+
+        Returns:
+            float: The ttl in seconds.
+        """
+        interval = module.get('refreshInterval')
+        if module.get('refresh') and interval:
+            return max(float(interval) / 1000, 1)
+        return self.cache.ttl
+
+    def fetch(self, url, ttl=None, timeout=None, budget=None):
+        """Get the response for a url, using the cache if possible.
+
+        Concurrent requests for the same url share a single upstream
+        request. Only successful responses are cached.
+
+        Args:
+            url (str): The url to fetch.
+            ttl (None, optional): The seconds to cache the response for.
+            timeout (None, optional): The seconds to wait for a response,
+                if different from the default timeout.
+            budget (None, optional): The seconds to wait for a response
+                before serving the last good one instead, if there is one.
+                The request still finishes in the background.
+
+        Raises:
+            requests.RequestException: If the request failed.
+
+        Returns:
+            Payload: The response content, status and content type.
+        """
+        # Checked here too, since other processes fill the shared cache.
+        self.check_allowed(url)
+        payload = self.cache.get(url)
+        if payload is not None:
+            return payload
+        shared = None if self.shared is None else self.shared.get(url)
+        if shared is not None:
+            payload, shared_ttl = shared
+            self.cache.set(url, payload, ttl=shared_ttl)
+            return payload
+        stale = None if budget is None else self.last_good.get(url)
+        if stale is None:
+            return self.flights.do(
+                url, self._fetch, url, ttl=ttl, timeout=timeout)
+        future = self.executor.submit(
+            self.flights.do, url, self._fetch, url, ttl=ttl, timeout=timeout)
+        try:
+            return future.result(timeout=budget)
+        except TimeoutError:
+            return StalePayload(*stale)
+
+    def refresh(self, url, ttl=None, timeout=None):
+        """Get a fresh response for a url, replacing any cached one.
+
+        Args:
+            url (str): The url to fetch.
+            ttl (None, optional): The seconds to cache the response for.
+            timeout (None, optional): The seconds to wait for a response.
+
+        Raises:
+            requests.RequestException: If the request failed.
+
+        Returns:
+            Payload: The response content, status and content type.
+        """
+        return self.flights.do(url, self._fetch, url, ttl=ttl, timeout=timeout)
+
+    def fetch_key(self, url, key, ttl=None):
+        """Get the data for a single key of a shared (multicharts) payload.
+
+        Args:
+            url (str): The url to fetch.
+            key (str): The key of the module.
+            ttl (None, optional): The seconds to cache the response for.
+
+        Returns:
+            Payload: The sliced response.
+        """
+        return self.fetch_module(url, dict(key=key), ttl=ttl)
+
+    def fetch_module(self, url, module, ttl=None):
+        """Get only the data a module uses (see `reduce_payload`).
+
+        The full payload is fetched and cached once for all modules, and
+        the result for each module is cached separately, so it's only
+        processed once.
+        The module's `timeout` and `latencyBudget` are used for the request.
+
+        Args:
+            url (str): The url to fetch.
+            module (dict): The module config.
+            ttl (None, optional): The seconds to cache the response for.
+
+        Returns:
+            Payload: The response, which is a StalePayload if the module's
+                latency budget ran out or its host is failing.
+        """
+        kwargs = dict(ttl=ttl, timeout=get_timeout(module),
+                      budget=get_latency_budget(module))
+        if not is_reduced(module, key=True):
+            return self.fetch(url, **kwargs)
+        cache_key = get_reduced_key(url, module)
+        payload = self.cache.get(cache_key)
+        if payload is not None:
+            return payload
+        payload = self.fetch(url, **kwargs)
+        stale = isinstance(payload, StalePayload)
+        payload = reduce_payload(payload, module)
+        if stale:
+            return StalePayload(*payload)
+        if payload.status == 200:
+            self.cache.set(cache_key, payload, ttl=ttl)
+        return payload
+
+    def get_reduced(self, url, module, payload):
+        """Get only the data a module uses, from a response it was refreshed
+        with (e.g. by the `RefreshScheduler`).
+
+        The result is cached along with the response, so it's only
+        processed once for all viewers.
+
+        Args:
+            url (str): The url the response is from.
+            module (dict): The module config.
+            payload (Payload): The full response.
+
+        Returns:
+            Payload: The reduced response (see `reduce_payload`).
+        """
+        cache_key = ('reduced',) + get_reduced_key(url, module)
+        version = hash(payload.content)
+        reduced = self.cache.get(cache_key, version=version)
+        if reduced is None:
+            reduced = reduce_payload(payload, module)
+            self.cache.set(cache_key, reduced, version=version)
+        return reduced
+
+    def get_json(self, url, module, payload):
+        """Get the parsed data of a module's response.
+
+        The data is cached along with the response, so large payloads
+        (e.g. table rows) are only parsed once. It must not be modified.
+
+        Args:
+            url (str): The url the response is from.
+            module (dict): The module config.
+            payload (Payload): The response, from `fetch_module`.
+
+        Returns:
+            The data, or None if it isn't valid json.
+        """
+        cache_key = ('json', url, module.get('key'))
+        version = hash(payload.content)
+        data = self.cache.get(cache_key, version=version)
+        if data is None:
+            try:
+                data = json.loads(payload.content.decode('utf-8'))
+            except ValueError:
+                return None
+            self.cache.set(cache_key, data, version=version)
+        return data
+
+    def get_columnar(self, url, module, payload):
+        """Get a module's response in the columnar format.
+
+        The encoded response is cached along with the response.
+
+        Args:
+            url (str): The url the response is from.
+            module (dict): The module config.
+            payload (Payload): The response, from `fetch_module`.
+
+        Returns:
+            Payload: The encoded response, or None if it can't be encoded.
+        """
+        cache_key = ('columnar', url, module.get('key'))
+        version = hash(payload.content)
+        encoded = self.cache.get(cache_key, version=version)
+        if encoded is None:
+            data = self.get_json(url, module, payload)
+            if data is None:
+                return None
+            encoded = columnar_payload(data)
+            if encoded is None:
+                return None
+            self.cache.set(cache_key, encoded, version=version)
+        return encoded
+
+    def fetch_all(self, urls, options=None):
+        """Fetch many urls in the thread pool.
+
+        Args:
+            urls (dict): The ttl to cache each url for, keyed by url.
+            options (dict, optional): The `timeout` and `budget` to fetch
+                each url with (see `fetch`), keyed by url.
+
+        Yields:
+            tuple: The url, its Payload (or None) and the request error
+                (or None), in the order they finish.
+        """
+        options = options or dict()
+        futures = dict(
+            (self.executor.submit(
+                self.fetch, url, ttl=ttl, **options.get(url, dict())), url)
+            for url, ttl in urls.items())
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except requests.RequestException as exc:
+                yield futures[future], None, exc
+
+    def _fetch(self, url, ttl=None, timeout=None):
+        """Request a url and cache the response if it was successful.
+
+        Requests to failing hosts are not made, and the last good
+        response is returned instead, if there is one. Redirects are
+        followed only to hosts that may be requested.
+
+        Raises:
+            HostNotAllowedError: If the host (or a redirect) may not be
+                requested.
+        """
+        host = get_host(url)
+        self.check_allowed(url)
+        if not self.breaker.allow(host):
+            stale = self.last_good.get(url)
+            if stale is None:
+                raise CircuitOpenError(
+                    'Too many failures for {}, retrying later'.format(host))
+            return StalePayload(*stale)
+        try:
+            res = self._get(url, timeout=timeout or self.timeout)
+            self.breaker.record(host, res.status_code < 500)
+        except HostNotAllowedError:
+            # Not a failure of the host.
+            self.breaker.record(host, True)
+            raise
+        except requests.RequestException:
+            self.breaker.record(host, False)
+            raise
+        finally:
+            # Any other error must not leave the circuit probing forever.
+            self.breaker.release(host)
+        payload = Payload(
+            content=res.content,
+            status=res.status_code,
+            content_type=res.headers.get('Content-Type', 'application/json'),
+        )
+        if res.status_code == 200:
+            self.cache.set(url, payload, ttl=ttl)
+            self.last_good.set(url, payload)
+            if self.shared is not None:
+                self.shared.set(
+                    url, payload, ttl=self.cache.ttl if ttl is None else ttl)
+        return payload
+
+    def _get(self, url, timeout):
+        """Request a url, following redirects to allowed hosts only.
+
+        Raises:
+            HostNotAllowedError: If a redirect may not be requested.
+            requests.TooManyRedirects: After `MAX_REDIRECTS` redirects.
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            res = self.session.get(url, timeout=timeout, allow_redirects=False)
+            if not res.is_redirect:
+                return res
+            url = url_join(res.url, res.headers['location'])
+            self.check_allowed(url)
+        raise requests.TooManyRedirects(
+            'Exceeded {} redirects'.format(MAX_REDIRECTS), response=res)
+
+    def stats(self):
+        """Get the cache, request coalescing and circuit breaker stats.
+
+        Returns:
+            dict: The `cache` and `coalescing` counters, and the
+                `circuits` that aren't closed.
+        """
+        return dict(cache=self.cache.stats(), coalescing=self.flights.stats(),
+                    circuits=self.breaker.stats())
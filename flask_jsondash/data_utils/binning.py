@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+flask_jsondash.data_utils.binning
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Utilities for binning raw samples in plotly histogram and heatmap traces,
+so only the binned values need to be sent to the browser.
+
+This requires numpy (see the `downsample` extra in setup.py).
+
+:copyright: (c) 2016 by Chris Tabor.
+:license: MIT, see LICENSE for more details.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Trace attributes that only apply to unbinned traces.
+HISTOGRAM_KEYS = [
+    'x', 'y', 'z', 'type', 'histnorm', 'histfunc', 'nbinsx', 'nbinsy',
+    'xbins', 'ybins', 'autobinx', 'autobiny', 'bingroup', 'cumulative',
+]
+# The trace type each binned trace type becomes.
+BINNED_TYPES = {
+    'histogram': 'bar',
+    'histogram2d': 'heatmap',
+    'histogram2dcontour': 'contour',
+    'heatmap': 'heatmap',
+}
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError(
+            'Binning requires `numpy`. '
+            'Install with `pip install flask_jsondash[downsample]`.')
+
+
+def _get_bins(bins, axis):
+    """Get the bin count for an axis, from a count or an [x, y] list."""
+    if isinstance(bins, (list, tuple)):
+        return int(bins[axis])
+    return int(bins)
+
+
+def _centers(edges):
+    return ((edges[:-1] + edges[1:]) / 2.0).tolist()
+
+
+def _to_list(arr):
+    """Convert an array to a list, with nan values as None (json null)."""
+    return np.where(np.isnan(arr), None, arr).tolist()
+
+
+def _copy_trace(trace, trace_type):
+    """Copy all styling attributes of a trace, for its binned version."""
+    binned = dict(
+        (key, val) for key, val in trace.items() if key not in HISTOGRAM_KEYS)
+    binned.update(type=BINNED_TYPES[trace_type])
+    return binned
+
+
+def bin_histogram(trace, bins):
+    """Bin a histogram trace into a bar trace.
+
+    Args:
+        trace (dict): The histogram trace, with raw `x` (or `y`, for
+            horizontal histograms) samples.
+        bins (int): The number of bins.
+
+    Raises:
+        ValueError: If the trace can't be binned here (e.g. the samples
+            aren't numbers, or it aggregates with a `histfunc`).
+
+    Returns:
+        dict: The bar trace.
+    """
+    if 'x' in trace and 'y' in trace:
+        raise ValueError('Histograms with a histfunc are not supported.')
+    horizontal = 'x' not in trace
+    samples = np.asarray(trace['y' if horizontal else 'x'], dtype=float)
+    samples = samples[~np.isnan(samples)]
+    counts, edges = np.histogram(samples, bins=bins)
+    widths = np.diff(edges)
+    norm = trace.get('histnorm') or ''
+    values = counts.astype(float)
+    total = max(counts.sum(), 1)
+    if norm == 'percent':
+        values = values * 100 / total
+    elif norm == 'probability':
+        values = values / total
+    elif norm == 'density':
+        values = values / widths
+    elif norm == 'probability density':
+        values = values / total / widths
+    elif norm:
+        raise ValueError('Unknown histnorm "{}".'.format(norm))
+    binned = _copy_trace(trace, 'histogram')
+    centers, values = _centers(edges), values.tolist()
+    binned.update(width=widths.tolist())
+    if horizontal:
+        binned.update(orientation='h', x=values, y=centers)
+    else:
+        binned.update(x=centers, y=values)
+    return binned
+
+
+def bin_2d(trace, bins):
+    """Bin a 2d histogram (or heatmap of samples) into a heatmap/contour.
+
+    2d histograms are binned by the count of samples. Heatmaps with
+    a flat list of `z` values for each x/y sample are binned by
+    the average `z` value.
+
+    Args:
+        trace (dict): The trace, with raw `x` and `y` samples.
+        bins (int/list): The number of bins, or a list of [x, y] bins.
+
+    Raises:
+        ValueError: If the trace can't be binned here (e.g. the samples
+            aren't numbers, or are already binned).
+
+    Returns:
+        dict: The heatmap or contour trace.
+    """
+    if trace.get('histnorm') or trace.get('histfunc'):
+        raise ValueError('Normalized 2d histograms are not supported.')
+    x = np.asarray(trace['x'], dtype=float)
+    y = np.asarray(trace['y'], dtype=float)
+    if x.shape != y.shape:
+        raise ValueError('There must be an x and y value for each sample.')
+    shape = [_get_bins(bins, 0), _get_bins(bins, 1)]
+    if trace['type'] == 'heatmap':
+        z = np.asarray(trace['z'], dtype=float)
+        if z.shape != x.shape:
+            raise ValueError('The heatmap is already binned.')
+        mask = ~(np.isnan(x) | np.isnan(y) | np.isnan(z))
+        counts, xedges, yedges = np.histogram2d(
+            x[mask], y[mask], bins=shape)
+        sums = np.histogram2d(
+            x[mask], y[mask], bins=[xedges, yedges], weights=z[mask])[0]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = np.where(counts > 0, sums / counts, np.nan)
+    else:
+        mask = ~(np.isnan(x) | np.isnan(y))
+        values, xedges, yedges = np.histogram2d(
+            x[mask], y[mask], bins=shape)
+    binned = _copy_trace(trace, trace['type'])
+    # Rows of z are y values.
+    binned.update(
+        x=_centers(xedges), y=_centers(yedges), z=_to_list(values.T))
+    return binned
+
+
+def bin_trace(trace, bins):
+    """Bin a single trace, if it's a supported type with raw samples.
+
+    Args:
+        trace (dict): The trace.
+        bins (int/list): The number of bins, or a list of [x, y] bins.
+
+    Raises:
+        ImportError: If numpy isn't installed.
+
+    Returns:
+        dict: The binned trace, or the same trace if it can't be binned.
+    """
+    _require_numpy()
+    if not isinstance(trace, dict) or trace.get('type') not in BINNED_TYPES:
+        return trace
+    try:
+        if trace['type'] == 'histogram':
+            return bin_histogram(trace, _get_bins(bins, 0))
+        return bin_2d(trace, bins)
+    except (ValueError, TypeError, KeyError):
+        return trace
+
+
+def bin_traces(data, bins):
+    """Bin all histogram and heatmap traces of plotly data.
+
+    Args:
+        data (dict/list): The plotly data, either a list of traces or
+            a figure dict with a `data` list of traces.
+        bins (int/list): The number of bins, or a list of [x, y] bins.
+
+    Raises:
+        ImportError: If numpy isn't installed.
+
+    Returns:
+        dict/list: The data with binned traces.
+    """
+    if isinstance(data, list):
+        return [bin_trace(trace, bins) for trace in data]
+    if isinstance(data, dict) and isinstance(data.get('data'), list):
+        return dict(data, data=bin_traces(data['data'], bins))
+    return data
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+flask_jsondash.data_utils.columnar
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Utilities for encoding large numeric series in a compact binary format,
+which the browser can read as typed arrays without parsing any json.
+
+The format is a little-endian uint32 with the length of a json header,
+the header itself (padded with spaces), then the raw little-endian
+values of each column. Each column starts on an 8 byte boundary, so it
+can be used as a typed array directly. The header has the data with each
+column replaced by `{"$column": index}`, and the dtype, byte offset and
+length of each column, e.g.:
+
+    {"data": {"line1": {"$column": 0}},
+     "columns": [{"dtype": "float64", "offset": 72, "length": 1000}]}
+
+This requires numpy (see the `downsample` extra in setup.py).
+
+:copyright: (c) 2016 by Chris Tabor.
+:license: MIT, see LICENSE for more details.
+"""
+
+import json
+import numbers
+import struct
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MIMETYPE = 'application/vnd.jsondash.columnar'
+# Numpy dtypes that have a matching javascript typed array.
+DTYPES = [
+    'int8', 'uint8', 'int16', 'uint16', 'int32', 'uint32',
+    'float32', 'float64',
+]
+ALIGNMENT = 8
+INT32_RANGE = (-2 ** 31, 2 ** 31 - 1)
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError(
+            'Columnar encoding requires `numpy`. '
+            'Install with `pip install flask_jsondash[downsample]`.')
+
+
+def _pad(size):
+    return -size % ALIGNMENT
+
+
+def is_accepted(accept):
+    """Check if a client explicitly asked for the columnar format.
+
+    Args:
+        accept (MIMEAccept): The accepted mimetypes
+            (e.g. `request.accept_mimetypes`).
+
+    Returns:
+        bool: If the mimetype is listed (wildcards don't count).
+    """
+    return any(value == MIMETYPE and quality > 0 for value, quality in accept)
+
+
+def _is_number(value):
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+def to_column(values, min_length=16):
+    """Get a numeric list or array as an array with a typed array dtype.
+
+    Args:
+        values (list/numpy.ndarray): The values.
+        min_length (int, optional): Shorter lists are not worth encoding.
+
+    Returns:
+        numpy.ndarray: The values (integers as int32 if they fit, and all
+            other numbers as float64), or None if they aren't all numbers.
+    """
+    if isinstance(values, np.ndarray):
+        if values.ndim != 1 or values.dtype.kind not in 'iuf':
+            return None
+        if values.dtype.name in DTYPES:
+            return values
+        arr = values
+    else:
+        if len(values) < min_length or not all(map(_is_number, values)):
+            return None
+        arr = np.asarray(values)
+    if arr.dtype.kind in 'iu' and (not len(arr) or (
+            arr.min() >= INT32_RANGE[0] and arr.max() <= INT32_RANGE[1])):
+        return arr.astype('int32')
+    return arr.astype('float64')
+
+
+def encode(data, min_length=16):
+    """Encode all numeric lists (or numpy arrays) in some data as columns.
+
+    Args:
+        data: The data, e.g. a dict of C3 series or a list of Plotly traces.
+        min_length (int, optional): The minimum length of lists to encode.
+            Numpy arrays are always encoded.
+
+    Raises:
+        ImportError: If numpy isn't installed.
+
+    Returns:
+        bytes: The encoded data.
+    """
+    _require_numpy()
+    columns = []
+
+    def replace(value):
+        if isinstance(value, dict):
+            return dict((key, replace(val)) for key, val in value.items())
+        if isinstance(value, (list, tuple, np.ndarray)):
+            column = to_column(value, min_length=min_length)
+            if column is None:
+                if isinstance(value, np.ndarray):
+                    return value.tolist()
+                return [replace(val) for val in value]
+            columns.append(column)
+            return {'$column': len(columns) - 1}
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+
+    data = replace(data)
+    meta = [dict(dtype=column.dtype.name, length=len(column))
+            for column in columns]
+
+    def get_header(start):
+        offset = start
+        for info, column in zip(meta, columns):
+            info['offset'] = offset
+            offset += column.nbytes + _pad(column.nbytes)
+        return json.dumps(dict(data=data, columns=meta)).encode('utf-8')
+
+    # The offsets are part of the header, so they change its length.
+    # Grow the header until the offsets fit behind it.
+    start = 0
+    while True:
+        header = get_header(start)
+        end = 4 + len(header)
+        if end <= start:
+            break
+        start = end + _pad(end)
+    header += b' ' * (start - end)
+    parts = [struct.pack('<I', len(header)), header]
+    for column in columns:
+        parts.append(column.astype(column.dtype.newbyteorder('<')).tobytes())
+        parts.append(b'\0' * _pad(column.nbytes))
+    return b''.join(parts)
+
+
+def decode(content):
+    """Decode the columnar format, e.g. for testing an endpoint.
+
+    Args:
+        content (bytes): The encoded data.
+
+    Raises:
+        ImportError: If numpy isn't installed.
+
+    Returns:
+        The data, with each column as a numpy array.
+    """
+    _require_numpy()
+    size = struct.unpack('<I', content[:4])[0]
+    header = json.loads(content[4:4 + size].decode('utf-8'))
+    columns = [
+        np.frombuffer(content, dtype=np.dtype(info['dtype']).newbyteorder('<'),
+                      count=info['length'], offset=info['offset'])
+        for info in header['columns']
+    ]
+
+    def replace(value):
+        if isinstance(value, dict):
+            if list(value.keys()) == ['$column']:
+                return columns[value['$column']]
+            return dict((key, replace(val)) for key, val in value.items())
+        if isinstance(value, list):
+            return [replace(val) for val in value]
+        return value
+    return replace(header['data'])
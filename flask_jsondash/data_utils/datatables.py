@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+flask_jsondash.data_utils.datatables
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Utilities for serving tables with the DataTables server-side
+processing protocol, so only the visible page of rows is sent.
+
+See https://datatables.net/manual/server-side for the protocol.
+
+:copyright: (c) 2016 by Chris Tabor.
+:license: MIT, see LICENSE for more details.
+"""
+
+import heapq
+import re
+from collections import namedtuple
+from functools import total_ordering
+from itertools import islice
+
+# Py2/3 compat.
+try:
+    _unicode = unicode
+except NameError:
+    _unicode = str
+
+TableRequest = namedtuple(
+    'TableRequest', 'draw start length search order columns')
+Column = namedtuple('Column', 'data searchable orderable search')
+
+# Matches the index and name of params like `columns[0][search][value]`.
+PARAM_RE = re.compile(r'^(columns|order)\[(\d+)\]\[(\w+)\](?:\[(\w+)\])?$')
+# All params sent by DataTables (including the jQuery cache buster).
+PROTOCOL_PARAMS = ['draw', 'start', 'length', '_']
+PROTOCOL_PREFIXES = ('search[', 'order[', 'columns[')
+
+
+def is_request(args):
+    """Check if request args are a DataTables server-side request."""
+    return 'draw' in args
+
+
+def strip_args(args):
+    """Remove all DataTables params from request args.
+
+    Args:
+        args (MultiDict): The request args.
+
+    Returns:
+        MultiDict: A copy of the args, with only the other params.
+    """
+    args = args.copy()
+    for key in list(args.keys()):
+        if key in PROTOCOL_PARAMS or key.startswith(PROTOCOL_PREFIXES):
+            args.pop(key)
+    return args
+
+
+def _is_true(value):
+    return value in [True, 'true']
+
+
+def parse_request(args):
+    """Parse the DataTables params from request args.
+
+    Args:
+        args (dict): The request args (e.g. `request.args`).
+
+    Raises:
+        ValueError: If any of the numeric params are invalid.
+
+    Returns:
+        TableRequest: The draw counter, start row, page length (-1 for all),
+            global search value, list of (column index, descending) tuples
+            to sort by, and the list of columns.
+    """
+    columns, order = dict(), dict()
+    for key in args:
+        match = PARAM_RE.match(key)
+        if match is None:
+            continue
+        kind, index, name, subname = match.groups()
+        target = columns if kind == 'columns' else order
+        name = name if subname is None else '{}_{}'.format(name, subname)
+        target.setdefault(int(index), dict())[name] = args.get(key)
+    return TableRequest(
+        draw=int(args.get('draw', 0)),
+        start=max(int(args.get('start', 0)), 0),
+        length=int(args.get('length', -1)),
+        search=args.get('search[value]', ''),
+        order=[
+            (int(order[i]['column']), order[i].get('dir') == 'desc')
+            for i in sorted(order) if 'column' in order[i]
+        ],
+        columns=[
+            Column(
+                data=columns[i].get('data', _unicode(i)),
+                searchable=_is_true(columns[i].get('searchable', 'true')),
+                orderable=_is_true(columns[i].get('orderable', 'true')),
+                search=columns[i].get('search_value', ''),
+            ) for i in sorted(columns)
+        ],
+    )
+
+
+def get_value(row, column):
+    """Get a column value from a row, which is either a dict or a list."""
+    if isinstance(row, dict):
+        return row.get(column)
+    try:
+        return row[int(column)]
+    except (ValueError, IndexError):
+        return None
+
+
+@total_ordering
+class SortKey(object):
+    """A sort key for a row, sorting each column in its own direction.
+
+    None values always come first (when ascending), and values that
+    can't be compared are compared as strings.
+    """
+
+    def __init__(self, values, descending):
+        self.values = values
+        self.descending = descending
+
+    def __eq__(self, other):
+        return self.values == other.values
+
+    def __lt__(self, other):
+        for a, b, desc in zip(self.values, other.values, self.descending):
+            if a == b:
+                continue
+            if desc:
+                a, b = b, a
+            if a is None or b is None:
+                return a is None
+            try:
+                return a < b
+            except TypeError:
+                return _unicode(a) < _unicode(b)
+        return False
+
+
+def _matches(row, table):
+    """Check if a row matches the global and column searches."""
+    if table.search:
+        search = table.search.lower()
+        if not any(
+                search in _unicode(get_value(row, col.data)).lower()
+                for col in table.columns if col.searchable):
+            return False
+    for col in table.columns:
+        if col.search and col.search.lower() not in _unicode(
+                get_value(row, col.data)).lower():
+            return False
+    return True
+
+
+def serve(rows, args):
+    """Get the response for a DataTables server-side request.
+
+    Rows are only held in memory as needed: unsorted pages are sliced
+    while iterating, and sorted pages only keep the top rows up to the
+    end of the page.
+
+    Args:
+        rows (list/iterable/function): The rows (dicts, or lists of values
+            by column index), or a function that returns them.
+        args (dict): The request args (e.g. `request.args`).
+
+    Raises:
+        ValueError: If any of the numeric params are invalid.
+
+    Returns:
+        dict: The response, with the `draw` counter, `recordsTotal`,
+            `recordsFiltered` and the page of rows in `data`.
+    """
+    if callable(rows):
+        rows = rows()
+    table = parse_request(args)
+    counts = dict(total=0, filtered=0)
+
+    def filtered():
+        for row in rows:
+            counts['total'] += 1
+            if _matches(row, table):
+                counts['filtered'] += 1
+                yield row
+
+    order = [
+        (table.columns[index].data, desc) for index, desc in table.order
+        if index < len(table.columns) and table.columns[index].orderable
+    ]
+    end = None if table.length < 0 else table.start + table.length
+    if order:
+        columns = [column for column, _ in order]
+        descending = [desc for _, desc in order]
+
+        def key(row):
+            return SortKey([get_value(row, col) for col in columns],
+                           descending)
+        if end is None:
+            page = sorted(filtered(), key=key)[table.start:]
+        else:
+            page = heapq.nsmallest(end, filtered(), key=key)[table.start:]
+    else:
+        rest = filtered()
+        page = list(islice(rest, table.start, end))
+        # Count the rest of the rows, without keeping them.
+        for _ in rest:
+            pass
+    return dict(
+        draw=table.draw,
+        recordsTotal=counts['total'],
+        recordsFiltered=counts['filtered'],
+        data=page,
+    )
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+flask_jsondash.data_utils.downsample
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Utilities for reducing large line/timeseries data to fewer points,
+while keeping its visual shape, using Largest-Triangle-Three-Buckets.
+
+This requires numpy (see the `downsample` extra in setup.py).
+
+:copyright: (c) 2016 by Chris Tabor.
+:license: MIT, see LICENSE for more details.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError(
+            'Downsampling requires `numpy`. '
+            'Install with `pip install flask_jsondash[downsample]`.')
+
+
+def lttb(x, y, threshold):
+    """Get the indices of the points to keep, using LTTB.
+
+    The first and last points are always kept. Each bucket of points
+    in between is reduced to the point forming the largest triangle
+    with the previously kept point and the average of the next bucket.
+
+    Args:
+        x (list): The x values, which must be increasing numbers.
+        y (list): The y values. Missing values (None) are never kept,
+            unless a whole bucket is missing.
+        threshold (int): The number of points to keep.
+
+    Raises:
+        ImportError: If numpy isn't installed.
+
+    Returns:
+        numpy.ndarray: The indices of the points to keep.
+    """
+    _require_numpy()
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    size = len(y)
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+    every = (size - 2) / float(threshold - 2)
+    indices = np.empty(threshold, dtype=int)
+    indices[0], indices[-1] = 0, size - 1
+    prev = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, size)
+        avg_x = np.nanmean(x[end:next_end]) if end < next_end else x[-1]
+        avg_y = np.nanmean(y[end:next_end]) if end < next_end else y[-1]
+        areas = np.abs(
+            (x[prev] - avg_x) * (y[start:end] - y[prev]) -
+            (x[prev] - x[start:end]) * (avg_y - y[prev]))
+        areas[np.isnan(areas)] = -1
+        prev = start + int(areas.argmax())
+        indices[i + 1] = prev
+    return indices
+
+
+def _get_x(dates, size):
+    """Get numeric x values for timeseries dates.
+
+    Non-numeric dates (e.g. ISO-8601 strings) are assumed to be
+    evenly spaced.
+    """
+    try:
+        return np.asarray(dates, dtype=float)
+    except (TypeError, ValueError):
+        return np.arange(size)
+
+
+def downsample(data, threshold, chart_type='line'):
+    """Reduce all series of c3 formatted data to about `threshold` points.
+
+    The data is in the standard c3 format, e.g.
+    `{"dates": [...], "line1": [...], "line2": [...]}`. Since all series
+    share the same x values, each series is reduced to its share of the
+    threshold, and the points kept for any series are kept for all.
+
+    Args:
+        data (dict): The data.
+        threshold (int): The max number of points to keep.
+        chart_type (str, optional): The chart type, where `timeseries`
+            data uses its dates as x values.
+
+    Raises:
+        ImportError: If numpy isn't installed.
+        ValueError: If the series aren't all the same length.
+
+    Returns:
+        dict: The reduced data, or the same data if it's small enough.
+    """
+    _require_numpy()
+    labels = [label for label in data if label != 'dates']
+    if not labels:
+        return data
+    size = len(data[labels[0]])
+    if any(len(vals) != size for vals in data.values()):
+        raise ValueError('All series must be the same length.')
+    if size <= threshold:
+        return data
+    if chart_type == 'timeseries' and 'dates' in data:
+        x = _get_x(data['dates'], size)
+    else:
+        x = np.arange(size)
+    budget = max(threshold // len(labels), 3)
+    keep = np.unique(np.concatenate([
+        lttb(x, data[label], budget) for label in labels
+    ])).tolist()
+    return dict(
+        (label, [vals[i] for i in keep]) for label, vals in data.items())
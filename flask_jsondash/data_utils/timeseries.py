@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+flask_jsondash.data_utils.timeseries
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Utilities for working with timeseries/line formatted data, e.g. for
+only sending the points a client doesn't have yet.
+
+:copyright: (c) 2016 by Chris Tabor.
+:license: MIT, see LICENSE for more details.
+"""
+
+
+def _sort_key(value):
+    """Make numbers (e.g. timestamps) and numeric strings comparable."""
+    try:
+        return 0, float(value)
+    except (TypeError, ValueError):
+        return 1, str(value)
+
+
+def get_delta(data, since, chart_type='timeseries'):
+    """Get only the points that were added after a given point.
+
+    The data is in the standard c3 format, e.g.
+    `{"dates": [...], "line1": [...], "line2": [...]}`, and is assumed
+    to only ever be appended to.
+
+    For `timeseries` data, `since` is the last date the client has, and all
+    points with a later date are kept. Dates should be ISO-8601 strings
+    (or numbers), so they can be compared. For any other type (e.g. `line`),
+    `since` is the number of points the client has.
+
+    Args:
+        data (dict): The full data.
+        since (str): The last date, or the number of points.
+        chart_type (str, optional): The chart type.
+
+    Returns:
+        dict: The new points, in the same format.
+    """
+    if chart_type == 'timeseries':
+        since = _sort_key(since)
+        dates = data.get('dates', [])
+        start = len(dates)
+        # Only the end is new, so search backwards.
+        while start > 0 and _sort_key(dates[start - 1]) > since:
+            start -= 1
+    else:
+        start = max(int(since), 0)
+    return dict((label, vals[start:]) for label, vals in data.items())
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+"""
+flask_jsondash.export
+~~~~~~~~~~~~~~~~~~~~~
+
+Static exports of dashboards, as a folder with the embeddable page,
+the local assets it uses and the data of each module as json files,
+which any static file server or CDN can serve.
+
+Exports are incremental: a manifest of the content hash of each file is
+kept, so re-exporting only rewrites the files that changed, and removes
+the ones no longer used.
+
+:copyright: (c) 2016 by Chris Tabor.
+:license: MIT, see LICENSE for more details.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import posixpath
+import re
+import tempfile
+
+from flask_jsondash import assets
+
+MANIFEST = '.jsondash-export.json'
+DATA_DIR = 'data'
+# Matches all `src` and `href` attributes in html.
+HTML_URL_RE = re.compile(r'''(\s(?:src|href)=)(['"])([^'"]+)\2''')
+
+
+def get_data_name(guid):
+    """Get the (relative) filename of the data of a module.
+
+    It's named by a hash of the guid, which editors can set to anything.
+    """
+    digest = hashlib.sha256(str(guid).encode('utf-8')).hexdigest()
+    return posixpath.join(DATA_DIR, '{}.json'.format(digest))
+
+
+def get_asset_name(url, script_root=''):
+    """Get the (relative) filename of a local asset, from its url."""
+    path = url.split('?')[0].split('#')[0]
+    if script_root and path.startswith(script_root):
+        path = path[len(script_root):]
+    return path.lstrip('/')
+
+
+def export_view(view, sources):
+    """Get a copy of a dashboard that loads its data from exported files.
+
+    Args:
+        view (dict): The dashboard.
+        sources (dict): The exported data filename of each module,
+            keyed by guid. Other modules are left as is.
+
+    Returns:
+        dict: The new dashboard.
+    """
+    view = copy.deepcopy(view)
+    view['proxy'] = False
+    for module in view.get('modules', []):
+        if module.get('guid') in sources:
+            module['dataSource'] = sources[module['guid']]
+            # Exported data never changes.
+            module['refresh'] = False
+    return view
+
+
+class Exporter(object):
+    """Writes the files of an export to a folder, skipping unchanged ones."""
+
+    def __init__(self, path):
+        """Setup the exporter.
+
+        Args:
+            path (str): The folder to export to.
+                It's created if it doesn't exist.
+        """
+        self.path = path
+        self.files = dict()
+        self.written = []
+        self.unchanged = []
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        try:
+            with open(os.path.join(path, MANIFEST)) as manifest:
+                self.manifest = json.load(manifest)
+        except (IOError, OSError, ValueError):
+            self.manifest = dict()
+
+    def has(self, name):
+        """Check if a file is part of this export already."""
+        return name in self.files
+
+    def write(self, name, content):
+        """Write a file, unless it is unchanged since the last export.
+
+        Args:
+            name (str): The relative filename, with `/` separators.
+            content (bytes): The file content.
+
+        Raises:
+            ValueError: If the file would be outside of the export folder.
+
+        Returns:
+            bool: If the file was written.
+        """
+        path = os.path.join(self.path, *name.split('/'))
+        root = os.path.abspath(self.path)
+        if not os.path.abspath(path).startswith(root + os.sep):
+            raise ValueError('Invalid export filename: {}'.format(name))
+        digest = hashlib.sha256(content).hexdigest()
+        self.files[name] = digest
+        if self.manifest.get(name) == digest and os.path.isfile(path):
+            self.unchanged.append(name)
+            return False
+        folder = os.path.dirname(path)
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        # Write to a temp file first, so a partial file is never served.
+        fd, tmp = tempfile.mkstemp(dir=folder)
+        with os.fdopen(fd, 'wb') as tmpfile:
+            tmpfile.write(content)
+        os.chmod(tmp, 0o644)
+        os.rename(tmp, path)
+        self.written.append(name)
+        return True
+
+    def finish(self):
+        """Remove files of the last export that are no longer used,
+        and save the manifest.
+
+        Returns:
+            list: The removed filenames.
+        """
+        removed = []
+        for name in sorted(set(self.manifest) - set(self.files)):
+            try:
+                os.remove(os.path.join(self.path, *name.split('/')))
+            except OSError:
+                continue
+            removed.append(name)
+        with open(os.path.join(self.path, MANIFEST), 'w') as manifest:
+            json.dump(self.files, manifest, indent=2, sort_keys=True)
+        self.manifest = dict(self.files)
+        return removed
+
+
+def export_assets(exporter, html, get_path, script_root=''):
+    """Export all local assets of a page, and make their urls relative.
+
+    Css files are exported along with all local files they reference.
+    Remote urls (e.g. from a cdn) are kept as is.
+
+    Args:
+        exporter (Exporter): The exporter to write files with.
+        html (str): The page.
+        get_path (function): A function that returns the local file
+            path for a url, or None if it isn't a local file.
+        script_root (str, optional): The url prefix the app is served under.
+
+    Returns:
+        str: The updated page.
+    """
+    def export_url(url, referrer):
+        if assets.is_remote(url) or url.startswith('#'):
+            return url
+        path = get_path(url)
+        if path is None:
+            return url
+        name = get_asset_name(url, script_root)
+        if not exporter.has(name):
+            with open(path, 'rb') as asset:
+                content = asset.read()
+            if name.endswith('.css'):
+                # Mark it first, in case it references itself.
+                exporter.files[name] = None
+                content = export_css(content.decode('utf-8'), url, name)
+                content = content.encode('utf-8')
+            exporter.write(name, content)
+        base = posixpath.dirname(referrer)
+        suffix = url[len(url.split('?')[0].split('#')[0]):]
+        return posixpath.relpath(name, base or '.') + suffix
+
+    def export_css(css, url, name):
+        def replace(match):
+            quote, ref = match.groups()
+            return 'url({0}{1}{0})'.format(quote, export_url(ref, name))
+        return assets.CSS_URL_RE.sub(
+            replace, assets.rebase_css_urls(css, url))
+
+    def replace(match):
+        attr, quote, url = match.groups()
+        return '{0}{1}{2}{1}'.format(attr, quote, export_url(url, ''))
+    return HTML_URL_RE.sub(replace, html)
@@ -194,8 +194,22 @@ def make_fake_chart_data(**kwargs):
               is_flag=True,
               default=False,
               help='Determine if the database records should be deleted')
-def insert_dashboards(records, max_charts, fixtures, dump, delete):
+@click.option('--backfill',
+              is_flag=True,
+              default=False,
+              help='Populate summary fields (module count, families) '
+                   'on existing records.')
+@click.option('--indexes',
+              is_flag=True,
+              default=False,
+              help='Create all database indexes, if they do not exist.')
+def insert_dashboards(records, max_charts, fixtures, dump, delete, backfill,
+                      indexes):
     """Insert a number of dashboard records into the database."""
+    if indexes:
+        return ensure_indexes()
+    if backfill:
+        return backfill_summaries()
     if fixtures is not None:
         return load_fixtures(fixtures)
     if dump is not None:
@@ -211,6 +225,18 @@ def insert_dashboards(records, max_charts, fixtures, dump, delete):
         adapter.create(data=data)
 
 
+def ensure_indexes():
+    """Create all database indexes for existing deployments."""
+    for name in adapter.ensure_indexes():
+        click.echo('Ensured index: ' + name)
+
+
+def backfill_summaries():
+    """Add summary fields to all existing dashboards that lack them."""
+    updated = adapter.backfill_summaries()
+    click.echo('Backfilled summaries for {} dashboard(s).'.format(updated))
+
+
 def delete_all():
     """Delete all dashboards."""
     adapter.delete_all()
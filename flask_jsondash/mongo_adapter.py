@@ -10,13 +10,64 @@ Adapters for various storage engines.
 :license: MIT, see LICENSE for more details.
 """
 
+import copy
 from datetime import datetime as dt
 
+# The only fields needed to list dashboards (e.g. the index page).
+SUMMARY_PROJECTION = {
+    '_id': 0,
+    'id': 1,
+    'name': 1,
+    'category': 1,
+    'created_by': 1,
+    'date': 1,
+    'module_count': 1,
+    'families': 1,
+}
+# The fields needed to check if a record has changed.
+VERSION_PROJECTION = {
+    '_id': 0,
+    'id': 1,
+    'date': 1,
+    'created_by': 1,
+}
+
+# All indexes for the collection, as (keys, options) 2-tuples.
+INDEXES = [
+    # Single record lookups for read/update/delete.
+    ([('id', 1)], dict(unique=True)),
+    # Filtering by user (`JSONDASH_FILTERUSERS`).
+    ([('created_by', 1), ('date', -1)], dict()),
+    # The paginated index page sort, with and without user filtering.
+    ([('category', 1), ('name', 1)], dict()),
+    ([('created_by', 1), ('category', 1), ('name', 1)], dict()),
+]
+
+
+def summarize(modules):
+    """Get the denormalized summary fields for a list of modules.
+
+    These are stored alongside each record so that listing dashboards
+    never requires loading every module.
+
+    Args:
+        modules (list): The list of module dicts for a dashboard.
+
+    Returns:
+        dict: The `module_count` and sorted, unique `families` values.
+    """
+    modules = modules or []
+    families = set([
+        m.get('family') for m in modules
+        if isinstance(m, dict) and m.get('family') is not None
+    ])
+    return dict(module_count=len(modules), families=sorted(families))
+
 
 class Db(object):
     """Adapter for all mongo operations."""
 
-    def __init__(self, client, conn, coll, formatter):
+    def __init__(self, client, conn, coll, formatter, cache=None):
         """Setup connection.
 
         Args:
@@ -25,26 +76,126 @@ class Db(object):
             coll (str): The collection name.
             formatter (function): A formatter function to use when formatting
                 chart data.
+            cache (None, optional): A `cache.LRUCache` to cache single
+                record reads in. Writes through this adapter invalidate it.
         """
         self.client = client
         self.conn = conn
         self.coll = coll
         self.formatter = formatter
+        self.cache = cache
+
+    def ensure_indexes(self):
+        """Create all indexes, if they don't already exist.
+
+        Returns:
+            list: The names of all ensured indexes.
+        """
+        return [
+            self.coll.create_index(keys, **options)
+            for keys, options in INDEXES
+        ]
 
     def count(self, **kwargs):
-        """Standard db count."""
+        """Standard db count.
+
+        Args:
+            filter (dict, optional): A query to restrict the count to.
+        """
         return self.coll.count(**kwargs)
 
+    def distinct(self, key, **kwargs):
+        """Get all distinct values for a key, without loading records."""
+        return self.coll.distinct(key, **kwargs)
+
     def filter(self, *args, **kwargs):
         """Separeately allow more nuanced filtering specific to mongo."""
         return self.coll.find(*args, **kwargs)
 
     def read(self, **kwargs):
-        """Read a record."""
+        """Read a record, or a cursor over many records.
+
+        When no `c_id` is given, all remaining kwargs are passed through
+        to the underlying find, so paging and sorting happen in the
+        database rather than in python.
+
+        Args:
+            c_id (str, optional): The id of a single record to read.
+            filter (dict, optional): A query to filter records by.
+            skip (int, optional): The number of records to skip.
+            limit (int, optional): The maximum number of records to return.
+            sort (list, optional): A list of (key, direction) 2-tuples.
+        """
         if kwargs.get('c_id') is None:
+            kwargs.pop('c_id', None)
             return self.coll.find(**kwargs)
+        c_id = kwargs.pop('c_id')
+        if self.cache is None:
+            return self.coll.find_one(dict(id=c_id))
+        return self._read_cached(c_id)
+
+    def _read_cached(self, c_id):
+        """Read a single record through the cache.
+
+        If the cache is set to revalidate, only the record date is
+        fetched first, and a cached record with a different date is
+        ignored. This keeps multiple processes consistent.
+        """
+        version = None
+        if self.cache.revalidate:
+            stamp = self.coll.find_one(dict(id=c_id), {'_id': 0, 'date': 1})
+            if stamp is None:
+                self.cache.delete(c_id)
+                return None
+            version = stamp.get('date')
+        record = self.cache.get(c_id, version=version)
+        if record is None:
+            record = self.coll.find_one(dict(id=c_id))
+            if record is None:
+                return None
+            self.cache.set(c_id, copy.deepcopy(record),
+                           version=record.get('date'))
+            return record
+        # Callers are free to modify what they get back.
+        return copy.deepcopy(record)
+
+    def _invalidate(self, c_id=None):
+        """Remove one record (or all, if no id is given) from the cache."""
+        if self.cache is None:
+            return
+        if c_id is None:
+            self.cache.clear()
         else:
-            return self.coll.find_one(dict(id=kwargs.pop('c_id')))
+            self.cache.delete(c_id)
+
+    def read_version(self, c_id):
+        """Read only the fields that identify a version of a record.
+
+        If the record is cached (and the cache isn't set to revalidate),
+        the fields are read from the cache instead.
+
+        Args:
+            c_id (str): The records id.
+
+        Returns:
+            dict: The id, date and created_by fields, or None if not found.
+        """
+        if self.cache is not None and not self.cache.revalidate:
+            record = self.cache.get(c_id)
+            if record is not None:
+                return dict(
+                    (key, record[key]) for key, wanted in
+                    VERSION_PROJECTION.items() if wanted and key in record)
+        return self.coll.find_one(dict(id=c_id), VERSION_PROJECTION)
+
+    def read_summary(self, **kwargs):
+        """Read records with only the fields needed to list them.
+
+        Takes the same kwargs as `read` (filter, skip, limit, sort),
+        but never transfers the (potentially very large) modules.
+        """
+        kwargs.pop('c_id', None)
+        return self.coll.find(projection=SUMMARY_PROJECTION, **kwargs)
 
     def update(self, c_id, data=None, fmt_charts=True):
         """Update a record.
@@ -67,7 +218,9 @@ class Db(object):
             }
         }
         save_conf['$set'].update(**data)
+        save_conf['$set'].update(**summarize(charts))
         self.coll.update(dict(id=c_id), save_conf)
+        self._invalidate(c_id)
 
     def create(self, data=None):
         """Add a new record.
@@ -77,7 +230,9 @@ class Db(object):
         """
         if data is None:
             return
+        data.update(**summarize(data.get('modules')))
         self.coll.insert(data)
+        self._invalidate(data.get('id'))
 
     def delete(self, c_id):
         """Delete a record.
@@ -86,6 +241,23 @@ class Db(object):
             c_id (int): The records id.
         """
         self.coll.delete_one(dict(id=c_id))
+        self._invalidate(c_id)
+
+    def backfill_summaries(self):
+        """Populate the summary fields for records that are missing them.
+
+        Returns:
+            int: The number of records updated.
+        """
+        query = {'module_count': {'$exists': False}}
+        updated = 0
+        for record in self.coll.find(query, {'id': 1, 'modules': 1}):
+            self.coll.update_one(
+                dict(_id=record['_id']),
+                {'$set': summarize(record.get('modules'))})
+            updated += 1
+        self._invalidate()
+        return updated
 
     def delete_all(self):
         """Delete ALL records. Separated function for safety.
@@ -93,3 +265,4 @@ class Db(object):
         This should never be used for production.
         """
         self.coll.remove()
+        self._invalidate()
@@ -0,0 +1,405 @@
+# -*- coding: utf-8 -*-
+
+"""
+flask_jsondash.prewarm
+~~~~~~~~~~~~~~~~~~~~~~
+
+Fetch the data of dashboards ahead of time (e.g. before business hours),
+so the first viewers don't wait on cold upstream caches.
+
+Run daily from within the app, with the `prewarm` config, or from the
+command line (e.g. from cron), which also reports on the latency of each
+dataSource, e.g.:
+
+    python -m flask_jsondash.prewarm --category sales --cache-dir /tmp/c
+
+The command line runs in its own process, so it only fills the cache of
+the app if they share a `cache_dir` (see `data_proxy.SharedCache`).
+
+:copyright: (c) 2016 by Chris Tabor.
+:license: MIT, see LICENSE for more details.
+"""
+
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime as dt
+from datetime import timedelta
+
+import click
+import requests
+from werkzeug.urls import url_join
+
+from flask_jsondash import data_proxy
+from flask_jsondash import db
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+Result = namedtuple(
+    'Result', 'dashboard guid name url status latency size error')
+
+
+def get_dashboards(adapter, ids=None, categories=None):
+    """Get the dashboards to pre-warm.
+
+    Args:
+        adapter (Db): The database adapter.
+        ids (list, optional): The ids of dashboards to include.
+        categories (list, optional): The categories of dashboards
+            to include.
+
+    Returns:
+        list: The dashboards, in the order given (ids first).
+    """
+    dashboards = []
+    for c_id in ids or []:
+        dashboard = adapter.read(c_id=c_id)
+        if dashboard is not None:
+            dashboards.append(dashboard)
+    if categories:
+        seen = set(dashboard.get('id') for dashboard in dashboards)
+        for dashboard in adapter.read(
+                filter=dict(category={'$in': list(categories)})):
+            if dashboard.get('id') not in seen:
+                dashboards.append(dashboard)
+    return dashboards
+
+
+def get_modules(dashboards, url_root=None):
+    """Get all modules that have data to fetch, and their urls.
+
+    Args:
+        dashboards (list): The dashboards.
+        url_root (str, optional): The root url of the app, which relative
+            dataSources (e.g. on the same app) are joined to.
+
+    Returns:
+        list: A (dashboard id, module, url) tuple for each module.
+    """
+    modules = []
+    for dashboard in dashboards:
+        for module in dashboard.get('modules', []):
+            if module.get('family') == 'Basic' or not module.get(
+                    'dataSource'):
+                continue
+            url = data_proxy.get_url(module['dataSource'])
+            if url_root is not None:
+                url = url_join(url_root, url)
+            modules.append((dashboard.get('id'), module, url))
+    return modules
+
+
+def fetch_urls(proxy, urls, workers=4):
+    """Fetch many urls concurrently, bypassing any cached responses.
+
+    Args:
+        proxy (DataProxy): The proxy to fetch through and cache in.
+        urls (dict): The seconds to cache each url for, keyed by url.
+        workers (int, optional): The max number of urls to fetch at once.
+
+    Returns:
+        dict: The Payload (or None), request error (or None) and the
+            seconds it took, keyed by url.
+    """
+    def fetch(url):
+        start = time.time()
+        try:
+            payload, error = proxy.refresh(url, ttl=urls[url]), None
+        except requests.RequestException as exc:
+            payload, error = None, exc
+        return payload, error, time.time() - start
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = dict((url, pool.submit(fetch, url)) for url in urls)
+        return dict((url, future.result()) for url, future in futures.items())
+
+
+def prewarm(proxy, dashboards, workers=4, url_root=None):
+    """Fetch the data of all modules of some dashboards into the proxy cache.
+
+    Each unique url is fetched once, concurrently, bypassing any cached
+    response. Modules sharing a url share its result.
+
+    Responses are cached for their usual ttl (see `DataProxy.get_ttl`).
+
+    Args:
+        proxy (DataProxy): The proxy to fetch through and cache in.
+        dashboards (list): The dashboards.
+        workers (int, optional): The max number of urls to fetch at once.
+        url_root (str, optional): The root url for relative dataSources.
+
+    Returns:
+        list: A Result for each module, with the response status, the
+            seconds it took and its size in bytes, or the request error.
+    """
+    modules = get_modules(dashboards, url_root=url_root)
+    ttls = dict()
+    for _, module, url in modules:
+        ttl = proxy.get_ttl(module)
+        ttls[url] = min(ttl, ttls.get(url, ttl))
+    fetched = fetch_urls(proxy, ttls, workers=workers)
+    results = []
+    for c_id, module, url in modules:
+        payload, error, latency = fetched[url]
+        results.append(Result(
+            dashboard=c_id,
+            guid=module.get('guid'),
+            name=module.get('name'),
+            url=url,
+            status=None if payload is None else payload.status,
+            latency=latency,
+            size=None if payload is None else len(payload.content),
+            error=None if error is None else (
+                str(error) or error.__class__.__name__),
+        ))
+    return results
+
+
+def report(results):
+    """Format prewarm results as a table, slowest first.
+
+    Args:
+        results (list): The results, from `prewarm`.
+
+    Returns:
+        str: The report, with a line per module and a summary.
+    """
+    lines = ['{:>8}  {:>10}  {:>6}  {}'.format(
+        'ms', 'bytes', 'status', 'dashboard / module (url)')]
+    for res in sorted(results, key=lambda res: res.latency, reverse=True):
+        lines.append('{:>8.0f}  {:>10}  {:>6}  {} / {} ({}){}'.format(
+            res.latency * 1000,
+            '-' if res.size is None else res.size,
+            res.status or 'error',
+            res.dashboard, res.name or res.guid, res.url,
+            '' if res.error is None else ': ' + res.error))
+    failed = len([res for res in results if res.status != 200])
+    lines.append('{} module(s), {} url(s), {} failed, {} bytes.'.format(
+        len(results), len(set(res.url for res in results)), failed,
+        sum(res.size or 0 for res in results)))
+    return '\n'.join(lines)
+
+
+def parse_time(value):
+    """Parse a time of day, e.g. `07:30`, to a (hour, minute) tuple."""
+    parsed = dt.strptime(value, '%H:%M')
+    return parsed.hour, parsed.minute
+
+
+def get_next_run(times, now):
+    """Get the next time to run at.
+
+    Args:
+        times (list): The (hour, minute) times of day to run at.
+        now (datetime): The current (local) time.
+
+    Returns:
+        datetime: The next time after now.
+    """
+    runs = []
+    for hour, minute in times:
+        run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if run <= now:
+            run += timedelta(days=1)
+        runs.append(run)
+    return min(runs)
+
+
+class PrewarmScheduler(object):
+    """Pre-warms dashboards at set times of day, in a background thread.
+
+    Until a set time of day (e.g. the end of business hours), the data is
+    pre-warmed again just before it expires, so it stays cached and
+    current.
+
+    If the proxy has a shared cache (see `data_proxy.SharedCache`), only
+    one of the processes using it runs, which holds a lock file in its
+    folder. Otherwise each process warms its own cache.
+    """
+
+    def __init__(self, proxy, adapter, times, url_root, until=None,
+                 dashboards=None, categories=None, workers=4, logger=None):
+        """Setup the scheduler.
+
+        Args:
+            proxy (DataProxy): The proxy to fetch through and cache in.
+            adapter (Db): The database adapter to read dashboards from.
+            times (list): The times of day to run at (e.g. `['07:30']`),
+                in local time.
+            url_root (str): The root url of the app, for relative
+                dataSources. It must match the url dashboards are viewed
+                on, so they use the same cached data.
+            until (str, optional): The time of day to keep the data
+                warm until (e.g. `'18:00'`), in local time.
+            dashboards (list, optional): The ids of dashboards to pre-warm.
+            categories (list, optional): The categories of dashboards
+                to pre-warm.
+            workers (int, optional): The max number of urls to fetch at once.
+            logger (Logger, optional): A logger for the report of each run.
+
+        Raises:
+            ValueError: If any time is invalid, or if there is no url root.
+        """
+        if not url_root:
+            raise ValueError('A url root is required.')
+        self.proxy = proxy
+        self.adapter = adapter
+        self.times = [parse_time(value) for value in times]
+        self.url_root = url_root
+        self.until = None if until is None else parse_time(until)
+        self.dashboards = dashboards
+        self.categories = categories
+        self.workers = workers
+        self.logger = logger
+        self.last_results = None
+        self.lock = None
+        if proxy.shared is not None and fcntl is not None:
+            self.lock = os.path.join(proxy.shared.path, 'prewarm.lock')
+        self._lock_file = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def get_interval(self):
+        """Get the seconds between runs while the data is kept warm,
+        which is just under the ttl of the cache (or None if it never
+        expires)."""
+        ttl = self.proxy.cache.ttl
+        return None if ttl is None else max(ttl * 0.9, 1)
+
+    def is_warm_time(self, now):
+        """Check if the data is kept warm at a time, i.e. if it is
+        between one of the run times and the `until` time."""
+        if self.until is None:
+            return False
+        for hour, minute in self.times:
+            start = now.replace(
+                hour=hour, minute=minute, second=0, microsecond=0)
+            if start > now:
+                start -= timedelta(days=1)
+            if now < get_next_run([self.until], start):
+                return True
+        return False
+
+    def get_next_run(self, now):
+        """Get the next time to run at, after now."""
+        run = get_next_run(self.times, now)
+        interval = self.get_interval()
+        if interval is not None and self.is_warm_time(now):
+            run = min(run, now + timedelta(seconds=interval))
+        return run
+
+    def acquire_lock(self):
+        """Take the lock file, if any, for as long as this process runs.
+
+        Returns:
+            bool: If this process holds the lock (or there is none).
+        """
+        if self.lock is None or self._lock_file is not None:
+            return True
+        lock_file = open(self.lock, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except (IOError, OSError):
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def release_lock(self):
+        """Release the lock file, if held."""
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+    def run(self):
+        """Pre-warm all configured dashboards now.
+
+        Returns:
+            list: The results, from `prewarm`.
+        """
+        dashboards = get_dashboards(
+            self.adapter, ids=self.dashboards, categories=self.categories)
+        self.last_results = prewarm(
+            self.proxy, dashboards, workers=self.workers,
+            url_root=self.url_root)
+        if self.logger is not None:
+            self.logger.info('Pre-warmed dashboard data:\n%s',
+                             report(self.last_results))
+        return self.last_results
+
+    def start(self):
+        """Start the background thread, if it isn't running already.
+
+        It's started on the first request (not when the app is setup),
+        so it runs in each worker process of a pre-forking server.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background thread after the current run, and release
+        the lock file."""
+        self._stop.set()
+        self.release_lock()
+
+    def _run(self):
+        while True:
+            now = dt.now()
+            wait = (self.get_next_run(now) - now).total_seconds()
+            if self._stop.wait(wait):
+                return
+            # Another process runs it, if it holds the lock.
+            if not self.acquire_lock():
+                continue
+            try:
+                self.run()
+            except Exception:
+                if self.logger is not None:
+                    self.logger.exception('Could not pre-warm dashboards.')
+
+
+@click.command()
+@click.option('--dashboard', 'ids', multiple=True,
+              help='The id of a dashboard to pre-warm (can be repeated).')
+@click.option('--category', 'categories', multiple=True,
+              help='A category of dashboards to pre-warm (can be repeated).')
+@click.option('--workers', default=4,
+              help='The max number of dataSources to fetch at once.')
+@click.option('--timeout', default=10,
+              help='The seconds to wait for each dataSource.')
+@click.option('--url-root', default=None,
+              help='The root url of the app, for relative dataSources '
+                   '(e.g. http://localhost:8080/).')
+@click.option('--cache-dir', default=None,
+              help='The `cache_dir` of the data proxy of the app, to fill '
+                   'its shared cache.')
+@click.option('--ttl', default=60,
+              help='The default seconds to cache data for.')
+def prewarm_dashboards(ids, categories, workers, timeout, url_root,
+                       cache_dir, ttl):
+    """Fetch the data of dashboards, and report latency and size.
+
+    The data is only used by the app if it's stored in the same shared
+    cache (with `--cache-dir`); otherwise, only upstream caches (e.g. of
+    your own endpoints) are warmed.
+    """
+    if not ids and not categories:
+        raise click.UsageError('Give at least one --dashboard or --category.')
+    dashboards = get_dashboards(
+        db.get_db_handler(), ids=ids, categories=categories)
+    proxy = data_proxy.DataProxy(
+        timeout=timeout, ttl=ttl, workers=workers, cache_dir=cache_dir)
+    click.echo(report(prewarm(
+        proxy, dashboards, workers=workers, url_root=url_root)))
+
+
+if __name__ == '__main__':
+    prewarm_dashboards()
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+"""
+flask_jsondash.scheduler
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+A central scheduler for refreshing module data, so each refreshing
+dataSource is polled once per interval for all viewers, and changes are
+pushed to them.
+
+:copyright: (c) 2016 by Chris Tabor.
+:license: MIT, see LICENSE for more details.
+"""
+
+import threading
+import time
+
+import requests
+
+try:
+    from queue import Empty, Queue
+except ImportError:
+    from Queue import Empty, Queue
+
+
+class Subscription(object):
+    """The refreshed data for a set of urls, for a single subscriber."""
+
+    def __init__(self, intervals):
+        """Setup the subscription.
+
+        Args:
+            intervals (dict): The seconds between refreshes, keyed by url.
+        """
+        self.intervals = intervals
+        self._queue = Queue()
+
+    def put(self, result):
+        """Add a refreshed (url, payload, error) result."""
+        self._queue.put(result)
+
+    def get(self, timeout=None):
+        """Get the next refreshed (url, payload, error) result.
+
+        Args:
+            timeout (None, optional): The seconds to wait for a result.
+
+        Returns:
+            tuple: The result, or None if there was none before the timeout.
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except Empty:
+            return None
+
+
+class Job(object):
+    """A url being refreshed for one or more subscriptions."""
+
+    def __init__(self, url, next_run, last=None):
+        self.url = url
+        self.next_run = next_run
+        # The last content sent to subscribers.
+        self.last = last
+        self.subscriptions = set()
+
+    @property
+    def interval(self):
+        """The shortest interval of all subscriptions."""
+        return min(sub.intervals[self.url] for sub in self.subscriptions)
+
+
+class RefreshScheduler(object):
+    """Refreshes urls through a `DataProxy` while anyone is subscribed.
+
+    Urls are polled by a single background thread, and fetched in the
+    proxy's thread pool. Results are only sent to subscribers if they
+    changed since the last time.
+    """
+
+    def __init__(self, proxy, min_interval=1, keepalive=15):
+        """Setup the scheduler.
+
+        Args:
+            proxy (DataProxy): The proxy to fetch (and cache) data with.
+            min_interval (int, optional): The min seconds between refreshes.
+            keepalive (int, optional): The seconds between keepalive
+                messages to subscribers when nothing has changed.
+        """
+        self.proxy = proxy
+        self.min_interval = min_interval
+        self.keepalive = keepalive
+        self._jobs = dict()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def subscribe(self, intervals):
+        """Start refreshing a set of urls for a new subscriber.
+
+        Args:
+            intervals (dict): The seconds between refreshes, keyed by url.
+
+        Returns:
+            Subscription: The subscription to get results from.
+        """
+        sub = Subscription(dict(
+            (url, max(interval, self.min_interval))
+            for url, interval in intervals.items()))
+        with self._cond:
+            for url, interval in sub.intervals.items():
+                job = self._jobs.get(url)
+                if job is None:
+                    # The subscriber was just sent the cached data, if any.
+                    cached = self.proxy.cache.get(url)
+                    job = self._jobs[url] = Job(
+                        url, time.time() + interval,
+                        last=None if cached is None else cached.content)
+                job.subscriptions.add(sub)
+                job.next_run = min(job.next_run, time.time() + interval)
+            self.start()
+            self._cond.notify()
+        return sub
+
+    def unsubscribe(self, sub):
+        """Stop refreshing for a subscriber.
+
+        Urls are no longer refreshed once nobody is subscribed to them.
+        """
+        with self._cond:
+            for url in sub.intervals:
+                job = self._jobs.get(url)
+                if job is None:
+                    continue
+                job.subscriptions.discard(sub)
+                if not job.subscriptions:
+                    del self._jobs[url]
+
+    def start(self):
+        """Start the background thread, if it isn't running already."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def run_pending(self, now=None):
+        """Start refreshing all urls that are due.
+
+        Args:
+            now (None, optional): The current timestamp.
+
+        Returns:
+            list: The futures of all started refreshes.
+        """
+        now = time.time() if now is None else now
+        with self._cond:
+            due = [job for job in self._jobs.values() if job.next_run <= now]
+            intervals = [job.interval for job in due]
+            for job, interval in zip(due, intervals):
+                job.next_run = now + interval
+        return [self.proxy.executor.submit(self.refresh, job, interval)
+                for job, interval in zip(due, intervals)]
+
+    def refresh(self, job, ttl=None):
+        """Refresh a url and send it to all subscribers, if it changed.
+
+        Args:
+            job (Job): The job for the url.
+            ttl (None, optional): The seconds to cache the response for.
+        """
+        try:
+            payload, error = self.proxy.refresh(job.url, ttl=ttl), None
+            content = payload.content
+        except requests.RequestException as exc:
+            payload, error = None, exc
+            content = str(exc)
+        with self._cond:
+            if content == job.last:
+                return
+            job.last = content
+            subscriptions = list(job.subscriptions)
+        for sub in subscriptions:
+            sub.put((job.url, payload, error))
+
+    def _run(self):
+        while True:
+            self.run_pending()
+            with self._cond:
+                if not self._jobs:
+                    self._cond.wait()
+                    continue
+                wait = min(job.next_run for job in self._jobs.values())
+                wait -= time.time()
+                if wait > 0:
+                    self._cond.wait(wait)
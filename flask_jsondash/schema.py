@@ -132,8 +132,8 @@ CHART_SCHEMA = {
             # useful to enforce a truly globally unique id,
             # especially for usage with the js API.
             'regex': (
-                '[a-zA-Z0-9]+-[a-zA-Z0-9]+-'
-                '[a-zA-Z0-9]+-[a-zA-Z0-9]+-[a-zA-Z0-9]+'
+                '^[a-zA-Z0-9]+-[a-zA-Z0-9]+-'
+                '[a-zA-Z0-9]+-[a-zA-Z0-9]+-[a-zA-Z0-9]+$'
             ),
         },
         'order': {
@@ -154,6 +154,47 @@ CHART_SCHEMA = {
             'type': 'number',
             'nullable': True,
         },
+        'timeout': {
+            'type': 'number',
+            'min': 1,
+            'nullable': True,
+        },
+        'latencyBudget': {
+            'type': 'number',
+            'min': 0,
+            'nullable': True,
+        },
+        'delta': {
+            'type': 'boolean',
+            'nullable': True,
+        },
+        'downsample': {
+            'anyof': [
+                {'type': 'boolean'},
+                {'type': 'number'},
+            ],
+            'nullable': True,
+        },
+        'columnar': {
+            'type': 'boolean',
+            'nullable': True,
+        },
+        'serverSide': {
+            'type': 'boolean',
+            'nullable': True,
+        },
+        'bins': {
+            'anyof': [
+                {'type': 'number', 'min': 1},
+                {
+                    'type': 'list',
+                    'minlength': 2,
+                    'maxlength': 2,
+                    'schema': {'type': 'number', 'min': 1},
+                },
+            ],
+            'nullable': True,
+        },
         'height': {
             'type': 'number',
             'required': True,
@@ -220,6 +261,22 @@ DASHBOARD_SCHEMA = {
         'type': 'string',
         'required': False,
     },
+    'proxy': {
+        'type': 'boolean',
+        'required': False,
+    },
+    'snapshot': {
+        'type': 'dict',
+        'required': False,
+        'schema': {
+            'source': {'type': 'string'},
+            'date': {'type': 'string'},
+            'data': {
+                'type': 'dict',
+                'valueschema': {'type': 'string', 'regex': '[0-9a-f]{64}'},
+            },
+        },
+    },
     'modules': {
         'type': 'list',
         'schema': CHART_SCHEMA,
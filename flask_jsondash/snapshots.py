@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+"""
+flask_jsondash.snapshots
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+Frozen copies of dashboard data, so a snapshot of a dashboard can be
+shown without requesting any of its dataSources.
+
+Payloads are stored compressed, by the sha256 of their content, so
+identical payloads (across modules and snapshots) are only stored once.
+
+:copyright: (c) 2016 by Chris Tabor.
+:license: MIT, see LICENSE for more details.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import zlib
+
+from flask_jsondash import cache
+
+DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def is_json(content):
+    """Check if a payload is valid json."""
+    try:
+        json.loads(content.decode('utf-8'))
+    except ValueError:
+        return False
+    return True
+
+
+class SnapshotStore(object):
+    """A content-addressed store of compressed payloads, on disk."""
+
+    def __init__(self, path, level=6, maxsize=32):
+        """Setup the store.
+
+        Args:
+            path (str): The folder to store payloads in.
+                It's created if it doesn't exist.
+            level (int, optional): The zlib compression level.
+            maxsize (int, optional): The max number of snapshots to keep
+                the inlined data of in memory.
+        """
+        self.path = path
+        self.level = level
+        # Snapshots never change, so their inlined data never expires.
+        self.cache = cache.LRUCache(maxsize=maxsize, ttl=None)
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def get_path(self, digest):
+        """Get the file path of a payload.
+
+        Raises:
+            ValueError: If the digest is invalid.
+        """
+        if not DIGEST_RE.match(digest or ''):
+            raise ValueError('Invalid digest: {}'.format(digest))
+        return os.path.join(self.path, digest[:2], digest[2:] + '.z')
+
+    def put(self, content):
+        """Store a payload, unless it's already stored.
+
+        Args:
+            content (bytes): The payload.
+
+        Returns:
+            str: The digest to get the payload with.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.get_path(digest)
+        if os.path.exists(path):
+            return digest
+        folder = os.path.dirname(path)
+        if not os.path.isdir(folder):
+            try:
+                os.makedirs(folder)
+            except OSError:
+                # Created by another thread or process.
+                pass
+        # Write to a temp file first, so a partial file is never read.
+        fd, tmp = tempfile.mkstemp(dir=folder)
+        with os.fdopen(fd, 'wb') as tmpfile:
+            tmpfile.write(zlib.compress(content, self.level))
+        os.rename(tmp, path)
+        return digest
+
+    def get(self, digest):
+        """Get a payload.
+
+        Args:
+            digest (str): The digest, from `put`.
+
+        Returns:
+            bytes: The payload, or None if it isn't stored.
+        """
+        try:
+            with open(self.get_path(digest), 'rb') as payload:
+                return zlib.decompress(payload.read())
+        except (IOError, OSError, ValueError):
+            return None
+
+    def get_inline_data(self, snapshot):
+        """Get the data of all modules in a snapshot, to inline in a page.
+
+        Args:
+            snapshot (dict): The `snapshot` of a dashboard, with the
+                digest of each module's payload in `data`, keyed by guid.
+
+        Returns:
+            str: A json object of the data, keyed by guid, which is safe
+                to use in a script tag. Missing payloads are left out.
+        """
+        digests = snapshot.get('data') or dict()
+        key = tuple(sorted(digests.items()))
+        inlined = self.cache.get(key)
+        if inlined is not None:
+            return inlined
+        items = []
+        for guid, digest in sorted(digests.items()):
+            content = self.get(digest)
+            if content is None:
+                continue
+            # The payloads are already json, so they are joined as is.
+            items.append('{}: {}'.format(
+                json.dumps(guid), content.decode('utf-8')))
+        # `<` only occurs in json strings, where it can be escaped, so
+        # the data can't close the script tag.
+        inlined = '{' + ', '.join(items) + '}'
+        inlined = inlined.replace('<', '\\u003c')
+        self.cache.set(key, inlined)
+        return inlined
@@ -28,6 +28,14 @@ var jsondash = function() {
     var UPDATE_FORM_BTN  = $('#update-module');
     var CHART_TEMPLATE   = $('#chart-template');
     var ROW_TEMPLATE     = $('#row-template').find('.grid-row');
+    var PROXY_URL        = VIEW_BUILDER.data('proxy-url');
+    var BATCH_URL        = VIEW_BUILDER.data('batch-url');
+    var EVENTS_URL       = VIEW_BUILDER.data('events-url');
+    var CIRCUITS_URL     = VIEW_BUILDER.data('circuits-url');
+    // The data of all modules, for snapshots of a dashboard.
+    var SNAPSHOT_DATA    = $('#snapshot-data').length ? JSON.parse($('#snapshot-data').text()) : null;
+    // The saved dataSource of each module, used to check if a module can be proxied.
+    var saved_sources    = {};
     var EVENTS           = {
         init:             'jsondash.init',
         edit_form_loaded: 'jsondash.editform.loaded',
@@ -100,55 +108,152 @@ var jsondash = function() {
             return props;
         };
         /**
-         * [loadAll Load all widgets at once in succession]
+         * [loadCached Load a widget with data that was already fetched.]
+         */
+        self.loadCached = function(widg, data) {
+            // Grab data from specific `key` key, if it exists (for shared data on a single endpoint).
+            var cachedData = widg.config.key && data && data.multicharts ? data.multicharts[widg.config.key] : data;
+            // Don't refresh, just update config with new key value for cached data.
+            widg.update({cachedData: cachedData}, true);
+            widg.load();
+        };
+        /**
+         * [loadAll Load all widgets, rendering each one as soon as its data arrives.
+         * Each unique url is only requested once, with at most `config.MAX_REQUESTS` in flight,
+         * and a failed request only affects the widgets using it.]
          */
         self.loadAll = function() {
-            // Don't run this on certain types that are not cacheable (e.g. binary, html)
-            var config_urls = self.getAllOfPropUnless('dataSource', 'family', 'Basic');
-            var unique_urls = d3.set(config_urls).values();
-            var cached = {};
-            var proms = [];
-            // Build out promises.
-            $.each(unique_urls, function(_, url){
-                var req = $.ajax({
+            if(SNAPSHOT_DATA) {
+                return self.loadSnapshot();
+            }
+            if(BATCH_URL) {
+                return self.loadStreamed();
+            }
+            // The guids of all widgets using each url.
+            var url_guids = {};
+            var queue = [];
+            $.each(self.all(), function(guid, widg){
+                // Don't run this on certain types that are not cacheable (e.g. binary, html),
+                // or that only request a page of their data, or request it in the columnar format.
+                if(widg.config.family === 'Basic' || isPaged(widg.config) || widg.config.columnar) {
+                    return widg.load();
+                }
+                var url = getDataURL(widg.config);
+                if(!url_guids[url]) {
+                    url_guids[url] = [];
+                    queue.push(url);
+                }
+                url_guids[url].push(guid);
+            });
+
+            function next() {
+                var url = queue.shift();
+                if(url === undefined) {
+                    return;
+                }
+                $.ajax({
                     url: url,
                     type: 'GET',
-                    dataType: 'json',
-                    error: function(error){
-                        var matches = self.getAllMatchingProp('dataSource', url);
-                        $.each(matches, function(_, guid){
-                            var widg = self.get(guid);
-                            jsondash.handleRes(error, null, widg.el);
-                        });
+                    dataType: 'json'
+                })
+                .done(function(data){
+                    $.each(url_guids[url], function(_, guid){
+                        self.loadCached(self.get(guid), data);
+                    });
+                })
+                .fail(function(error){
+                    $.each(url_guids[url], function(_, guid){
+                        jsondash.handleRes(error, null, self.get(guid).el);
+                    });
+                })
+                .always(next);
+            }
+
+            var max_requests = Math.max(my.config.MAX_REQUESTS, 1);
+            for(var i = 0; i < max_requests && queue.length; i++) {
+                next();
+            }
+        };
+        /**
+         * [loadSnapshot Load all widgets with the data inlined in the page,
+         * except any that aren't in the snapshot.]
+         */
+        self.loadSnapshot = function() {
+            $.each(self.all(), function(guid, widg){
+                if(SNAPSHOT_DATA.hasOwnProperty(guid)) {
+                    self.loadCached(widg, SNAPSHOT_DATA[guid]);
+                } else {
+                    widg.load();
+                }
+            });
+        };
+        /**
+         * [loadStreamed Load all widgets from a single batch request,
+         * rendering each as soon as its data arrives (one json object per line).
+         * Anything missing from the batch is loaded on its own afterwards.]
+         */
+        self.loadStreamed = function() {
+            var pending = {};
+            var parsed = 0;
+            $.each(self.all(), function(guid, widg){
+                if(widg.config.family === 'Basic' || !widg.config.dataSource || isPaged(widg.config) ||
+                    widg.config.columnar) {
+                    widg.load();
+                } else {
+                    pending[guid] = widg;
+                }
+            });
+
+            function loadLine(line) {
+                var res = JSON.parse(line);
+                $.each(res.guids, function(_, guid){
+                    var widg = pending[guid];
+                    if(!widg) {
+                        return;
+                    }
+                    delete pending[guid];
+                    if(res.status !== 200) {
+                        return jsondash.handleRes(res, null, widg.el);
                     }
+                    self.loadCached(widg, res.data);
                 });
-                proms.push(req);
-            });
-            // Retrieve and gather the promises
-            $.when.apply($, proms).done(whenAllDone);
-
-            function whenAllDone() {
-                $.each(arguments, function(index, prom){
-                    var ref_url = unique_urls[index];
-                    var data = null;
-                    if(ref_url) {
-                        data = prom[0];
-                        cached[ref_url] = data;
+            }
+
+            function parseLines(text) {
+                // Only parse complete lines, the last one may still be arriving.
+                var end = text.lastIndexOf('\n');
+                if(end < parsed) {
+                    return;
+                }
+                $.each(text.substring(parsed, end).split('\n'), function(_, line){
+                    if(line) {
+                        loadLine(line);
                     }
                 });
-                // Inject a cached value on the config for use down the road
-                // (this is done so little is changed with the architecture of getting and loading).
-                for(var guid in self.all()){
-                    // Don't refresh, just update config with new key value for cached data.
-                    var widg = self.get(guid);
-                    var data = cached[widg.config.dataSource];
-                    // Grab data from specific `key` key, if it exists (for shared data on a single endpoint).
-                    var cachedData = widg.config.key && data.multicharts ? data.multicharts[widg.config.key] : data;
-                    widg.update({cachedData: cachedData}, true);
-                    // Actually load them all
+                parsed = end + 1;
+            }
+
+            function loadPending() {
+                $.each(pending, function(guid, widg){
                     widg.load();
-                }
+                });
+                pending = {};
             }
+
+            $.ajax({
+                url: BATCH_URL,
+                type: 'GET',
+                dataType: 'text',
+                xhr: function() {
+                    var xhr = new XMLHttpRequest();
+                    xhr.addEventListener('progress', function(){
+                        parseLines(xhr.responseText);
+                    });
+                    return xhr;
+                }
+            })
+            .done(parseLines)
+            .always(loadPending);
         };
         self.newModel = function() {
             var config = getParsedFormConfig();
@@ -214,10 +319,9 @@ var jsondash = function() {
                 .off('click.charts.save')
                 .on('click.charts', onUpdateWidget);
             });
-            if(self.config.refresh && self.config.refreshInterval) {
-                self._refreshInterval = setInterval(function(){
-                    self.load();
-                }, parseInt(self.config.refreshInterval, 10));
+            // Refreshed data is pushed by the server instead, if possible.
+            if(self.config.refresh && self.config.refreshInterval && !isPushed(self.config)) {
+                self._refreshInterval = setInterval(self.refresh, parseInt(self.config.refreshInterval, 10));
             }
             if(my.layout === 'grid') {
                 updateRowControls();
@@ -309,6 +413,15 @@ var jsondash = function() {
             }
             $(widget[0]).trigger(EVENTS.update_widget);
         };
+        /**
+         * [refresh Reload the widget, or only add new data to it if possible.]
+         */
+        self.refresh = function() {
+            if(jsondash.handlers.canAppendC3(self.el, self.config)) {
+                return jsondash.handlers.appendC3(self.el, self.config);
+            }
+            self.load();
+        };
         self.load = function() {
             var widg      = my.widgets.get(self.guid);
             var widget    = self.el;
@@ -509,7 +622,8 @@ var jsondash = function() {
         populateRowField(conf.row);
         // Update the modal fields with this widgets' value.
         $.each(conf, function(field, val){
-            if(field === 'override' || field === 'refresh') {
+            if(field === 'override' || field === 'refresh' || field === 'delta' || field === 'serverSide' ||
+                field === 'columnar') {
                 WIDGET_FORM.find('[name="' + field + '"]').prop('checked', val);
             } else if(field === 'classes') {
                 WIDGET_FORM.find('[name="' + field + '"]').val(val.join(','));
@@ -606,7 +720,13 @@ var jsondash = function() {
             override: form.find('[name="override"]').is(':checked'),
             order: parseNum(form.find('[name="order"]').val(), 10),
             refresh: form.find('[name="refresh"]').is(':checked'),
+            delta: form.find('[name="delta"]').is(':checked'),
+            serverSide: form.find('[name="serverSide"]').is(':checked'),
+            columnar: form.find('[name="columnar"]').is(':checked'),
             refreshInterval: jsondash.util.intervalStrToMS(form.find('[name="refreshInterval"]').val()),
+            timeout: parseNum(form.find('[name="timeout"]').val()) || null,
+            latencyBudget: form.find('[name="latencyBudget"]').val() === '' ? null :
+                parseNum(form.find('[name="latencyBudget"]').val()),
             classes: getClasses(form)
         };
         if(my.layout === 'grid') {
@@ -982,6 +1102,96 @@ var jsondash = function() {
         updateChartsRowOrder();
     }
 
+    /**
+     * [getDataURL Get the url to load data for a module from.
+     * If the dashboard uses the data proxy, saved modules are loaded through it
+     * (keeping any query string, e.g. from inputs), otherwise the dataSource is used.]
+     * @param  {[object]} config [The module config]
+     */
+    function getDataURL(config) {
+        var source = config.dataSource;
+        var saved = saved_sources[config.guid];
+        if(!PROXY_URL || !source || saved === undefined) {
+            return source;
+        }
+        // The dataSource was changed since saving, so the proxy doesn't know about it.
+        if(source.replace(/\?.*/, '') !== saved.replace(/\?.*/, '')) {
+            return source;
+        }
+        var query = source.indexOf('?') === -1 ? '' : source.substr(source.indexOf('?'));
+        return PROXY_URL.replace('__guid__', config.guid) + query;
+    }
+
+    /**
+     * [isPaged Check if a module only requests the visible page of its data.]
+     * @param  {[object]} config [The module config]
+     */
+    function isPaged(config) {
+        return Boolean(config.family === 'DataTable' && config.serverSide && !config.override);
+    }
+
+    /**
+     * [isPushed Check if refreshed data for a module is pushed by the server.
+     * Only saved modules are, since the server doesn't know about any changes.]
+     * @param  {[object]} config [The module config]
+     */
+    function isPushed(config) {
+        // Delta modules only request new points instead.
+        return Boolean(EVENTS_URL && window.EventSource && config.dataSource && !config.delta && !isPaged(config) &&
+            saved_sources[config.guid] === config.dataSource);
+    }
+
+    /**
+     * [subscribe Load refreshed data for all modules as it's pushed by the server.]
+     */
+    function subscribe() {
+        if(!EVENTS_URL || !window.EventSource) {
+            return;
+        }
+        var events = new EventSource(EVENTS_URL);
+        events.addEventListener('data', function(e){
+            var res = JSON.parse(e.data);
+            $.each(res.guids, function(_, guid){
+                var widg = my.widgets.get(guid);
+                if(!widg || !isPushed(widg.config)) {
+                    return;
+                }
+                if(res.status !== 200) {
+                    return jsondash.handleRes(res, null, widg.el);
+                }
+                my.widgets.loadCached(widg, res.data);
+            });
+        });
+    }
+
+    /**
+     * [checkCircuits Show which widgets have a failing dataSource that the server has stopped requesting,
+     * and may be showing the last good data for.]
+     */
+    function checkCircuits() {
+        $.getJSON(CIRCUITS_URL).done(function(res){
+            $.each(my.widgets.all(), function(guid, widg){
+                var circuit = res[guid];
+                var title = widg.el.select('.widget-title');
+                var label = title.select('.widget-circuit');
+                if(!circuit) {
+                    return label.remove();
+                }
+                if(label.empty()) {
+                    label = title.insert('span', '.pull-right').classed({label: true, 'widget-circuit': true});
+                }
+                label
+                    .classed({
+                        'label-danger': circuit.state === 'open',
+                        'label-warning': circuit.state !== 'open'
+                    })
+                    .attr('title', 'Requests to ' + circuit.host + ' failed ' + circuit.failures +
+                        ' times in a row. Retrying in ' + Math.ceil(circuit.retry_in) + 's.')
+                    .text(circuit.state === 'open' ? 'Source down' : 'Retrying');
+            });
+        });
+    }
+
     function loadDashboard(data) {
         // Load the grid before rendering the ajax, since the DOM
         // is rendered server side.
@@ -993,12 +1203,25 @@ var jsondash = function() {
         }, true);
         $('.item.widget').removeClass('hidden');
 
+        $.each(data.modules || [], function(_, module){
+            saved_sources[module.guid] = module.dataSource;
+        });
+
         // Populate widgets with the config data.
         my.widgets.populate(data);
 
         // Load all widgets, adding actual ajax data.
         my.widgets.loadAll();
 
+        // Get refreshed data from the server, instead of polling it.
+        subscribe();
+
+        // Show any failing dataSources.
+        if(CIRCUITS_URL) {
+            checkCircuits();
+            setInterval(checkCircuits, my.config.CIRCUITS_INTERVAL);
+        }
+
         // Setup responsive handlers
         var jres = jRespond([{
             label: 'handheld',
@@ -1060,7 +1283,11 @@ var jsondash = function() {
 
     my.config = {
         WIDGET_MARGIN_X: 20,
-        WIDGET_MARGIN_Y: 60
+        WIDGET_MARGIN_Y: 60,
+        // The max number of data requests in flight when loading a dashboard.
+        MAX_REQUESTS: 6,
+        // The milliseconds between checks for failing dataSources, on proxied dashboards.
+        CIRCUITS_INTERVAL: 10000
     };
     my.loadDashboard = loadDashboard;
     my.handlers = {};
@@ -1069,6 +1296,7 @@ var jsondash = function() {
     my.unload = unload;
     my.addDomEvents = addDomEvents;
     my.getActiveConfig = getParsedFormConfig;
+    my.getDataURL = getDataURL;
     my.layout = VIEW_BUILDER.length > 0 ? VIEW_BUILDER.data().layout : null;
     my.widgets = new Widgets();
     return my;
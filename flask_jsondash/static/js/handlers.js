@@ -5,24 +5,94 @@
 /** global: Plotly */
 
 jsondash.handleRes = function(error, data, container) {
-    var err_msg = '';
     if(error) {
-        err_msg = 'Error: ' + error.status + ' ' + error.statusText;
+        jsondash.showError(container, 'Error: ' + error.status + ' ' + error.statusText);
     }
     else if(!data) {
-        err_msg = 'No data was found (invalid response).';
+        jsondash.showError(container, 'No data was found (invalid response).');
     }
-    if(error || !data) {
-        container.classed({error: true});
-        container.select('.error-overlay')
-            .classed({hidden: false})
-            .select('.alert')
-            .text(err_msg);
-        jsondash.unload(container);
+};
+
+jsondash.showError = function(container, err_msg) {
+    container.classed({error: true});
+    container.select('.error-overlay')
+        .classed({hidden: false})
+        .select('.alert')
+        .text(err_msg);
+    jsondash.unload(container);
+};
+/**
+ * [columnar Decode data sent in the columnar format (see flask_jsondash.data_utils.columnar).
+ * Numeric columns become typed arrays on the response buffer, so they are not copied or parsed.]
+ */
+jsondash.columnar = {
+    MIMETYPE: 'application/vnd.jsondash.columnar',
+    TYPES: {
+        int8: Int8Array,
+        uint8: Uint8Array,
+        int16: Int16Array,
+        uint16: Uint16Array,
+        int32: Int32Array,
+        uint32: Uint32Array,
+        float32: Float32Array,
+        float64: Float64Array
+    },
+    decodeText: function(buffer) {
+        return new TextDecoder('utf-8').decode(buffer);
+    },
+    decode: function(buffer) {
+        var size = new DataView(buffer).getUint32(0, true);
+        var header = JSON.parse(jsondash.columnar.decodeText(new Uint8Array(buffer, 4, size)));
+        var columns = header.columns.map(function(col){
+            return new jsondash.columnar.TYPES[col.dtype](buffer, col.offset, col.length);
+        });
+        function replace(val) {
+            if($.isArray(val)) {
+                return val.map(replace);
+            }
+            if($.isPlainObject(val)) {
+                if(val.$column !== undefined && d3.keys(val).length === 1) {
+                    return columns[val.$column];
+                }
+                $.each(val, function(k, v){
+                    val[k] = replace(v);
+                });
+            }
+            return val;
+        }
+        return replace(header.data);
     }
 };
+
+/**
+ * [getColumnarJSON Request data in the columnar format, falling back to json
+ * for sources that don't support it.]
+ */
+jsondash.getColumnarJSON = function(url, callback) {
+    return d3.xhr(url)
+        .header('Accept', jsondash.columnar.MIMETYPE + ', application/json;q=0.9')
+        .responseType('arraybuffer')
+        .get(function(error, xhr){
+            if(error) {
+                return callback(error, null);
+            }
+            var type = xhr.getResponseHeader('Content-Type') || '';
+            var data = null;
+            try {
+                if(type.indexOf(jsondash.columnar.MIMETYPE) === 0) {
+                    data = jsondash.columnar.decode(xhr.response);
+                } else {
+                    data = JSON.parse(jsondash.columnar.decodeText(xhr.response));
+                }
+            } catch(e) {
+                data = null;
+            }
+            callback(null, data);
+        });
+};
+
 jsondash.getJSON = function(container, config, callback) {
-    var url     = config.dataSource;
+    var url     = jsondash.getDataURL(config);
     var cached  = config.cachedData;
     var err_msg = null;
     if(!url) throw new Error('Invalid URL: ' + url);
@@ -31,13 +101,24 @@ jsondash.getJSON = function(container, config, callback) {
         config.cachedData = null;
         return callback(null, cached);
     }
-    d3.json(url, function(error, data){
+    var request = config.columnar ? jsondash.getColumnarJSON : d3.json;
+    var timer = null;
+    var xhr = request(url, function(error, data){
+        clearTimeout(timer);
         jsondash.handleRes(error, data, container);
         if(error || !data) {
             return;
         }
-        callback(error, config.key && data.multicharts[config.key] ? data.multicharts[config.key] : data);
+        // Proxied data may already be sliced to this key.
+        callback(error, config.key && data.multicharts && data.multicharts[config.key] ? data.multicharts[config.key] : data);
     });
+    // Proxied requests are timed out by the server instead.
+    if(config.timeout && url === config.dataSource) {
+        timer = setTimeout(function(){
+            xhr.abort();
+            jsondash.handleRes({status: 504, statusText: 'Gateway Timeout'}, null, container);
+        }, config.timeout);
+    }
 };
 
 
@@ -320,6 +401,55 @@ jsondash.handlers.handleWordCloud = function(container, config) {
     });
 };
 
+/**
+ * [normalizeC3Data Transform data from a standardized jsondash
+ *     format into one suitable for c3.]
+ */
+jsondash.normalizeC3Data = function(data, type) {
+    // For most cases, we build out N columns into ['label', 0, 1, 2, 3] format
+    // from data in format: {'foo': [1, 2]} or format {'foo': 1}
+    var cols = [];
+    if(type === 'donut' || type === 'gauge' || type === 'pie') {
+        $.each(data, function(label, val){
+            cols.push([label, val]);
+        });
+        return cols;
+    }
+    if(type === 'timeseries') {
+        var dates = ['x'];
+        data.dates.map(function(date, _){
+            dates.push(date);
+        });
+        cols.push(dates);
+    }
+    $.each(data, function(label, vals){
+        if(label !== 'dates') {
+            var newarr = [label];
+            vals.map(function(val, _){
+                newarr.push(val);
+            });
+            cols.push(newarr);
+        }
+    });
+    return cols;
+};
+
+/**
+ * [getDeltaSince Get the value of the `since` argument to request new points after, for delta updates.
+ * This is the last date for timeseries data, or the number of points for other data.]
+ */
+jsondash.getDeltaSince = function(data, type, since) {
+    if(!data || typeof data !== 'object') {
+        return undefined;
+    }
+    if(type === 'timeseries') {
+        return data.dates && data.dates.length ? data.dates[data.dates.length - 1] : since;
+    }
+    var labels = Object.keys(data);
+    var count = labels.length && data[labels[0]] ? data[labels[0]].length : 0;
+    return parseInt(since, 10) + count;
+};
+
 jsondash.handlers.handleC3 = function(container, config) {
     var _width = isNaN(config.width) ? jsondash.getDynamicWidth(container, config) : config.width;
     'use strict';
@@ -344,39 +474,6 @@ jsondash.handlers.handleC3 = function(container, config) {
         .select('.chart-container')
         .classed(jsondash.util.getCSSClasses(config))
 
-    /**
-     * [normalizeData Transform data from a standardized jsondash
-     *     format into one suitable for c3.]
-     */
-    function normalizeData(data, type) {
-        // For most cases, we build out N columns into ['label', 0, 1, 2, 3] format
-        // from data in format: {'foo': [1, 2]} or format {'foo': 1}
-        var cols = [];
-        if(type === 'donut' || type === 'gauge' || type === 'pie') {
-            $.each(data, function(label, val){
-                cols.push([label, val]);
-            });
-            return cols;
-        }
-        if(type === 'timeseries') {
-            var dates = ['x'];
-            data.dates.map(function(date, _){
-                dates.push(date);
-            });
-            cols.push(dates);
-        }
-        $.each(data, function(label, vals){
-            if(label !== 'dates') {
-                var newarr = [label];
-                vals.map(function(val, _){
-                    newarr.push(val);
-                });
-                cols.push(newarr);
-            }
-        });
-        return cols;
-    }
-
     jsondash.getJSON(container, config, function(error, data){
         if(jsondash.util.isOverride(config)) {
             // Just use the raw payload for this widgets' options.
@@ -393,9 +490,49 @@ jsondash.handlers.handleC3 = function(container, config) {
             } else {
                 init_config.data.type = config.type;
             }
-            init_config.data.columns = normalizeData(data, config.type);
+            init_config.data.columns = jsondash.normalizeC3Data(data, config.type);
+        }
+        var chart = c3.generate(init_config);
+        // Keep track of the chart and its last point, to add new points to it on refresh.
+        container.property('c3chart', chart);
+        container.property('deltaSince', jsondash.getDeltaSince(data, config.type, 0));
+    });
+};
+
+/**
+ * [canAppendC3 Check if only new points can be added to a chart on refresh, instead of re-drawing it.]
+ */
+jsondash.handlers.canAppendC3 = function(container, config) {
+    return Boolean(config.delta && config.family === 'C3' &&
+        (config.type === 'timeseries' || config.type === 'line') &&
+        !jsondash.util.isOverride(config) &&
+        container.property('c3chart') && container.property('deltaSince') !== undefined);
+};
+
+/**
+ * [appendC3 Request only the points after the last one a chart has, and add them to it.]
+ */
+jsondash.handlers.appendC3 = function(container, config) {
+    'use strict';
+    var chart = container.property('c3chart');
+    var since = container.property('deltaSince');
+    var url = jsondash.getDataURL(config);
+    url += (url.indexOf('?') === -1 ? '?' : '&') + 'since=' + encodeURIComponent(since);
+    d3.json(url, function(error, data){
+        jsondash.handleRes(error, data, container);
+        if(error || !data) {
+            return;
+        }
+        if(config.key && data.multicharts && data.multicharts[config.key]) {
+            data = data.multicharts[config.key];
+        }
+        var columns = jsondash.normalizeC3Data(data, config.type);
+        if(!columns.length || columns[0].length < 2) {
+            return;
         }
-        c3.generate(init_config);
+        // Keep all existing points.
+        chart.flow({columns: columns, length: 0});
+        container.property('deltaSince', jsondash.getDeltaSince(data, config.type, since));
     });
 };
 
@@ -687,8 +824,24 @@ jsondash.handlers.handleSparkline = function(container, config) {
 
 jsondash.handlers.handleDataTable = function(container, config) {
     'use strict';
-    jsondash.getJSON(container, config, function(error, res) {
-        var keys = d3.keys(res[0]).map(function(d){
+    var serverSide = config.serverSide && !config.override;
+    var source = config;
+    if(serverSide) {
+        // Only ask for the first row, to get the columns. Sources without
+        // server-side support return all rows, and are shown as usual.
+        var url = jsondash.getDataURL(config);
+        source = $.extend({}, config, {
+            dataSource: url + (url.indexOf('?') === -1 ? '?' : '&') + 'draw=0&start=0&length=1'
+        });
+    }
+    jsondash.getJSON(container, source, function(error, res) {
+        var paged = serverSide && !$.isArray(res);
+        if(paged && (res.error || !$.isArray(res.data))) {
+            // The server sends a DataTables error if the data isn't a list of rows.
+            return jsondash.showError(container, 'Error: ' + (res.error || 'Invalid server-side response.'));
+        }
+        var rows = paged ? res.data : res;
+        var keys = d3.keys(rows[0]).map(function(d){
             return {data: d, title: d};
         });
         var titlebar_offset = jsondash.getTitleBarHeight(container) * 2.5;
@@ -699,6 +852,14 @@ jsondash.handlers.handleDataTable = function(container, config) {
             .append('table')
             .classed(classes);
         var opts = config.override ? res : {data: res, columns: keys};
+        if(paged) {
+            opts = {
+                serverSide: true,
+                processing: true,
+                ajax: jsondash.getDataURL(config),
+                columns: keys
+            };
+        }
         $(container.select('table')[0])
             .dataTable(opts).css({
                 width: 'auto',
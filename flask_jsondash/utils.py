@@ -10,6 +10,10 @@ General utils for handling data within the blueprint.
 :license: MIT, see LICENSE for more details.
 """
 
+import hashlib
+import json
+import os
+import time
 from collections import defaultdict, namedtuple
 
 from flask import current_app
@@ -25,6 +29,7 @@ default_config = dict(
     JSONDASH_GLOBALDASH=False,
     JSONDASH_GLOBAL_USER='global',
     JSONDASH_PERPAGE=25,
+    JSONDASH_ENSURE_INDEXES=False,
 )
 
 
@@ -116,6 +121,56 @@ def is_global_dashboard(view):
     ])
 
 
+def get_view_etag(version, *flags):
+    """Get an etag for a rendered dashboard.
+
+    Args:
+        version (dict): The dashboard version fields (id, date, created_by).
+        *flags: Any other values that change how the dashboard renders
+            (e.g. permissions).
+
+    Returns:
+        str: The etag.
+    """
+    parts = [
+        version.get('id'),
+        str(version.get('date')),
+        version.get('created_by'),
+    ] + list(flags)
+    return hashlib.sha1(json.dumps(parts).encode('utf-8')).hexdigest()
+
+
+def get_files_version(*folders):
+    """Get a token that changes whenever any file in some folders changes.
+
+    It only depends on the files, so it's the same on every host with the
+    same release.
+
+    Args:
+        *folders (str): The folders. Missing folders (or None) are skipped.
+
+    Returns:
+        str: A hash of the relative path and content of all files.
+    """
+    digest = hashlib.sha1()
+    for folder in folders:
+        if not folder or not os.path.isdir(folder):
+            continue
+        for root, dirs, files in os.walk(folder):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                try:
+                    with open(path, 'rb') as contents:
+                        content = contents.read()
+                except (IOError, OSError):
+                    continue
+                relpath = os.path.relpath(path, folder).replace(os.sep, '/')
+                digest.update(relpath.encode('utf-8') + b'\0')
+                digest.update(hashlib.sha1(content).digest())
+    return digest.hexdigest()
+
+
 def categorize_views(views):
     """Return a categorized version of the views.
 
@@ -138,10 +193,73 @@ def categorize_views(views):
     return buckets
 
 
-def paginator(page=0, per_page=None, count=None):
-    """Get pagination calculations in a compact format."""
+class CategoryRegistry(object):
+    """An in-process cache of all dashboard categories.
+
+    Categories are loaded with a distinct query, then kept until a write
+    in this process invalidates them, or they expire, so writes in
+    other processes are seen too.
+    """
+
+    # Categories that are never shown as choices.
+    excluded = [None, '', 'uncategorized']
+
+    def __init__(self, ttl=60):
+        """Setup an empty registry.
+
+        Args:
+            ttl (int, optional): The seconds to keep the categories for.
+        """
+        self.ttl = ttl
+        self._categories = None
+        self._expires = 0
+
+    def get(self):
+        """Get all categories, loading them from the db if needed.
+
+        Returns:
+            frozenset: All category names.
+        """
+        categories = self._categories
+        if categories is None or self._expires <= time.time():
+            categories = frozenset([
+                c for c in adapter.distinct('category')
+                if c not in self.excluded
+            ])
+            self._categories = categories
+            self._expires = time.time() + self.ttl
+        return categories
+
+    def add(self, category):
+        """Add a category without invalidating, if it's loaded already."""
+        if self._categories is None or category in self.excluded:
+            return
+        self._categories = self._categories | frozenset([category])
+
+    def invalidate(self):
+        """Clear the registry, so it is reloaded on next access."""
+        self._categories = None
+
+
+categories = CategoryRegistry()
+
+
+def paginator(page=0, per_page=None, count=None, query=None):
+    """Get pagination calculations in a compact format.
+
+    Args:
+        page (int, optional): The 1-indexed page requested (0 is page 1).
+        per_page (int, optional): The number of records per page.
+        count (int, optional): The total number of records. If not given,
+            the count is done by the db adapter.
+        query (dict, optional): A filter to restrict the adapter count to.
+
+    Returns:
+        Paginator: The pagination values, where `limit` and `skip`
+            can be passed directly to the adapter `read` method.
+    """
     if count is None:
-        count = adapter.count()
+        count = adapter.count(filter=query)
     if page is None:
         page = 0
     if per_page is None:
@@ -11,19 +11,29 @@ test_requirements = [
     'pytest-cov==2.6.1',
     'pyquery==1.4.0',
     'requests_mock',
+    'numpy',
 ]
 extras_require = {
     'wordcloud-utils': [
         'requests',
         'pyquery',
         'requests-mock',
-    ]
+    ],
+    'bundles': [
+        'rjsmin',
+        'rcssmin',
+    ],
+    'downsample': [
+        'numpy',
+    ],
 }
 requirements = [
     'click==7.0',
     'Flask',
     'cerberus',
     'pymongo==3.7.2',
+    'requests',
+    'futures; python_version < "3"',
 ]
 
 
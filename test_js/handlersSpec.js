@@ -0,0 +1,49 @@
+global.jsondash = {util: {}, handlers: {}};
+global.$ = {extend: Object.assign, isArray: Array.isArray};
+require('../flask_jsondash/static/js/handlers');
+
+describe('handleDataTable', function(){
+    var requested;
+    beforeEach(function(){
+        requested = null;
+        jsondash.getDataURL = function(config) {
+            return config.dataSource;
+        };
+        jsondash.getJSON = function(container, config, callback) {
+            requested = config;
+        };
+    });
+
+    it('should load keyed tables with the module config', function(){
+        var config = {
+            family: 'DataTable',
+            dataSource: '/data',
+            key: 'table1',
+            cachedData: [{a: 1}],
+            timeout: 1000
+        };
+        jsondash.handlers.handleDataTable(null, config);
+        expect(requested).toBe(config);
+    });
+
+    it('should only request the first row for server-side tables', function(){
+        var config = {family: 'DataTable', dataSource: '/data?a=1', serverSide: true, timeout: 1000};
+        jsondash.handlers.handleDataTable(null, config);
+        expect(requested.dataSource).toBe('/data?a=1&draw=0&start=0&length=1');
+        expect(requested.timeout).toBe(1000);
+        expect(config.dataSource).toBe('/data?a=1');
+    });
+
+    it('should show the error for server-side tables without rows', function(){
+        var shown = null;
+        jsondash.showError = function(container, msg) {
+            shown = msg;
+        };
+        jsondash.getJSON = function(container, config, callback) {
+            callback(null, {draw: 0, data: [], error: 'No rows.'});
+        };
+        var config = {family: 'DataTable', dataSource: '/data', serverSide: true};
+        jsondash.handlers.handleDataTable(null, config);
+        expect(shown).toBe('Error: No rows.');
+    });
+});
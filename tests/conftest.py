@@ -17,6 +17,7 @@ app.config.update(
     # See https://github.com/jarus/flask-testing/issues/21
     PRESERVE_CONTEXT_ON_EXCEPTION=False,
     SECRET_KEY='123',
+    JSONDASH_ENSURE_INDEXES=False,
 )
 app.debug = True
 app.register_blueprint(charts_builder.charts)
@@ -43,6 +44,17 @@ def get_json_config(name):
     return view
 
 
+def _matches(dash, query):
+    """Naive subset of mongo filtering, enough for the blueprint queries."""
+    for key, val in (query or {}).items():
+        if isinstance(val, dict) and '$in' in val:
+            if dash.get(key) not in val['$in']:
+                return False
+        elif dash.get(key) != val:
+            return False
+    return True
+
+
 def read(*args, **kwargs):
     if 'override' in kwargs:
         newkwargs = kwargs.pop('override')
@@ -51,12 +63,47 @@ def read(*args, **kwargs):
             return dict(**newkwargs)
         return _read
     if 'c_id' not in kwargs:
-        return fake_db
+        if not kwargs:
+            return fake_db
+        views = [d for d in fake_db if _matches(d, kwargs.get('filter'))]
+        for key, direction in reversed(kwargs.get('sort') or []):
+            views = sorted(views, key=lambda d: str(d.get(key) or ''),
+                           reverse=direction < 0)
+        skip = kwargs.get('skip', 0)
+        limit = kwargs.get('limit', 0)
+        return views[skip:skip + limit] if limit else views[skip:]
     for i, dash in enumerate(fake_db):
         if dash['id'] == kwargs.get('c_id'):
             return dash
 
 
+def read_version(c_id):
+    # Use the (possibly overridden) read, so tests only need to patch it.
+    dash = utils.adapter.read(c_id=c_id)
+    if dash is None:
+        return None
+    version = dict(id=c_id)
+    version.update({k: dash[k] for k in ['date', 'created_by'] if k in dash})
+    return version
+
+
+def read_summary(*args, **kwargs):
+    fields = ['id', 'name', 'category', 'created_by', 'date']
+    return [
+        dict(module_count=len(dash.get('modules') or []),
+             **{k: dash[k] for k in fields if k in dash})
+        for dash in read(**kwargs)
+    ]
+
+
+def distinct(key, **kwargs):
+    return list(set([dash.get(key) for dash in fake_db]))
+
+
+def count(*args, **kwargs):
+    return len([d for d in fake_db if _matches(d, kwargs.get('filter'))])
+
+
 def delete(c_id, **kwargs):
     global fake_db
     for i, dash in enumerate(fake_db):
@@ -116,6 +163,11 @@ def ctx(monkeypatch, request):
         monkeypatch.setattr(utils.adapter, 'delete', delete)
         monkeypatch.setattr(utils.adapter, 'update', update)
         monkeypatch.setattr(utils.adapter, 'filter', read)
+        monkeypatch.setattr(utils.adapter, 'count', count)
+        monkeypatch.setattr(utils.adapter, 'read_summary', read_summary)
+        monkeypatch.setattr(utils.adapter, 'read_version', read_version)
+        monkeypatch.setattr(utils.adapter, 'distinct', distinct)
+        utils.categories.invalidate()
         yield req_ctx
 
 
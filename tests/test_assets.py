@@ -0,0 +1,116 @@
+import pytest
+
+from flask_jsondash import assets, charts_builder
+
+
+def make_config(**deps):
+    return {
+        name: dict(
+            dependencies=family_deps,
+            js_url=['//cdn/{}.js'.format(name.lower())],
+            css_url=['//cdn/{}.css'.format(name.lower())],
+        )
+        for name, family_deps in deps.items()
+    }
+
+
+def test_topological_order_deps_first():
+    config = make_config(C=['B'], B=['A'], A=[], D=[])
+    order = assets.topological_order(config)
+    assert order.index('A') < order.index('B') < order.index('C')
+    assert sorted(order) == ['A', 'B', 'C', 'D']
+
+
+def test_topological_order_circular():
+    config = make_config(A=['B'], B=['A'])
+    with pytest.raises(ValueError):
+        assets.topological_order(config)
+
+
+def test_topological_order_missing_dep():
+    config = make_config(A=['Nope'])
+    with pytest.raises(ValueError):
+        assets.topological_order(config)
+
+
+def test_resolve_transitive():
+    config = make_config(C=['B'], B=['A'], A=[], D=[])
+    graph = assets.AssetGraph(config)
+    assert graph.resolve(['C']) == ['A', 'B', 'C']
+    assert graph.resolve(['D', 'Unknown']) == ['D']
+
+
+def test_resolve_required():
+    config = make_config(A=[], B=[])
+    graph = assets.AssetGraph(config, required=['A'])
+    assert graph.resolve([]) == ['A']
+    assert graph.resolve(['B']) == ['A', 'B']
+
+
+def test_assets_memoized_and_ordered():
+    config = make_config(C=['B'], B=['A'], A=[])
+    graph = assets.AssetGraph(config)
+    res = graph.assets(['C', 'C'], config)
+    assert res['js'] == ['//cdn/a.js', '//cdn/b.js', '//cdn/c.js']
+    assert res['css'] == ['//cdn/a.css', '//cdn/b.css', '//cdn/c.css']
+    # Callers can't corrupt the memoized value.
+    res['js'].append('foo')
+    assert graph.assets(['C'], config)['js'] == [
+        '//cdn/a.js', '//cdn/b.js', '//cdn/c.js']
+    assert len(graph._memo) == 1
+
+
+def test_get_active_assets_does_not_modify_families():
+    families = ['C3']
+    charts_builder.get_active_assets(families)
+    assert families == ['C3']
+
+
+def test_is_remote():
+    assert assets.is_remote('//cdn/foo.js')
+    assert assets.is_remote('https://cdn/foo.js')
+    assert not assets.is_remote('/static/foo.js')
+
+
+def test_rebase_css_urls():
+    css = ('a{src:url("../fonts/x.eot?#iefix")} b{src:url(images/y.png)} '
+           'c{src:url(//cdn/z.png)} d{src:url(/abs.png)}')
+    res = assets.rebase_css_urls(css, '/jsondash/css/vendor/fa.css?v=1')
+    assert 'url("/jsondash/css/fonts/x.eot?#iefix")' in res
+    assert 'url(/jsondash/css/vendor/images/y.png)' in res
+    assert 'url(//cdn/z.png)' in res
+    assert 'url(/abs.png)' in res
+
+
+def test_bundler_keeps_remote_order(tmpdir):
+    for name in ['a', 'b', 'c']:
+        tmpdir.join(name + '.js').write('var {} = 1'.format(name))
+    bundler = assets.Bundler(str(tmpdir.join('bundles')))
+    urls = ['/a.js', '/b.js', '//cdn/x.js', '/c.js']
+    res = bundler.bundle(
+        urls, 'js',
+        lambda url: str(tmpdir.join(url.lstrip('/'))),
+        lambda filename: '/bundles/' + filename)
+    assert len(res) == 3
+    assert res[1] == '//cdn/x.js'
+    first = tmpdir.join(res[0].replace('/bundles/', 'bundles/')).read()
+    assert first == 'var a = 1;\nvar b = 1'
+    # Built once, then memoized.
+    assert bundler.bundle(urls, 'js', None, None) == res
+
+
+def test_bundler_content_hashed(tmpdir):
+    tmpdir.join('a.css').write('a{}')
+    bundler = assets.Bundler(str(tmpdir))
+    files = [('/a.css', str(tmpdir.join('a.css')))]
+    name = bundler.build(files, 'css')
+    assert name.endswith('.css')
+    assert bundler.build(files, 'css') == name
+    tmpdir.join('a.css').write('b{}')
+    assert bundler.build(files, 'css') != name
+
+
+def test_bundler_minify_requires_minifiers(monkeypatch, tmpdir):
+    monkeypatch.setattr(assets, 'rjsmin', None)
+    with pytest.raises(ImportError):
+        assets.Bundler(str(tmpdir), minify=True)
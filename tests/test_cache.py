@@ -0,0 +1,86 @@
+from flask import Flask
+
+from flask_jsondash import cache, charts_builder, utils
+
+
+def test_get_set():
+    lru = cache.LRUCache(maxsize=2)
+    assert lru.get('foo') is None
+    lru.set('foo', 1)
+    assert lru.get('foo') == 1
+    assert lru.stats()['hits'] == 1
+    assert lru.stats()['misses'] == 1
+
+
+def test_evicts_least_recently_used():
+    lru = cache.LRUCache(maxsize=2)
+    lru.set('foo', 1)
+    lru.set('bar', 2)
+    # Mark foo as recently used, so bar is evicted first.
+    lru.get('foo')
+    lru.set('baz', 3)
+    assert len(lru) == 2
+    assert lru.get('bar') is None
+    assert lru.get('foo') == 1
+    assert lru.get('baz') == 3
+    assert lru.stats()['evictions'] == 1
+
+
+def test_expires(monkeypatch):
+    now = [1000]
+    monkeypatch.setattr(cache.time, 'time', lambda: now[0])
+    lru = cache.LRUCache(ttl=10)
+    lru.set('foo', 1)
+    now[0] += 5
+    assert lru.get('foo') == 1
+    now[0] += 5
+    assert lru.get('foo') is None
+    assert lru.stats()['evictions'] == 1
+
+
+def test_no_ttl(monkeypatch):
+    lru = cache.LRUCache(ttl=None)
+    lru.set('foo', 1)
+    monkeypatch.setattr(cache.time, 'time', lambda: 10 ** 12)
+    assert lru.get('foo') == 1
+
+
+def test_stale_version():
+    lru = cache.LRUCache()
+    lru.set('foo', 1, version='v1')
+    assert lru.get('foo', version='v1') == 1
+    assert lru.get('foo') == 1
+    assert lru.get('foo', version='v2') is None
+    assert len(lru) == 0
+
+
+def test_delete_clear():
+    lru = cache.LRUCache()
+    lru.set('foo', 1)
+    lru.set('bar', 1)
+    lru.delete('foo')
+    lru.delete('missing')
+    assert lru.get('foo') is None
+    lru.clear()
+    assert len(lru) == 0
+
+
+def test_setup_cache_from_config(monkeypatch):
+    monkeypatch.setattr(utils.adapter, 'cache', None)
+    app = Flask('test_cache')
+    app.config.update(
+        JSONDASH_ENSURE_INDEXES=False,
+        JSONDASH=dict(cache=dict(maxsize=10, ttl=5)),
+    )
+    app.register_blueprint(charts_builder.charts)
+    assert isinstance(utils.adapter.cache, cache.LRUCache)
+    assert utils.adapter.cache.maxsize == 10
+    assert utils.adapter.cache.ttl == 5
+
+
+def test_setup_cache_not_configured(monkeypatch):
+    monkeypatch.setattr(utils.adapter, 'cache', None)
+    app = Flask('test_nocache')
+    app.config.update(JSONDASH_ENSURE_INDEXES=False)
+    app.register_blueprint(charts_builder.charts)
+    assert utils.adapter.cache is None
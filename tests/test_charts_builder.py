@@ -1,6 +1,7 @@
 import json
+import time
 
-from flask import url_for
+from flask import Flask, url_for
 
 from pyquery import PyQuery as pq
 
@@ -9,6 +10,7 @@ import pytest
 from conftest import (
     get_json_config,
     auth_valid,
+    auth_invalid,
     read,
     setup_dashboard,
     make_chart,
@@ -457,3 +459,1057 @@ def test_correct_charts_count(monkeypatch, client):
     container = dom.find('#container')
     assert len(container.find('.item.widget')) == 5
     assert len(container.find('.item.widget').find('.widget-title-text')) == 5
+
+
+def test_index_counts_modules_from_summary(monkeypatch, client):
+    _, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    data = dict(name='mydash')
+    data.update({'module_{}'.format(i): make_chart() for i in range(3)})
+    test.post(url_for('jsondash.create'), data=data)
+    res = test.get(url_for('jsondash.dashboard'))
+    dom = pq(res.data)
+    assert 'Showing 1 dashboard with 3 charts' in dom.find('h1.lead').text()
+    assert '(3 modules)' in dom.find('.chart-list-item').text()
+
+
+def test_view_categories_cached_until_update(monkeypatch, client):
+    _, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    calls = []
+
+    def distinct(key):
+        calls.append(key)
+        return [dash.get(key) for dash in read()]
+    monkeypatch.setattr(adapter, 'distinct', distinct)
+    test.post(url_for('jsondash.create'), data=dict(name='mydash'))
+    view_id = read()[0]['id']
+    for _ in range(3):
+        test.get(url_for('jsondash.view', c_id=view_id))
+    assert len(calls) == 1
+    data = dict(name='mydash', mode='freeform', category_new='newcat')
+    test.post(url_for('jsondash.update', c_id=view_id), data=data)
+    test.get(url_for('jsondash.view', c_id=view_id))
+    assert len(calls) == 2
+
+
+def test_charts_config_localized_once(monkeypatch, client):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    app.extensions.pop('jsondash_charts_config', None)
+    calls = []
+    _local_static = charts_builder.local_static
+
+    def local_static(*args):
+        calls.append(args)
+        return _local_static(*args)
+    monkeypatch.setattr(charts_builder, 'local_static', local_static)
+    for _ in range(3):
+        test.get(url_for('jsondash.dashboard'))
+    assert len(calls) == 1
+    # The global config is never modified.
+    for config in settings.CHARTS_CONFIG.values():
+        for url in config['js_url']:
+            assert url.startswith('//')
+    localized = charts_builder.get_charts_config()
+    assert localized['D3']['js_url'] == ('/static/js/vendor/d3.min.js',)
+    assert charts_builder.get_active_assets(['D3'])['js'] == [
+        '/static/js/vendor/d3.min.js']
+
+
+def test_charts_config_no_static(monkeypatch, client):
+    app, test = client
+    app.config['JSONDASH'].pop('static')
+    assert charts_builder.get_charts_config() is settings.CHARTS_CONFIG
+
+
+def test_view_bundled_assets(monkeypatch, client, tmpdir):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    monkeypatch.setitem(
+        app.extensions, 'jsondash_bundler',
+        charts_builder.assets.Bundler(str(tmpdir)))
+    view = get_json_config('inputs.json')
+    monkeypatch.setattr(adapter, 'read', read(override=dict(view)))
+    res = test.get(url_for('jsondash.view', c_id=view['id']))
+    dom = pq(res.data)
+    scripts = [s.attrib['src'] for s in dom.find('script[src]')
+               if '/jsondash/' in s.attrib['src']]
+    # Vendor and app js are bundled; remote chart js stays in between.
+    assert scripts[0].startswith('/jsondash/bundles/')
+    assert scripts[-1].startswith('/jsondash/bundles/')
+    bundle = test.get(scripts[-1])
+    assert bundle.status_code == 200
+    assert 'immutable' in bundle.headers['Cache-Control']
+    assert 'max-age=31536000' in bundle.headers['Cache-Control']
+    styles = [s.attrib['href'] for s in dom.find('link[rel="stylesheet"]')
+              if s.attrib['href'].startswith('/jsondash/bundles/')]
+    css = test.get(styles[0]).data.decode('utf-8')
+    assert "url('/jsondash/css/fonts/fontawesome-webfont" in css
+
+
+def test_no_bundles_by_default(monkeypatch, client):
+    _, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    res = test.get(url_for('jsondash.dashboard'))
+    assert '/jsondash/bundles/' not in str(res.data)
+    assert '/jsondash/js/app.js' in str(res.data)
+
+
+def test_get_local_path(client):
+    assert charts_builder.get_local_path('/jsondash/js/app.js').endswith(
+        'static/js/app.js')
+    assert charts_builder.get_local_path('/jsondash/js/nope.js') is None
+    assert charts_builder.get_local_path('/charts/') is None
+    assert charts_builder.get_local_path('/nothing/here') is None
+
+
+def test_get_local_path_bundles(monkeypatch, client, tmpdir):
+    app, test = client
+    monkeypatch.setitem(
+        app.extensions, 'jsondash_bundler',
+        charts_builder.assets.Bundler(str(tmpdir)))
+    tmpdir.join('abc.js').write('var a = 1;')
+    assert charts_builder.get_local_path(
+        '/jsondash/bundles/abc.js') == str(tmpdir.join('abc.js'))
+    assert charts_builder.get_local_path('/jsondash/bundles/nope.js') is None
+
+
+def test_prebuild_bundles_cli(monkeypatch, client, tmpdir):
+    app, test = client
+    monkeypatch.setitem(
+        app.extensions, 'jsondash_bundler',
+        charts_builder.assets.Bundler(str(tmpdir)))
+    monkeypatch.setattr(
+        adapter, 'read_summary', lambda: [dict(families=['C3'])])
+    result = app.test_cli_runner().invoke(args=['jsondash', 'bundle'])
+    assert 'Bundled C3: ' in result.output
+    assert len(tmpdir.listdir()) > 0
+
+
+def test_view_conditional_get(monkeypatch, client):
+    _, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    view = get_json_config('inputs.json')
+    view.update(date='2017-01-01 12:00:00.000000')
+    monkeypatch.setattr(adapter, 'read', read(override=dict(view)))
+    url = url_for('jsondash.view', c_id=view['id'])
+    res = test.get(url)
+    assert res.status_code == 200
+    etag = res.headers['ETag']
+    # The dashboard date alone doesn't cover all changes.
+    assert 'Last-Modified' not in res.headers
+    assert 'no-cache' in res.headers['Cache-Control']
+    assert 'private' in res.headers['Cache-Control']
+    # Nothing changed, so nothing is loaded or rendered.
+    full_reads = []
+    monkeypatch.setattr(
+        adapter, 'read_version', lambda c_id: dict(
+            id=c_id, date=view['date'], created_by=view.get('created_by')))
+    monkeypatch.setattr(
+        adapter, 'read', lambda **kw: full_reads.append(kw))
+    res = test.get(url, headers={'If-None-Match': etag})
+    assert res.status_code == 304
+    assert res.headers['ETag'] == etag
+    assert not res.data
+    assert not full_reads
+    res = test.get(url, headers={
+        'If-Modified-Since': 'Mon, 01 Jan 2018 12:00:00 GMT'})
+    assert res.status_code != 304
+    assert full_reads
+
+
+def test_view_conditional_get_app_changed(monkeypatch, client):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    view = get_json_config('inputs.json')
+    monkeypatch.setattr(adapter, 'read', read(override=dict(view)))
+    url = url_for('jsondash.view', c_id=view['id'])
+    etag = test.get(url).headers['ETag']
+    assert test.get(url).headers['ETag'] == etag
+    # A deploy changed the templates or static files.
+    monkeypatch.setitem(app.extensions, 'jsondash_files_version', 'new')
+    changed = test.get(url).headers['ETag']
+    assert changed != etag
+    # The config changed how dashboards render.
+    monkeypatch.setitem(app.config, 'JSONDASH_GLOBALDASH', True)
+    assert test.get(url).headers['ETag'] != changed
+    monkeypatch.setitem(app.config, 'JSONDASH_GLOBALDASH', False)
+    monkeypatch.setitem(
+        app.extensions, 'jsondash_snapshots', object())
+    assert test.get(url).headers['ETag'] != changed
+    monkeypatch.delitem(app.extensions, 'jsondash_snapshots')
+    assert test.get(url).headers['ETag'] == changed
+    # The categories shown on the page changed.
+    monkeypatch.setattr(charts_builder, 'get_categories',
+                        lambda: set(['new']))
+    assert test.get(url).headers['ETag'] != changed
+
+
+def test_view_conditional_get_changed(monkeypatch, client):
+    _, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    view = get_json_config('inputs.json')
+    monkeypatch.setattr(adapter, 'read', read(override=dict(view)))
+    url = url_for('jsondash.view', c_id=view['id'])
+    etag = test.get(url).headers['ETag']
+    # A new date means a new version.
+    view.update(date='2018-01-01 12:00:00')
+    monkeypatch.setattr(adapter, 'read', read(override=dict(view)))
+    res = test.get(url, headers={'If-None-Match': etag})
+    assert res.status_code == 200
+    assert res.headers['ETag'] != etag
+    # As do different permissions.
+    etag = res.headers['ETag']
+    monkeypatch.setattr(
+        charts_builder, 'auth', lambda **kw: kw['authtype'] == 'view')
+    monkeypatch.setattr(charts_builder, 'metadata', lambda **kw: None)
+    res = test.get(url, headers={'If-None-Match': etag})
+    assert res.status_code == 200
+
+
+def test_view_conditional_get_with_flash(monkeypatch, client):
+    _, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    view = get_json_config('inputs.json')
+    monkeypatch.setattr(adapter, 'read', read(override=dict(view)))
+    url = url_for('jsondash.view', c_id=view['id'])
+    etag = test.get(url).headers['ETag']
+    with test.session_transaction() as sess:
+        sess['_flashes'] = [('message', 'Updated view')]
+    res = test.get(url, headers={'If-None-Match': etag})
+    assert res.status_code == 200
+    assert 'Updated view' in str(res.data)
+
+
+def test_view_fragment_cache(monkeypatch, client):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    fragments = charts_builder.cache.LRUCache()
+    monkeypatch.setitem(app.extensions, 'jsondash_fragments', fragments)
+    view = get_json_config('inputs.json')
+    monkeypatch.setattr(adapter, 'read', read(override=dict(view)))
+    url = url_for('jsondash.view', c_id=view['id'])
+    first = pq(test.get(url).data)
+    second = pq(test.get(url).data)
+    assert fragments.stats()['hits'] == 1
+    assert len(second.find('#container .item')) == len(view['modules'])
+    assert first.find('#container').html() == second.find('#container').html()
+    # Embeddable pages render differently, so are cached separately.
+    embedded = pq(test.get(url + '?embeddable=1').data)
+    assert not embedded.find('#container .widget-edit')
+    assert len(fragments.get(view['id'])) == 2
+
+
+def test_view_fragment_cache_invalidated(monkeypatch, client):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    fragments = charts_builder.cache.LRUCache()
+    monkeypatch.setitem(app.extensions, 'jsondash_fragments', fragments)
+    test.post(url_for('jsondash.create'), data=dict(name='mydash'))
+    view_id = read()[0]['id']
+    test.get(url_for('jsondash.view', c_id=view_id))
+    assert len(fragments) == 1
+    data = dict(name='mydash', mode='freeform')
+    test.post(url_for('jsondash.update', c_id=view_id), data=data)
+    assert len(fragments) == 0
+    test.get(url_for('jsondash.view', c_id=view_id))
+    assert len(fragments) == 1
+    test.post(url_for('jsondash.delete', c_id=view_id))
+    assert len(fragments) == 0
+
+
+def setup_proxy(monkeypatch, app, **kwargs):
+    proxy = charts_builder.data_proxy.DataProxy()
+    monkeypatch.setitem(app.extensions, 'jsondash_data_proxy', proxy)
+    view = get_json_config('inputs.json')
+    view.update(proxy=True, **kwargs)
+    monkeypatch.setattr(adapter, 'read', read(override=dict(view)))
+    return view
+
+
+def test_view_proxy_url(monkeypatch, client):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    view = setup_proxy(monkeypatch, app)
+    dom = pq(test.get(url_for('jsondash.view', c_id=view['id'])).data)
+    expected = url_for('jsondash.data', c_id=view['id'], guid='__guid__')
+    assert dom.find('#view-builder').attr('data-proxy-url') == expected
+    expected = url_for('jsondash.circuits', c_id=view['id'])
+    assert dom.find('#view-builder').attr('data-circuits-url') == expected
+
+
+def test_view_proxy_url_disabled(monkeypatch, client):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    view = get_json_config('inputs.json')
+    view.update(proxy=True)
+    monkeypatch.setattr(adapter, 'read', read(override=dict(view)))
+    dom = pq(test.get(url_for('jsondash.view', c_id=view['id'])).data)
+    assert dom.find('#view-builder').attr('data-proxy-url') is None
+
+
+def test_data_proxy(monkeypatch, client, requests_mock):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    view = setup_proxy(monkeypatch, app)
+    module = view['modules'][0]
+    base = module['dataSource'].split('?')[0]
+    mocked = requests_mock.get(base, json=dict(foo=1))
+    url = url_for('jsondash.data', c_id=view['id'], guid=module['guid'])
+    res = test.get(url)
+    assert res.status_code == 200
+    assert json.loads(res.data) == dict(foo=1)
+    test.get(url)
+    assert mocked.call_count == 1
+    # Inputs replace the query string, and are cached separately.
+    module = view['modules'][1]
+    url = url_for('jsondash.data', c_id=view['id'], guid=module['guid'])
+    test.get(url + '?range=10&entries=5')
+    assert mocked.call_count == 2
+    assert mocked.last_request.url == base + '?entries=5&range=10'
+    # The same args, in any order, are the same request.
+    test.get(url + '?entries=5&range=10')
+    assert mocked.call_count == 2
+    # Args the module can't send are dropped.
+    test.get(url + '?range=10&entries=5&foo=bar&_=1234')
+    assert mocked.call_count == 2
+    test.get(url + '?foo=bar')
+    assert mocked.last_request.url == base + '?override=true'
+    assert mocked.call_count == 3
+
+
+def test_data_proxy_allowed_hosts(monkeypatch, client, requests_mock):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    modules = [
+        dict(guid='a', family='C3', dataSource='http://a.com/data'),
+        dict(guid='b', family='C3', dataSource='http://10.0.0.1/secrets'),
+    ]
+    view = setup_proxy(monkeypatch, app, modules=modules)
+    app.extensions['jsondash_data_proxy'].allowed_hosts = ['*.com']
+    requests_mock.get('http://a.com/data', json=dict(foo=1))
+    internal = requests_mock.get('http://10.0.0.1/secrets', json=dict())
+    res = test.get(url_for('jsondash.data', c_id=view['id'], guid='a'))
+    assert res.status_code == 200
+    res = test.get(url_for('jsondash.data', c_id=view['id'], guid='b'))
+    assert res.status_code == 403
+    assert 'not allowed' in json.loads(res.data)['error']
+    assert internal.call_count == 0
+    res = test.get(url_for('jsondash.batch_data', c_id=view['id']))
+    lines = [json.loads(line) for line in res.data.decode().splitlines()]
+    lines = dict((tuple(line.pop('guids')), line) for line in lines)
+    assert lines[('a',)]['status'] == 200
+    assert lines[('b',)]['status'] == 403
+    assert internal.call_count == 0
+
+
+def test_data_proxy_relative_url_root(monkeypatch, client, requests_mock):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    modules = [dict(guid='a', family='C3', dataSource='/data')]
+    view = setup_proxy(monkeypatch, app, modules=modules)
+    url = url_for('jsondash.data', c_id=view['id'], guid='a')
+    # Without a url root, relative dataSources can't be requested.
+    evil = requests_mock.get('http://evil.com/data', json=dict())
+    res = test.get(url, headers=dict(Host='evil.com'))
+    assert res.status_code == 403
+    # The Host header of the request is never used.
+    app.extensions['jsondash_data_proxy'].url_root = 'http://app.com/'
+    mocked = requests_mock.get('http://app.com/data', json=dict(foo=1))
+    res = test.get(url, headers=dict(Host='evil.com'))
+    assert res.status_code == 200
+    assert mocked.call_count == 1
+    assert evil.call_count == 0
+
+
+@pytest.mark.parametrize('config, url_root', [
+    (dict(), None),
+    (dict(SERVER_NAME='app.com'), 'http://app.com/'),
+    (dict(SERVER_NAME='app.com', JSONDASH=dict(data_proxy=dict(
+        url_root='https://dash.com/'))), 'https://dash.com/'),
+])
+def test_setup_data_proxy(config, url_root):
+    app = Flask('test_data_proxy')
+    app.config['JSONDASH_ENSURE_INDEXES'] = False
+    app.config['JSONDASH'] = dict(data_proxy=dict())
+    app.config.update(config)
+    app.config['JSONDASH']['data_proxy'].update(allowed_hosts=['*'])
+    app.register_blueprint(charts_builder.charts)
+    proxy = app.extensions['jsondash_data_proxy']
+    assert proxy.url_root == url_root
+    assert proxy.allowed_hosts == ['*']
+
+
+def test_setup_data_proxy_requires_allowed_hosts():
+    app = Flask('test_data_proxy')
+    app.config['JSONDASH_ENSURE_INDEXES'] = False
+    app.config['JSONDASH'] = dict(data_proxy=dict())
+    with pytest.raises(ValueError):
+        app.register_blueprint(charts_builder.charts)
+
+
+def test_data_proxy_upstream_error(monkeypatch, client, requests_mock):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    view = setup_proxy(monkeypatch, app)
+    module = view['modules'][0]
+    requests_mock.get(module['dataSource'].split('?')[0],
+                      exc=charts_builder.requests.ConnectionError)
+    res = test.get(url_for(
+        'jsondash.data', c_id=view['id'], guid=module['guid']))
+    assert res.status_code == 502
+    assert 'Could not fetch data' in json.loads(res.data)['error']
+
+
+def test_data_proxy_not_found(monkeypatch, client):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    view = setup_proxy(monkeypatch, app)
+    url = url_for('jsondash.data', c_id=view['id'], guid='nope')
+    assert test.get(url).status_code == 404
+
+
+def test_data_proxy_not_enabled(monkeypatch, client):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    view = get_json_config('inputs.json')
+    monkeypatch.setattr(adapter, 'read', read(override=dict(view)))
+    url = url_for('jsondash.data', c_id=view['id'],
+                  guid=view['modules'][0]['guid'])
+    assert test.get(url).status_code == 404
+    # Dashboards need to opt in, too.
+    monkeypatch.setitem(
+        app.extensions, 'jsondash_data_proxy', charts_builder.data_proxy.DataProxy())
+    assert test.get(url).status_code == 404
+
+
+def test_data_proxy_no_access(monkeypatch, client):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', lambda **kw: False)
+    view = setup_proxy(monkeypatch, app)
+    url = url_for('jsondash.data', c_id=view['id'],
+                  guid=view['modules'][0]['guid'])
+    assert test.get(url).status_code == 403
+
+
+def test_data_proxy_stats(monkeypatch, client, requests_mock):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    url = url_for('jsondash.data_stats')
+    assert test.get(url).status_code == 404
+    view = setup_proxy(monkeypatch, app)
+    module = view['modules'][0]
+    requests_mock.get(module['dataSource'].split('?')[0], json=dict(foo=1))
+    test.get(url_for('jsondash.data', c_id=view['id'], guid=module['guid']))
+    stats = json.loads(test.get(url).data)
+    assert stats['coalescing']['calls'] == 1
+    assert stats['cache']['misses'] == 1
+    monkeypatch.setattr(charts_builder, 'auth', lambda **kw: False)
+    assert test.get(url).status_code == 403
+
+
+def test_view_batch_url(monkeypatch, client):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    view = setup_proxy(monkeypatch, app)
+    dom = pq(test.get(url_for('jsondash.view', c_id=view['id'])).data)
+    expected = url_for('jsondash.batch_data', c_id=view['id'])
+    assert dom.find('#view-builder').attr('data-batch-url') == expected
+
+
+def test_batch_data(monkeypatch, client, requests_mock):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    modules = [
+        dict(guid='a', family='C3', dataSource='http://a.com/data'),
+        dict(guid='b', family='C3', dataSource='http://a.com/data'),
+        dict(guid='c', family='C3', dataSource='http://c.com/data'),
+        dict(guid='d', family='Basic', dataSource='http://d.com/data'),
+    ]
+    view = setup_proxy(monkeypatch, app, modules=modules)
+    a = requests_mock.get('http://a.com/data', json=dict(foo=1))
+    requests_mock.get('http://c.com/data', status_code=500, text='')
+    d = requests_mock.get('http://d.com/data', text='')
+    res = test.get(url_for('jsondash.batch_data', c_id=view['id']))
+    assert res.status_code == 200
+    assert res.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in res.data.decode().splitlines()]
+    lines = dict((tuple(line.pop('guids')), line) for line in lines)
+    assert lines == {
+        ('a', 'b'): dict(status=200, data=dict(foo=1)),
+        ('c',): dict(status=500, statusText='Internal Server Error'),
+    }
+    assert a.call_count == 1
+    assert d.call_count == 0
+
+
+def test_batch_data_timeouts(monkeypatch, client):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    modules = [
+        dict(guid='a', family='C3', dataSource='http://a.com/data',
+             timeout=5000, latencyBudget=500),
+        dict(guid='b', family='C3', dataSource='http://a.com/data',
+             timeout=2000),
+        dict(guid='c', family='C3', dataSource='http://c.com/data',
+             latencyBudget=0),
+        dict(guid='d', family='C3', dataSource='http://d.com/data'),
+    ]
+    view = setup_proxy(monkeypatch, app, modules=modules)
+    proxy = app.extensions['jsondash_data_proxy']
+    calls = dict()
+
+    def fetch(url, **kwargs):
+        calls[url] = kwargs
+        return charts_builder.data_proxy.Payload(b'{}', 200, 'text/plain')
+    monkeypatch.setattr(proxy, 'fetch', fetch)
+    res = test.get(url_for('jsondash.batch_data', c_id=view['id']))
+    assert len(res.data.decode().splitlines()) == 3
+    # Shared urls use the shortest timeout and budget of their modules.
+    assert calls == {
+        'http://a.com/data': dict(ttl=60, timeout=2, budget=0.5),
+        'http://c.com/data': dict(ttl=60, timeout=10, budget=0),
+        'http://d.com/data': dict(ttl=60, timeout=10, budget=None),
+    }
+
+
+def test_batch_data_not_enabled(monkeypatch, client):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    view = get_json_config('inputs.json')
+    view.update(proxy=True)
+    monkeypatch.setattr(adapter, 'read', read(override=dict(view)))
+    url = url_for('jsondash.batch_data', c_id=view['id'])
+    assert test.get(url).status_code == 404
+
+
+def test_data_proxy_key(monkeypatch, client, requests_mock):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    modules = [
+        dict(guid='a', family='C3', dataSource='http://a.com/s', key='pie'),
+        dict(guid='b', family='C3', dataSource='http://a.com/s', key='bar'),
+    ]
+    view = setup_proxy(monkeypatch, app, modules=modules)
+    mocked = requests_mock.get(
+        'http://a.com/s', json=dict(multicharts=dict(pie=[1], bar=[2])))
+    res = test.get(url_for('jsondash.data', c_id=view['id'], guid='a'))
+    assert json.loads(res.data) == [1]
+    res = test.get(url_for('jsondash.data', c_id=view['id'], guid='b'))
+    assert json.loads(res.data) == [2]
+    assert mocked.call_count == 1
+
+
+def setup_push(monkeypatch, app, modules):
+    view = setup_proxy(monkeypatch, app, modules=modules)
+    refresher = charts_builder.scheduler.RefreshScheduler(
+        app.extensions['jsondash_data_proxy'], keepalive=0.01)
+    refresher.start = lambda: None
+    monkeypatch.setitem(app.extensions, 'jsondash_scheduler', refresher)
+    return view, refresher
+
+
+def test_view_events_url(monkeypatch, client):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    view = setup_proxy(monkeypatch, app)
+    url = url_for('jsondash.view', c_id=view['id'])
+    dom = pq(test.get(url).data)
+    assert dom.find('#view-builder').attr('data-events-url') is None
+    view, _ = setup_push(monkeypatch, app, view['modules'])
+    dom = pq(test.get(url).data)
+    expected = url_for('jsondash.events', c_id=view['id'])
+    assert dom.find('#view-builder').attr('data-events-url') == expected
+
+
+def test_events(monkeypatch, client, requests_mock):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    modules = [
+        dict(guid='a', family='C3', dataSource='http://a.com/data',
+             refresh=True, refreshInterval=5000),
+        dict(guid='b', family='C3', dataSource='http://a.com/data',
+             refresh=True, refreshInterval=10000),
+        dict(guid='c', family='C3', dataSource='http://c.com/data'),
+    ]
+    view, refresher = setup_push(monkeypatch, app, modules)
+    requests_mock.get('http://a.com/data', json=dict(foo=1))
+    res = test.get(url_for('jsondash.events', c_id=view['id']))
+    assert res.mimetype == 'text/event-stream'
+    stream = (event.decode('utf-8') for event in res.response)
+    assert next(stream) == ': keepalive\n\n'
+    assert list(refresher._jobs) == ['http://a.com/data']
+    assert refresher._jobs['http://a.com/data'].interval == 5
+    for future in refresher.run_pending(now=time.time() + 10):
+        future.result()
+    event = next(stream)
+    assert event.startswith('event: data\ndata: ')
+    assert event.endswith('\n\n')
+    data = json.loads(event.split('data: ', 1)[1])
+    assert data == dict(guids=['a', 'b'], status=200, data=dict(foo=1))
+    res.close()
+    assert refresher._jobs == {}
+
+
+def test_events_downsampled(monkeypatch, client, requests_mock):
+    pytest.importorskip('numpy')
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    modules = [
+        dict(guid='a', family='C3', type='line', width=600,
+             dataSource='http://a.com/data', refresh=True,
+             refreshInterval=5000),
+        dict(guid='b', family='C3', type='line', width=600, downsample=True,
+             dataSource='http://a.com/data', refresh=True,
+             refreshInterval=5000),
+    ]
+    view, refresher = setup_push(monkeypatch, app, modules)
+    requests_mock.get(
+        'http://a.com/data', json=dict(line1=list(range(1000))))
+    res = test.get(url_for('jsondash.events', c_id=view['id']))
+    stream = (event.decode('utf-8') for event in res.response)
+    assert next(stream) == ': keepalive\n\n'
+    for future in refresher.run_pending(now=time.time() + 10):
+        future.result()
+    lines = [json.loads(next(stream).split('data: ', 1)[1])
+             for _ in range(2)]
+    lines = dict((tuple(line.pop('guids')), line) for line in lines)
+    assert len(lines[('a',)]['data']['line1']) == 1000
+    # The same number of points as the first load of the module.
+    first = test.get(url_for('jsondash.data', c_id=view['id'], guid='b'))
+    assert lines[('b',)]['data'] == json.loads(first.data)
+    assert len(lines[('b',)]['data']['line1']) == 600
+    res.close()
+
+
+def test_events_nothing_to_refresh(monkeypatch, client):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    modules = [dict(guid='a', family='C3', dataSource='http://a.com/data')]
+    view, _ = setup_push(monkeypatch, app, modules)
+    res = test.get(url_for('jsondash.events', c_id=view['id']))
+    assert res.status_code == 204
+
+
+def test_events_not_enabled(monkeypatch, client):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    view = setup_proxy(monkeypatch, app)
+    res = test.get(url_for('jsondash.events', c_id=view['id']))
+    assert res.status_code == 404
+
+
+def test_data_proxy_delta(monkeypatch, client, requests_mock):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    modules = [
+        dict(guid='a', family='C3', type='line', delta=True,
+             dataSource='http://a.com/data?x=1'),
+        dict(guid='b', family='C3', type='line',
+             dataSource='http://b.com/data?since=0'),
+    ]
+    view = setup_proxy(monkeypatch, app, modules=modules)
+    a = requests_mock.get('http://a.com/data', json=dict(line1=[1, 2, 3]))
+    b = requests_mock.get('http://b.com/data', json=dict(line1=[1, 2, 3]))
+    url = url_for('jsondash.data', c_id=view['id'], guid='a')
+    assert json.loads(test.get(url + '?since=2').data) == dict(line1=[3])
+    # The full payload is cached for all clients.
+    assert json.loads(test.get(url + '?since=1').data) == dict(line1=[2, 3])
+    assert a.call_count == 1
+    assert a.last_request.url == 'http://a.com/data?x=1'
+    # Only modules with delta enabled are sliced.
+    url = url_for('jsondash.data', c_id=view['id'], guid='b')
+    assert json.loads(test.get(url + '?since=2').data) == dict(
+        line1=[1, 2, 3])
+    assert b.last_request.url == 'http://b.com/data?since=2'
+
+
+def test_events_skips_delta_modules(monkeypatch, client):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    modules = [dict(guid='a', family='C3', dataSource='http://a.com/data',
+                    refresh=True, refreshInterval=5000, delta=True)]
+    view, _ = setup_push(monkeypatch, app, modules)
+    res = test.get(url_for('jsondash.events', c_id=view['id']))
+    assert res.status_code == 204
+
+
+def test_batch_data_downsampled(monkeypatch, client, requests_mock):
+    pytest.importorskip('numpy')
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    modules = [
+        dict(guid='a', family='C3', type='line', width=600,
+             dataSource='http://a.com/data'),
+        dict(guid='b', family='C3', type='line', width=600, downsample=10,
+             dataSource='http://a.com/data'),
+    ]
+    view = setup_proxy(monkeypatch, app, modules=modules)
+    mocked = requests_mock.get(
+        'http://a.com/data', json=dict(line1=list(range(1000))))
+    res = test.get(url_for('jsondash.batch_data', c_id=view['id']))
+    lines = [json.loads(line) for line in res.data.decode().splitlines()]
+    lines = dict((tuple(line.pop('guids')), line) for line in lines)
+    assert len(lines[('a',)]['data']['line1']) == 1000
+    assert len(lines[('b',)]['data']['line1']) == 10
+    assert mocked.call_count == 1
+    res = test.get(url_for('jsondash.data', c_id=view['id'], guid='b'))
+    assert len(json.loads(res.data)['line1']) == 10
+    assert mocked.call_count == 1
+
+
+def test_data_proxy_server_side(monkeypatch, client, requests_mock):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    modules = [
+        dict(guid='a', family='DataTable', type='datatable', serverSide=True,
+             dataSource='http://a.com/data?bar=0'),
+        dict(guid='b', family='DataTable', type='datatable',
+             dataSource='http://b.com/data'),
+    ]
+    view = setup_proxy(monkeypatch, app, modules=modules)
+    rows = [dict(foo=i) for i in range(100)]
+    a = requests_mock.get('http://a.com/data', json=rows)
+    b = requests_mock.get('http://b.com/data', json=rows)
+    query = ('?draw=2&start=10&length=5&columns[0][data]=foo'
+             '&order[0][column]=0&order[0][dir]=desc&bar=1')
+    url = url_for('jsondash.data', c_id=view['id'], guid='a')
+    res = json.loads(test.get(url + query).data)
+    assert res['draw'] == 2
+    assert res['recordsTotal'] == 100
+    assert [row['foo'] for row in res['data']] == [89, 88, 87, 86, 85]
+    # Only the other params are sent upstream, and the rows are cached.
+    assert a.last_request.url == 'http://a.com/data?bar=1'
+    test.get(url + query.replace('start=10', 'start=20'))
+    assert a.call_count == 1
+    # Plain requests still get all rows.
+    assert json.loads(test.get(url).data) == rows
+    # Only modules with serverSide enabled are paged.
+    url = url_for('jsondash.data', c_id=view['id'], guid='b')
+    assert json.loads(test.get(url + query).data) == rows
+
+
+def test_data_proxy_server_side_invalid(monkeypatch, client,
+                                        requests_mock):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    modules = [
+        dict(guid='a', family='DataTable', type='datatable', serverSide=True,
+             dataSource='http://a.com/data'),
+    ]
+    view = setup_proxy(monkeypatch, app, modules=modules)
+    mocked = requests_mock.get('http://a.com/data', json=[])
+    url = url_for('jsondash.data', c_id=view['id'], guid='a')
+    res = test.get(url + '?draw=1&start=nope&length=10')
+    assert res.status_code == 400
+    assert 'Invalid DataTables request' in json.loads(res.data)['error']
+    assert mocked.call_count == 0
+
+
+@pytest.mark.parametrize('payload', [
+    dict(rows=[dict(foo=1)]),
+    'not json',
+])
+def test_data_proxy_server_side_not_rows(monkeypatch, client, requests_mock,
+                                         payload):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    modules = [
+        dict(guid='a', family='DataTable', type='datatable', serverSide=True,
+             dataSource='http://a.com/data'),
+    ]
+    view = setup_proxy(monkeypatch, app, modules=modules)
+    if isinstance(payload, dict):
+        requests_mock.get('http://a.com/data', json=payload)
+    else:
+        requests_mock.get('http://a.com/data', text=payload)
+    url = url_for('jsondash.data', c_id=view['id'], guid='a')
+    res = test.get(url + '?draw=3&start=0&length=10')
+    assert res.status_code == 200
+    data = json.loads(res.data)
+    assert data['draw'] == 3
+    assert data['data'] == []
+    assert 'list of rows' in data['error']
+
+
+def test_batch_data_skips_server_side(monkeypatch, client, requests_mock):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    modules = [dict(guid='a', family='DataTable', type='datatable',
+                    serverSide=True, dataSource='http://a.com/data')]
+    view = setup_proxy(monkeypatch, app, modules=modules)
+    mocked = requests_mock.get('http://a.com/data', json=[])
+    res = test.get(url_for('jsondash.batch_data', c_id=view['id']))
+    assert res.data == b''
+    assert mocked.call_count == 0
+
+
+def test_data_proxy_columnar(monkeypatch, client, requests_mock):
+    pytest.importorskip('numpy')
+    from flask_jsondash.data_utils import columnar
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    modules = [dict(guid='a', family='C3', type='line', columnar=True,
+                    dataSource='http://a.com/data')]
+    view = setup_proxy(monkeypatch, app, modules=modules)
+    data = dict(line1=list(range(100)))
+    mocked = requests_mock.get('http://a.com/data', json=data)
+    url = url_for('jsondash.data', c_id=view['id'], guid='a')
+    headers = dict(Accept=columnar.MIMETYPE)
+    res = test.get(url, headers=headers)
+    assert res.content_type == columnar.MIMETYPE
+    assert 'Accept' in res.headers['Vary']
+    assert columnar.decode(res.data)['line1'].tolist() == data['line1']
+    # Other clients still get json, from the same cached response.
+    res = test.get(url)
+    assert res.content_type == 'application/json'
+    assert json.loads(res.data) == data
+    assert test.get(url, headers=headers).data == columnar.encode(data)
+    assert mocked.call_count == 1
+    # Columnar modules are loaded on their own.
+    res = test.get(url_for('jsondash.batch_data', c_id=view['id']))
+    assert res.data == b''
+
+
+def test_data_proxy_stale(monkeypatch, client, requests_mock):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    modules = [dict(guid='a', family='C3', dataSource='http://a.com/data')]
+    view = setup_proxy(monkeypatch, app, modules=modules)
+    proxy = app.extensions['jsondash_data_proxy']
+    monkeypatch.setattr(proxy, 'breaker', charts_builder.data_proxy.
+                        CircuitBreaker(max_failures=1, reset_timeout=60))
+    monkeypatch.setattr(proxy.cache, 'ttl', 0)
+    requests_mock.get('http://a.com/data', [
+        dict(json=dict(foo=1)), dict(status_code=500)])
+    url = url_for('jsondash.data', c_id=view['id'], guid='a')
+    assert 'Warning' not in test.get(url).headers
+    assert test.get(url).status_code == 500
+    res = test.get(url)
+    assert res.status_code == 200
+    assert json.loads(res.data) == dict(foo=1)
+    assert res.headers['Warning'] == '110 - "Response is Stale"'
+
+
+def test_circuits(monkeypatch, client, requests_mock):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    modules = [
+        dict(guid='a', family='C3', dataSource='http://a.com/data'),
+        dict(guid='b', family='C3', dataSource='http://b.com/data'),
+    ]
+    view = setup_proxy(monkeypatch, app, modules=modules)
+    proxy = app.extensions['jsondash_data_proxy']
+    url = url_for('jsondash.circuits', c_id=view['id'])
+    assert json.loads(test.get(url).data) == dict()
+    for _ in range(proxy.breaker.max_failures):
+        proxy.breaker.record('a.com', False)
+    res = json.loads(test.get(url).data)
+    assert list(res.keys()) == ['a']
+    assert res['a']['state'] == 'open'
+    assert res['a']['host'] == 'a.com'
+
+
+def setup_snapshots(monkeypatch, app, tmpdir):
+    store = charts_builder.snapshots.SnapshotStore(str(tmpdir))
+    monkeypatch.setitem(app.extensions, 'jsondash_snapshots', store)
+    monkeypatch.setitem(app.extensions, 'jsondash_data_proxy',
+                        charts_builder.data_proxy.DataProxy())
+    view = get_json_config('inputs.json')
+    for i, module in enumerate(view['modules']):
+        module.update(dataSource='http://a.com/data{}'.format(i),
+                      refresh=True)
+    adapter.create(data=view)
+    return store, view
+
+
+def test_snapshot(monkeypatch, client, requests_mock, tmpdir):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    store, view = setup_snapshots(monkeypatch, app, tmpdir)
+    first, second = view['modules']
+    requests_mock.get('http://a.com/data0', json=dict(foo=1))
+    requests_mock.get('http://a.com/data1', status_code=500)
+    res = test.post(url_for('jsondash.snapshot', c_id=view['id']),
+                    follow_redirects=True)
+    dom = pq(res.data)
+    assert 'Created new dashboard snapshot' in dom.find('.alert').text()
+    assert 'Could not get data for: {}'.format(
+        second['name']) in dom.find('.alert').text()
+    snap = read()[1]
+    assert snap['name'] == 'Snapshot of {}'.format(view['name'])
+    assert snap['snapshot']['source'] == view['id']
+    assert list(snap['snapshot']['data'].keys()) == [first['guid']]
+    assert not any(module['refresh'] for module in snap['modules'])
+    # The data is inlined, and nothing is fetched when viewing it.
+    requests_mock.reset_mock()
+    dom = pq(test.get(url_for('jsondash.view', c_id=snap['id'])).data)
+    data = json.loads(dom.find('#snapshot-data').text())
+    assert data == {first['guid']: dict(foo=1)}
+    assert requests_mock.call_count == 0
+    assert dom.find('#view-builder').attr('data-proxy-url') is None
+
+
+def test_snapshot_dedupes(monkeypatch, client, requests_mock, tmpdir):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    store, view = setup_snapshots(monkeypatch, app, tmpdir)
+    requests_mock.get('http://a.com/data0', json=dict(foo=1))
+    requests_mock.get('http://a.com/data1', json=dict(foo=1))
+    test.post(url_for('jsondash.snapshot', c_id=view['id']))
+    test.post(url_for('jsondash.snapshot', c_id=view['id']))
+    digests = [set(dash['snapshot']['data'].values()) for dash in read()[1:]]
+    assert digests[0] == digests[1]
+    assert len(digests[0]) == 1
+    assert len(tmpdir.listdir()) == 1
+
+
+def test_snapshot_reduced(monkeypatch, client, requests_mock, tmpdir):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    store, view = setup_snapshots(monkeypatch, app, tmpdir)
+    first, second = view['modules']
+    first.update(dataSource='http://a.com/shared', key='pie')
+    second.update(dataSource='http://a.com/shared', key='bar')
+    monkeypatch.setattr(adapter, 'read', read(override=dict(view)))
+    requests_mock.get('http://a.com/shared', json=dict(multicharts=dict(
+        pie=[1, 2], bar=dict(a=1))))
+    digests = []
+    monkeypatch.setattr(adapter, 'create', lambda data=None: digests.append(
+        data['snapshot']['data']))
+    test.post(url_for('jsondash.snapshot', c_id=view['id']))
+    # Each module only gets its own part of the shared payload.
+    assert json.loads(store.get(digests[0][first['guid']])) == [1, 2]
+    assert json.loads(store.get(digests[0][second['guid']])) == dict(a=1)
+
+
+def test_snapshot_stale(monkeypatch, client, requests_mock, tmpdir):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    store, view = setup_snapshots(monkeypatch, app, tmpdir)
+    first, second = view['modules']
+    proxy = app.extensions['jsondash_data_proxy']
+    requests_mock.get('http://a.com/data0', json=dict(foo=1))
+    requests_mock.get('http://a.com/data1', json=dict(foo=2))
+    proxy.fetch('http://a.com/data0')
+    # The host is failing, so only its last good data is available.
+    for _ in range(proxy.breaker.max_failures):
+        proxy.breaker.record('a.com', False)
+    res = test.post(url_for('jsondash.snapshot', c_id=view['id']),
+                    follow_redirects=True)
+    assert 'Could not get data for: {}, {}'.format(
+        first['name'], second['name']) in str(res.data)
+    assert read()[1]['snapshot']['data'] == dict()
+
+
+def test_snapshot_requires_proxy(tmpdir):
+    app = Flask('test_snapshots')
+    app.config['JSONDASH_ENSURE_INDEXES'] = False
+    app.config['JSONDASH'] = dict(snapshots=dict(path=str(tmpdir)))
+    with pytest.raises(ValueError):
+        app.register_blueprint(charts_builder.charts)
+
+
+def test_snapshot_not_enabled(monkeypatch, client):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    monkeypatch.delitem(app.extensions, 'jsondash_snapshots', raising=False)
+    res = test.post(url_for('jsondash.snapshot', c_id='123'))
+    assert res.status_code == 404
+
+
+def test_snapshot_no_access(monkeypatch, client, tmpdir):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_invalid)
+    store, view = setup_snapshots(monkeypatch, app, tmpdir)
+    res = test.post(url_for('jsondash.snapshot', c_id=view['id']),
+                    follow_redirects=True)
+    assert 'You do not have access to snapshot dashboards' in str(res.data)
+    assert len(read()) == 1
+
+
+def test_snapshot_invalid_id_redirect(monkeypatch, client, tmpdir):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    setup_snapshots(monkeypatch, app, tmpdir)
+    res = test.post(url_for('jsondash.snapshot', c_id='123'))
+    assert REDIRECT_MSG in str(res.data)
+
+
+def test_view_snapshot_button(monkeypatch, client, tmpdir):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    monkeypatch.delitem(app.extensions, 'jsondash_snapshots', raising=False)
+    view = get_json_config('inputs.json')
+    adapter.create(data=view)
+    url = url_for('jsondash.view', c_id=view['id'])
+    snapshot_url = url_for('jsondash.snapshot', c_id=view['id'])
+    assert snapshot_url not in str(test.get(url).data)
+    setup_snapshots(monkeypatch, app, tmpdir)
+    assert snapshot_url in str(test.get(url).data)
+
+
+def test_export_cli(monkeypatch, client, requests_mock, tmpdir):
+    app, test = client
+    view = get_json_config('inputs.json')
+    first, second = view['modules']
+    first.update(dataSource='http://a.com/data0', refresh=True)
+    second.update(dataSource='/data1')
+    adapter.create(data=view)
+    requests_mock.get('http://a.com/data0', json=dict(foo=1))
+    requests_mock.get('http://myapp.com/data1', status_code=500)
+    out = tmpdir.join('out')
+    args = ['jsondash', 'export', view['id'], str(out),
+            '--url-root', 'http://myapp.com/']
+    result = app.test_cli_runner().invoke(args=args)
+    assert result.exit_code == 0
+    assert 'Could not get data for: {}'.format(
+        second['name']) in result.output
+    data_name = charts_builder.export.get_data_name(first['guid'])
+    assert out.join(*data_name.split('/')).read() == '{"foo": 1}'
+    dom = pq(out.join('index.html').read())
+    # Embeddable, without any edit controls.
+    assert dom.find('.chart-header').length == 0
+    assert dom.find('#edit-view-container').length == 0
+    # Local assets are copied, and referenced relatively.
+    scripts = [s.attrib['src'] for s in dom.find('script[src]')]
+    assert 'jsondash/js/app.js' in scripts
+    assert out.join('jsondash', 'js', 'app.js').check()
+    assert not any(src.startswith('/jsondash/') for src in scripts)
+    assert not out.join('jsondash', 'js', 'api_docs.js').check()
+    html = out.join('index.html').read()
+    config = html.split('jsondash.loadDashboard(')[1].split(');\n')[0]
+    sources = dict((module['guid'], module)
+                   for module in json.loads(config)['modules'])
+    assert sources[first['guid']]['dataSource'] == data_name
+    assert sources[first['guid']]['refresh'] is False
+    # Modules that couldn't be fetched are loaded live.
+    assert sources[second['guid']]['dataSource'] == '/data1'
+
+
+def test_export_cli_incremental(monkeypatch, client, requests_mock, tmpdir):
+    app, test = client
+    view = get_json_config('inputs.json')
+    for i, module in enumerate(view['modules']):
+        module.update(dataSource='http://a.com/data{}'.format(i))
+    adapter.create(data=view)
+    requests_mock.get('http://a.com/data0', json=dict(foo=1))
+    requests_mock.get('http://a.com/data1', json=dict(foo=2))
+    args = ['jsondash', 'export', view['id'], str(tmpdir)]
+    result = app.test_cli_runner().invoke(args=args)
+    assert ' 0 unchanged, 0 removed.' in result.output
+    requests_mock.get('http://a.com/data1', json=dict(foo=3))
+    result = app.test_cli_runner().invoke(args=args)
+    assert '1 written' in result.output
+    data_name = charts_builder.export.get_data_name(
+        view['modules'][1]['guid'])
+    assert tmpdir.join(*data_name.split('/')).read() == '{"foo": 3}'
+
+
+def test_export_cli_invalid_id(client, tmpdir):
+    app, test = client
+    result = app.test_cli_runner().invoke(
+        args=['jsondash', 'export', '123', str(tmpdir)])
+    assert result.exit_code != 0
+    assert 'Could not find view: 123' in result.output
@@ -0,0 +1,625 @@
+import json
+import threading
+import time
+
+import pytest
+import requests
+from werkzeug.datastructures import MultiDict
+
+from flask_jsondash import data_proxy
+
+
+@pytest.fixture
+def proxy():
+    return data_proxy.DataProxy(ttl=60)
+
+
+def test_get_module():
+    view = dict(modules=[dict(guid='a'), dict(guid='b', name='foo')])
+    assert data_proxy.get_module(view, 'b') == dict(guid='b', name='foo')
+    assert data_proxy.get_module(view, 'c') is None
+    assert data_proxy.get_module(None, 'c') is None
+
+
+@pytest.mark.parametrize('source, query, expected', [
+    ('http://a.com/data', '', 'http://a.com/data'),
+    ('http://a.com/data?x=1', '', 'http://a.com/data?x=1'),
+    ('http://a.com/data', 'y=2', 'http://a.com/data?y=2'),
+    ('http://a.com/data?x=1', 'y=2', 'http://a.com/data?y=2'),
+])
+def test_get_url(source, query, expected):
+    assert data_proxy.get_url(source, query) == expected
+
+
+@pytest.mark.parametrize('module, expected', [
+    (dict(), 60),
+    (dict(refresh=False, refreshInterval=5000), 60),
+    (dict(refresh=True, refreshInterval=5000), 5),
+    (dict(refresh=True, refreshInterval=10), 1),
+    (dict(refresh=True), 60),
+])
+def test_get_ttl(proxy, module, expected):
+    assert proxy.get_ttl(module) == expected
+
+
+def test_fetch_cached(proxy, requests_mock):
+    mocked = requests_mock.get('http://a.com/data', json=dict(foo=1))
+    first = proxy.fetch('http://a.com/data')
+    second = proxy.fetch('http://a.com/data')
+    assert first == second
+    assert first.status == 200
+    assert first.content == b'{"foo": 1}'
+    assert first.content_type == 'application/json'
+    assert mocked.call_count == 1
+
+
+def test_fetch_ttl(proxy, requests_mock):
+    mocked = requests_mock.get('http://a.com/data', json=dict(foo=1))
+    proxy.fetch('http://a.com/data', ttl=0)
+    proxy.fetch('http://a.com/data', ttl=0)
+    assert mocked.call_count == 2
+
+
+def test_fetch_errors_not_cached(proxy, requests_mock):
+    mocked = requests_mock.get('http://a.com/data', status_code=500, text='')
+    assert proxy.fetch('http://a.com/data').status == 500
+    proxy.fetch('http://a.com/data')
+    assert mocked.call_count == 2
+
+
+def test_fetch_connection_error(proxy, requests_mock):
+    requests_mock.get('http://a.com/data', exc=requests.ConnectionError)
+    with pytest.raises(requests.RequestException):
+        proxy.fetch('http://a.com/data')
+
+
+def wait_for(condition, timeout=5):
+    start = time.time()
+    while not condition():
+        assert time.time() - start < timeout
+        time.sleep(0.001)
+
+
+def test_shared_cache(tmpdir):
+    shared = data_proxy.SharedCache(str(tmpdir.join('cache')))
+    payload = data_proxy.Payload(b'{"foo": 1}', 200, 'application/json')
+    assert shared.get('http://a.com/data') is None
+    shared.set('http://a.com/data', payload, ttl=60)
+    cached, ttl = shared.get('http://a.com/data')
+    assert cached == payload
+    assert 55 < ttl <= 60
+    shared.set('http://a.com/data', payload)
+    assert shared.get('http://a.com/data') == (payload, None)
+    shared.set('http://a.com/data', payload, ttl=-1)
+    assert shared.get('http://a.com/data') is None
+
+
+def test_fetch_shared_cache(requests_mock, tmpdir):
+    mocked = requests_mock.get('http://a.com/data', json=dict(foo=1))
+    first = data_proxy.DataProxy(cache_dir=str(tmpdir))
+    second = data_proxy.DataProxy(cache_dir=str(tmpdir))
+    assert first.fetch('http://a.com/data').status == 200
+    assert second.fetch('http://a.com/data').content == b'{"foo": 1}'
+    assert mocked.call_count == 1
+    # Hosts are checked for shared data, which other processes stored.
+    third = data_proxy.DataProxy(
+        cache_dir=str(tmpdir), allowed_hosts=['b.com'])
+    with pytest.raises(data_proxy.HostNotAllowedError):
+        third.fetch('http://a.com/data')
+
+
+def test_single_flight_coalesces():
+    flights = data_proxy.SingleFlight()
+    release = threading.Event()
+    results = []
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait()
+        return 'data'
+
+    def run():
+        results.append(flights.do('url', work))
+
+    threads = [threading.Thread(target=run) for _ in range(5)]
+    threads[0].start()
+    wait_for(lambda: calls)
+    for thread in threads[1:]:
+        thread.start()
+    wait_for(lambda: flights.calls == 5)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ['data'] * 5
+    assert len(calls) == 1
+    assert flights.stats() == dict(
+        calls=5, executions=1, shared=4, ratio=0.8)
+
+
+def test_single_flight_shares_errors():
+    flights = data_proxy.SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def work():
+        release.wait()
+        raise ValueError('Bad')
+
+    def run():
+        try:
+            flights.do('url', work)
+        except ValueError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: flights.calls == 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 3
+    assert flights.stats()['executions'] == 1
+    # Nothing is left in progress, so the next call runs again.
+    with pytest.raises(ValueError):
+        flights.do('url', work)
+    assert flights.stats()['executions'] == 2
+
+
+def test_single_flight_different_keys():
+    flights = data_proxy.SingleFlight()
+    assert flights.do('a', lambda: 1) == 1
+    assert flights.do('b', lambda: 2) == 2
+    assert flights.stats() == dict(
+        calls=2, executions=2, shared=0, ratio=0.0)
+
+
+def test_proxy_stats(proxy, requests_mock):
+    requests_mock.get('http://a.com/data', json=dict(foo=1))
+    proxy.fetch('http://a.com/data')
+    proxy.fetch('http://a.com/data')
+    stats = proxy.stats()
+    assert stats['cache']['hits'] == 1
+    assert stats['coalescing']['executions'] == 1
+
+
+def test_batch_line():
+    payload = data_proxy.Payload(b'{"foo": 1}', 200, 'application/json')
+    line = data_proxy.batch_line(['a', 'b'], payload)
+    assert line.endswith('\n')
+    assert json.loads(line) == dict(guids=['a', 'b'], status=200,
+                                    data=dict(foo=1))
+
+
+def test_batch_line_pretty_json_is_one_line():
+    payload = data_proxy.Payload(b'{\n  "foo": 1\n}\n', 200, 'text/plain')
+    line = data_proxy.batch_line(['a'], payload)
+    assert line.count('\n') == 1
+
+
+@pytest.mark.parametrize('payload, error, status, text', [
+    (None, requests.ConnectionError('Nope'), 502,
+     'Could not fetch data: Nope'),
+    (data_proxy.Payload(b'', 404, 'text/html'), None, 404, 'Not Found'),
+    (data_proxy.Payload(b'<html>', 200, 'text/html'), None, 502,
+     'Invalid JSON response'),
+])
+def test_batch_line_errors(payload, error, status, text):
+    line = json.loads(data_proxy.batch_line(['a'], payload, error))
+    assert line == dict(guids=['a'], status=status, statusText=text)
+
+
+def test_fetch_all(proxy, requests_mock):
+    requests_mock.get('http://a.com/data', json=dict(foo=1))
+    requests_mock.get('http://b.com/data', exc=requests.ConnectionError)
+    results = dict(
+        (url, (payload, error)) for url, payload, error in
+        proxy.fetch_all({'http://a.com/data': 10, 'http://b.com/data': 10}))
+    assert results['http://a.com/data'][0].status == 200
+    assert results['http://a.com/data'][1] is None
+    assert results['http://b.com/data'][0] is None
+    assert isinstance(results['http://b.com/data'][1],
+                      requests.ConnectionError)
+
+
+def test_fetch_all_options(proxy, requests_mock):
+    mocked = requests_mock.get('http://a.com/data', json=dict(foo=1))
+    requests_mock.get('http://b.com/data', json=dict(foo=2))
+    options = {'http://a.com/data': dict(timeout=2, budget=None)}
+    list(proxy.fetch_all(
+        {'http://a.com/data': 10, 'http://b.com/data': 10}, options))
+    assert mocked.last_request.timeout == 2
+    # The last good data is served once the budget runs out.
+    proxy.cache.clear()
+    flight = threading.Event()
+    requests_mock.get('http://a.com/data', json=lambda *args: (
+        flight.wait(1), dict(foo=3))[1])
+    options['http://a.com/data'].update(budget=0.01)
+    (url, payload, error), = proxy.fetch_all(
+        {'http://a.com/data': 10}, options)
+    flight.set()
+    assert isinstance(payload, data_proxy.StalePayload)
+    assert payload.content == b'{"foo": 1}'
+
+
+def test_slice_payload():
+    content = b'{"multicharts": {"pie": [1, 2], "bar": {"a": 1}}}'
+    payload = data_proxy.Payload(content, 200, 'text/plain')
+    sliced = data_proxy.slice_payload(payload, 'pie')
+    assert sliced == data_proxy.Payload(b'[1, 2]', 200, 'application/json')
+
+
+@pytest.mark.parametrize('content, status', [
+    (b'{"multicharts": {"bar": 1}}', 200),
+    (b'{"pie": 1}', 200),
+    (b'[1, 2]', 200),
+    (b'<html>', 200),
+    (b'{"multicharts": {"pie": 1}}', 500),
+])
+def test_slice_payload_unchanged(content, status):
+    payload = data_proxy.Payload(content, status, 'application/json')
+    assert data_proxy.slice_payload(payload, 'pie') is payload
+
+
+def test_fetch_key(proxy, requests_mock):
+    mocked = requests_mock.get(
+        'http://a.com/shared', json=dict(multicharts=dict(pie=[1], bar=[2])))
+    assert proxy.fetch_key('http://a.com/shared', 'pie').content == b'[1]'
+    assert proxy.fetch_key('http://a.com/shared', 'bar').content == b'[2]'
+    assert proxy.fetch_key('http://a.com/shared', 'pie').content == b'[1]'
+    assert mocked.call_count == 1
+    # The full payload and each slice.
+    assert len(proxy.cache) == 3
+
+
+def test_delta_payload():
+    content = b'{"dates": ["2017-01-01", "2017-01-02"], "line1": [1, 2]}'
+    payload = data_proxy.Payload(content, 200, 'text/plain')
+    res = data_proxy.delta_payload(payload, '2017-01-01', 'timeseries')
+    assert res.content_type == 'application/json'
+    assert json.loads(res.content.decode('utf-8')) == dict(
+        dates=['2017-01-02'], line1=[2])
+
+
+@pytest.mark.parametrize('content, status, since', [
+    (b'{"line1": [1, 2]}', 500, '1'),
+    (b'<html>', 200, '1'),
+    (b'[1, 2]', 200, '1'),
+    (b'{"line1": [1, 2]}', 200, 'foo'),
+])
+def test_delta_payload_unchanged(content, status, since):
+    payload = data_proxy.Payload(content, status, 'application/json')
+    assert data_proxy.delta_payload(payload, since, 'line') is payload
+
+
+@pytest.mark.parametrize('module, expected', [
+    (dict(), None),
+    (dict(downsample=True, family='C3', type='line', width=600), 600),
+    (dict(downsample=True, family='C3', type='line', width='600'), 600),
+    (dict(downsample=True, family='C3', type='timeseries', width='col-6'),
+     570),
+    (dict(downsample=200, family='C3', type='line', width=600), 200),
+    (dict(downsample=1, family='C3', type='line', width=600), 3),
+    (dict(downsample=True, family='C3', type='pie', width=600), None),
+    (dict(downsample=True, family='D3', type='line', width=600), None),
+    (dict(downsample=True, family='C3', type='line', width=600,
+          override=True), None),
+    (dict(downsample=True, family='C3', type='line', width=600,
+          delta=True), None),
+    (dict(downsample=True, family='C3', type='timeseries', width=600,
+          delta=True), 600),
+    (dict(downsample=True, family='C3', type='line', width='foo'), None),
+    (dict(downsample=True, family='C3', type='line', width='inf'), None),
+    # Invalid values (e.g. from form saves) aren't downsampled.
+    (dict(downsample=[100], family='C3', type='line', width=600), None),
+    (dict(downsample=dict(n=100), family='C3', type='line'), None),
+    (dict(downsample='foo', family='C3', type='line'), None),
+])
+def test_get_point_budget(module, expected):
+    assert data_proxy.get_point_budget(module) == expected
+
+
+def test_fetch_module_downsampled(proxy, requests_mock):
+    pytest.importorskip('numpy')
+    mocked = requests_mock.get(
+        'http://a.com/data', json=dict(line1=list(range(1000))))
+    module = dict(downsample=10, family='C3', type='line')
+    res = proxy.fetch_module('http://a.com/data', module)
+    assert len(json.loads(res.content.decode('utf-8'))['line1']) == 10
+    assert proxy.fetch_module('http://a.com/data', module) == res
+    assert mocked.call_count == 1
+
+
+def test_fetch_module_not_downsampled(proxy, requests_mock):
+    requests_mock.get('http://a.com/data', json=dict(line1=[1, 2]))
+    res = proxy.fetch_module('http://a.com/data', dict())
+    assert res == proxy.fetch('http://a.com/data')
+
+
+def test_get_reduced(proxy, monkeypatch):
+    pytest.importorskip('numpy')
+    module = dict(downsample=10, family='C3', type='line')
+    content = json.dumps(dict(line1=list(range(1000)))).encode('utf-8')
+    payload = data_proxy.Payload(content, 200, 'application/json')
+    res = proxy.get_reduced('http://a.com/data', module, payload)
+    assert len(json.loads(res.content.decode('utf-8'))['line1']) == 10
+    # Reduced once per version of the response.
+    monkeypatch.setattr(data_proxy, 'reduce_payload', None)
+    assert proxy.get_reduced('http://a.com/data', module, payload) == res
+
+
+@pytest.mark.parametrize('module, key, expected', [
+    (dict(), False, False),
+    (dict(key='foo'), False, False),
+    (dict(key='foo'), True, True),
+    (dict(downsample=10, family='C3', type='line'), False, True),
+    (dict(bins=10, family='PlotlyStandard'), False, True),
+])
+def test_is_reduced(module, key, expected):
+    assert data_proxy.is_reduced(module, key=key) is expected
+
+
+def test_downsample_payload_unchanged(monkeypatch):
+    payload = data_proxy.Payload(b'<html>', 200, 'text/html')
+    assert data_proxy.downsample_payload(payload, 10, 'line') is payload
+    monkeypatch.setattr(data_proxy.downsample, 'np', None)
+    payload = data_proxy.Payload(b'{"line1": [1, 2]}', 200, 'text/html')
+    assert data_proxy.downsample_payload(payload, 1, 'line') is payload
+
+
+@pytest.mark.parametrize('module, expected', [
+    (dict(), None),
+    (dict(bins=10), None),
+    (dict(bins=10, family='C3'), None),
+    (dict(bins=10, family='PlotlyStandard'), 10),
+    (dict(bins=[10, 20], family='PlotlyStandard'), (10, 20)),
+    (dict(bins='10', family='PlotlyStandard'), 10),
+    # Invalid values (e.g. from form saves) aren't binned.
+    (dict(bins='10,x', family='PlotlyStandard'), None),
+    (dict(bins=dict(x=10), family='PlotlyStandard'), None),
+    (dict(bins=[10, None], family='PlotlyStandard'), None),
+    (dict(bins=-5, family='PlotlyStandard'), None),
+    (dict(bins=[10, 0], family='PlotlyStandard'), None),
+])
+def test_get_bins(module, expected):
+    assert data_proxy.get_bins(module) == expected
+
+
+def test_fetch_module_binned(proxy, requests_mock):
+    pytest.importorskip('numpy')
+    trace = dict(type='histogram', x=list(range(1000)))
+    requests_mock.get('http://a.com/data', json=dict(data=[trace]))
+    module = dict(bins=10, family='PlotlyStandard')
+    res = proxy.fetch_module('http://a.com/data', module)
+    data = json.loads(res.content.decode('utf-8'))
+    assert data['data'][0]['type'] == 'bar'
+    assert data['data'][0]['y'] == [100] * 10
+
+
+def test_bin_payload_unchanged(monkeypatch):
+    payload = data_proxy.Payload(b'<html>', 200, 'text/html')
+    assert data_proxy.bin_payload(payload, 10) is payload
+    monkeypatch.setattr(data_proxy.binning, 'np', None)
+    payload = data_proxy.Payload(b'[]', 200, 'application/json')
+    assert data_proxy.bin_payload(payload, 10) is payload
+
+
+@pytest.mark.parametrize('module, timeout, budget', [
+    (dict(), None, None),
+    (dict(timeout=2500, latencyBudget=500), 2.5, 0.5),
+    (dict(timeout=None, latencyBudget=0), None, 0),
+])
+def test_get_timeout_and_budget(module, timeout, budget):
+    assert data_proxy.get_timeout(module) == timeout
+    assert data_proxy.get_latency_budget(module) == budget
+
+
+def test_circuit_breaker():
+    breaker = data_proxy.CircuitBreaker(max_failures=2, reset_timeout=10)
+    assert breaker.state('a.com') == breaker.CLOSED
+    breaker.record('a.com', False, now=0)
+    assert breaker.allow('a.com', now=0)
+    breaker.record('a.com', False, now=1)
+    assert breaker.state('a.com', now=1) == breaker.OPEN
+    assert not breaker.allow('a.com', now=5)
+    assert breaker.stats(now=5) == {
+        'a.com': dict(state='open', failures=2, retry_in=6)}
+    # Other hosts aren't affected.
+    assert breaker.allow('b.com', now=5)
+    # Only a single probe is let through once half-open.
+    assert breaker.state('a.com', now=11) == breaker.HALF_OPEN
+    assert breaker.allow('a.com', now=11)
+    assert not breaker.allow('a.com', now=11)
+    # A failed probe opens it again.
+    breaker.record('a.com', False, now=12)
+    assert breaker.state('a.com', now=12) == breaker.OPEN
+    assert breaker.allow('a.com', now=22)
+    breaker.record('a.com', True, now=22)
+    assert breaker.state('a.com', now=22) == breaker.CLOSED
+    assert breaker.stats() == dict()
+
+
+def test_fetch_circuit_open(requests_mock):
+    proxy = data_proxy.DataProxy(ttl=0, max_failures=2, reset_timeout=60)
+    mocked = requests_mock.get('http://a.com/data', [
+        dict(json=dict(foo=1)),
+        dict(status_code=500),
+        dict(exc=requests.ConnectTimeout),
+    ])
+    assert proxy.fetch('http://a.com/data').status == 200
+    assert proxy.fetch('http://a.com/data').status == 500
+    with pytest.raises(requests.ConnectTimeout):
+        proxy.fetch('http://a.com/data')
+    # The last good response is served while the circuit is open.
+    payload = proxy.fetch('http://a.com/data')
+    assert isinstance(payload, data_proxy.StalePayload)
+    assert json.loads(payload.content) == dict(foo=1)
+    assert mocked.call_count == 3
+    # Urls without a good response fail right away.
+    requests_mock.get('http://a.com/other', json=dict(foo=2))
+    with pytest.raises(data_proxy.CircuitOpenError):
+        proxy.fetch('http://a.com/other')
+    assert proxy.stats()['circuits']['a.com']['state'] == 'open'
+
+
+def test_fetch_circuit_half_open(requests_mock):
+    proxy = data_proxy.DataProxy(ttl=0, max_failures=1, reset_timeout=0)
+    mocked = requests_mock.get('http://a.com/data', [
+        dict(status_code=503),
+        dict(json=dict(foo=1)),
+    ])
+    assert proxy.fetch('http://a.com/data').status == 503
+    # The probe closes the circuit again.
+    assert proxy.fetch('http://a.com/data').status == 200
+    assert proxy.breaker.state('a.com') == proxy.breaker.CLOSED
+    assert mocked.call_count == 2
+
+
+def test_fetch_circuit_probe_other_error(requests_mock):
+    proxy = data_proxy.DataProxy(ttl=0, max_failures=1, reset_timeout=0)
+    mocked = requests_mock.get('http://a.com/data', [
+        dict(status_code=503),
+        dict(exc=ValueError('bad')),
+        dict(json=dict(foo=1)),
+    ])
+    assert proxy.fetch('http://a.com/data').status == 503
+    with pytest.raises(ValueError):
+        proxy.fetch('http://a.com/data')
+    # The failed probe doesn't keep other requests from probing.
+    assert proxy.fetch('http://a.com/data').status == 200
+    assert proxy.breaker.state('a.com') == proxy.breaker.CLOSED
+    assert mocked.call_count == 3
+
+
+def test_circuit_breaker_release():
+    breaker = data_proxy.CircuitBreaker(max_failures=1, reset_timeout=10)
+    breaker.release('a.com')
+    breaker.record('a.com', False, now=0)
+    assert breaker.allow('a.com', now=10)
+    assert not breaker.allow('a.com', now=10)
+    breaker.release('a.com')
+    assert breaker.allow('a.com', now=10)
+
+
+def test_fetch_module_timeout(proxy, requests_mock):
+    requests_mock.get('http://a.com/data', json=dict(foo=1))
+    proxy.fetch_module('http://a.com/data', dict(timeout=2500))
+    assert requests_mock.last_request.timeout == 2.5
+    proxy.fetch('http://a.com/data?x=1')
+    assert requests_mock.last_request.timeout == proxy.timeout
+
+
+def test_fetch_module_latency_budget(requests_mock):
+    proxy = data_proxy.DataProxy(ttl=0)
+
+    def slow(request, context):
+        time.sleep(0.3)
+        return json.dumps(dict(foo=2))
+    mocked = requests_mock.get('http://a.com/data', [
+        dict(json=dict(foo=1)),
+        dict(text=slow),
+    ])
+    module = dict(key=None, latencyBudget=50)
+    assert json.loads(
+        proxy.fetch_module('http://a.com/data', module).content) == dict(foo=1)
+    payload = proxy.fetch_module('http://a.com/data', module)
+    assert isinstance(payload, data_proxy.StalePayload)
+    assert json.loads(payload.content) == dict(foo=1)
+    # The request finishes in the background, for the next one.
+    time.sleep(0.4)
+    assert json.loads(
+        proxy.last_good.get('http://a.com/data').content) == dict(foo=2)
+    assert mocked.call_count == 2
+
+
+def test_get_query():
+    module = dict(dataSource='http://a.com/data?b=1&a=2',
+                  inputs=dict(options=[dict(name='c'), dict(name='d')]))
+    args = MultiDict([('c', '3'), ('b', '4'), ('x', '5'), ('c', '6')])
+    assert data_proxy.get_query(module, args) == 'b=4&c=3&c=6'
+    assert data_proxy.get_query(module, MultiDict([('x', '1')])) == ''
+    assert data_proxy.get_query(
+        dict(dataSource='http://a.com/data'), MultiDict([('a', '1')])) == ''
+
+
+@pytest.mark.parametrize('url, allowed', [
+    ('http://a.com/data', True),
+    ('https://A.com:8080/data', True),
+    ('http://api.b.com/data', True),
+    ('http://b.com/data', False),
+    ('http://c.com:8080/data', True),
+    ('http://c.com/data', False),
+    ('http://localhost/data', False),
+    ('http://169.254.169.254/latest', False),
+    ('/data', False),
+    ('ftp://a.com/data', False),
+])
+def test_is_allowed(url, allowed):
+    proxy = data_proxy.DataProxy(
+        allowed_hosts=['a.com', '*.b.com', 'c.com:8080'])
+    assert proxy.is_allowed(url) is allowed
+
+
+def test_fetch_not_allowed(requests_mock):
+    proxy = data_proxy.DataProxy(allowed_hosts=['a.com'])
+    mocked = requests_mock.get('http://b.com/data', json=dict())
+    with pytest.raises(data_proxy.HostNotAllowedError):
+        proxy.fetch('http://b.com/data')
+    assert mocked.call_count == 0
+    # Not counted as a failure of the host.
+    assert proxy.breaker.stats() == dict()
+    # All hosts are allowed by default.
+    assert data_proxy.DataProxy().fetch('http://b.com/data').status == 200
+
+
+def test_is_allowed_absolute_only():
+    proxy = data_proxy.DataProxy()
+    assert proxy.is_allowed('http://b.com/data')
+    assert not proxy.is_allowed('/data')
+    assert not proxy.is_allowed('file:///etc/passwd')
+
+
+def test_join_url():
+    assert data_proxy.DataProxy().join_url('/data') == '/data'
+    proxy = data_proxy.DataProxy(url_root='http://app.com/dash/')
+    assert proxy.join_url('/data') == 'http://app.com/data'
+    assert proxy.join_url('data') == 'http://app.com/dash/data'
+    assert proxy.join_url('http://a.com/data') == 'http://a.com/data'
+
+
+def test_fetch_redirects(requests_mock):
+    proxy = data_proxy.DataProxy(allowed_hosts=['a.com', 'b.com'])
+    requests_mock.get('http://a.com/data', status_code=302,
+                      headers=dict(location='http://b.com/data'))
+    requests_mock.get('http://b.com/data', json=dict(foo=1))
+    payload = proxy.fetch('http://a.com/data')
+    assert payload.status == 200
+    assert payload.content == b'{"foo": 1}'
+
+
+def test_fetch_redirect_not_allowed(requests_mock):
+    proxy = data_proxy.DataProxy(allowed_hosts=['a.com'])
+    requests_mock.get('http://a.com/data', status_code=302, headers=dict(
+        location='http://169.254.169.254/latest/meta-data'))
+    internal = requests_mock.get(
+        'http://169.254.169.254/latest/meta-data', text='secret')
+    with pytest.raises(data_proxy.HostNotAllowedError):
+        proxy.fetch('http://a.com/data')
+    assert internal.call_count == 0
+    assert proxy.cache.get('http://a.com/data') is None
+
+
+def test_fetch_too_many_redirects(requests_mock):
+    proxy = data_proxy.DataProxy(allowed_hosts=['a.com'])
+    mocked = requests_mock.get('http://a.com/data', status_code=302,
+                               headers=dict(location='/data'))
+    with pytest.raises(requests.TooManyRedirects):
+        proxy.fetch('http://a.com/data')
+    assert mocked.call_count == data_proxy.MAX_REDIRECTS + 1
+
+
+def test_batch_line_not_allowed():
+    line = json.loads(data_proxy.batch_line(
+        ['a'], error=data_proxy.HostNotAllowedError('nope')))
+    assert line['status'] == 403
@@ -0,0 +1,92 @@
+import pytest
+
+from flask_jsondash.data_utils import binning
+
+np = pytest.importorskip('numpy')
+
+
+def test_bin_histogram():
+    trace = dict(type='histogram', x=[0, 1, 1, 2, 2, 2, 3, 3, 3, 3],
+                 opacity=0.5, marker=dict(color='red'))
+    res = binning.bin_trace(trace, 4)
+    assert res['type'] == 'bar'
+    assert res['y'] == [1, 2, 3, 4]
+    assert res['x'] == [0.375, 1.125, 1.875, 2.625]
+    assert res['width'] == [0.75] * 4
+    # Styles are kept.
+    assert res['opacity'] == 0.5
+    assert res['marker'] == dict(color='red')
+
+
+def test_bin_histogram_horizontal():
+    res = binning.bin_trace(dict(type='histogram', y=[0, 1, 1]), 2)
+    assert res['orientation'] == 'h'
+    assert res['x'] == [1, 2]
+    assert res['y'] == [0.25, 0.75]
+
+
+@pytest.mark.parametrize('norm, expected', [
+    ('percent', [25, 75]),
+    ('probability', [0.25, 0.75]),
+    ('density', [2, 6]),
+    ('probability density', [0.5, 1.5]),
+])
+def test_bin_histogram_histnorm(norm, expected):
+    trace = dict(type='histogram', x=[0, 1, 1, 1], histnorm=norm)
+    assert binning.bin_trace(trace, 2)['y'] == expected
+
+
+@pytest.mark.parametrize('trace', [
+    dict(type='histogram', x=['a', 'b']),
+    dict(type='histogram', x=[1, 2], y=[1, 2], histfunc='sum'),
+    dict(type='histogram', x=[1, 2], histnorm='foo'),
+    dict(type='histogram2d', x=[1, 2], y=[1]),
+    dict(type='histogram2d', x=[1, 2], y=[1, 2], histnorm='percent'),
+    dict(type='heatmap', x=['a', 'b'], y=['c'], z=[[1, 2]]),
+    dict(type='heatmap', x=[1, 2], y=[1, 2], z=[[1, 2], [3, 4]]),
+    dict(type='scatter', x=[1, 2], y=[1, 2]),
+    'foo',
+])
+def test_bin_trace_unchanged(trace):
+    assert binning.bin_trace(trace, 2) is trace
+
+
+def test_bin_histogram2d():
+    trace = dict(type='histogram2d', x=[0, 0, 1, 1, 1], y=[0, 1, 1, 1, 1],
+                 colorscale='Viridis')
+    res = binning.bin_trace(trace, [2, 2])
+    assert res['type'] == 'heatmap'
+    assert res['x'] == [0.25, 0.75]
+    assert res['y'] == [0.25, 0.75]
+    # Rows are y values.
+    assert res['z'] == [[1, 0], [1, 3]]
+    assert res['colorscale'] == 'Viridis'
+
+
+def test_bin_histogram2dcontour():
+    trace = dict(type='histogram2dcontour', x=[0, 1], y=[0, 1])
+    assert binning.bin_trace(trace, 2)['type'] == 'contour'
+
+
+def test_bin_heatmap_samples():
+    trace = dict(type='heatmap', x=[0, 0, 1, 1, 1], y=[0, 0, 0, 1, 1],
+                 z=[1, 3, 5, None, 4])
+    res = binning.bin_trace(trace, 2)
+    assert res['z'] == [[2, 5], [None, 4]]
+
+
+def test_bin_traces():
+    hist = dict(type='histogram', x=list(range(1000)))
+    figure = dict(data=[hist, dict(type='scatter')], layout=dict(title='a'))
+    res = binning.bin_traces(figure, 10)
+    assert res['layout'] == dict(title='a')
+    assert len(res['data'][0]['x']) == 10
+    assert res['data'][1] == dict(type='scatter')
+    assert len(binning.bin_traces([hist], 10)[0]['x']) == 10
+    assert binning.bin_traces(dict(foo=1), 10) == dict(foo=1)
+
+
+def test_bin_trace_requires_numpy(monkeypatch):
+    monkeypatch.setattr(binning, 'np', None)
+    with pytest.raises(ImportError):
+        binning.bin_trace(dict(type='histogram', x=[1]), 1)
@@ -0,0 +1,91 @@
+import json
+import struct
+
+import pytest
+
+from flask_jsondash.data_utils import columnar
+
+np = pytest.importorskip('numpy')
+
+
+def test_encode_roundtrip():
+    data = dict(
+        dates=list(range(1000)),
+        line1=[i * 0.5 for i in range(1000)],
+        labels=['a'] * 20,
+        short=[1, 2, 3],
+    )
+    res = columnar.decode(columnar.encode(data))
+    assert res['dates'].dtype == np.int32
+    assert res['dates'].tolist() == data['dates']
+    assert res['line1'].dtype == np.float64
+    assert res['line1'].tolist() == data['line1']
+    # Non-numeric and short lists are left as json.
+    assert res['labels'] == data['labels']
+    assert res['short'] == [1, 2, 3]
+
+
+def test_encode_smaller_than_json():
+    data = dict(line1=[i * 0.123456789 for i in range(10000)])
+    assert len(columnar.encode(data)) < len(json.dumps(data)) * 0.6
+
+
+def test_encode_nested():
+    data = [
+        dict(type='scatter', x=list(range(20)), y=np.arange(20) * 1.5),
+        dict(type='bar', x=['a', 'b'], y=np.array([1, 2], dtype='int64')),
+    ]
+    res = columnar.decode(columnar.encode(data))
+    assert res[0]['type'] == 'scatter'
+    assert res[0]['x'].tolist() == list(range(20))
+    assert res[0]['y'].tolist() == (np.arange(20) * 1.5).tolist()
+    # Numpy arrays are always encoded.
+    assert res[1]['x'] == ['a', 'b']
+    assert res[1]['y'].dtype == np.int32
+    assert res[1]['y'].tolist() == [1, 2]
+
+
+@pytest.mark.parametrize('values, dtype', [
+    (np.arange(20, dtype='float32'), 'float32'),
+    (np.arange(20, dtype='uint8'), 'uint8'),
+    (list(range(20)), 'int32'),
+    ([2 ** 40] * 20, 'float64'),
+    ([1] * 10 + [1.5] * 10, 'float64'),
+])
+def test_to_column_dtype(values, dtype):
+    assert columnar.to_column(values).dtype.name == dtype
+
+
+@pytest.mark.parametrize('values', [
+    [True] * 20,
+    [1] * 19 + [None],
+    [1] * 19 + ['1'],
+    [1] * 5,
+    np.array(['a'] * 20),
+    np.zeros((20, 2)),
+])
+def test_to_column_invalid(values):
+    assert columnar.to_column(values) is None
+
+
+def test_encode_alignment():
+    data = dict(a=np.arange(3, dtype='uint8'), b=np.arange(3, dtype='float64'))
+    content = columnar.encode(data)
+    size = struct.unpack('<I', content[:4])[0]
+    header = json.loads(content[4:4 + size].decode('utf-8'))
+    offsets = [col['offset'] for col in header['columns']]
+    assert all(offset % 8 == 0 for offset in offsets)
+    assert min(offsets) >= 4 + size
+    assert len(content) % 8 == 0
+
+
+def test_encode_no_columns():
+    data = dict(foo='bar')
+    assert columnar.decode(columnar.encode(data)) == data
+
+
+def test_is_accepted():
+    from werkzeug.datastructures import MIMEAccept
+    assert columnar.is_accepted(MIMEAccept([(columnar.MIMETYPE, 1)]))
+    assert not columnar.is_accepted(MIMEAccept([('*/*', 1)]))
+    assert not columnar.is_accepted(MIMEAccept([(columnar.MIMETYPE, 0)]))
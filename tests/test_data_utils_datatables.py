@@ -0,0 +1,158 @@
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from flask_jsondash.data_utils import datatables
+
+
+ROWS = [
+    dict(name='Bob', city='Boston', age=30),
+    dict(name='alice', city='Austin', age=None),
+    dict(name='Carl', city='boston', age=25),
+    dict(name='Dana', city='Denver', age=41),
+]
+
+
+def make_args(start=0, length=10, search='', order=None, columns=None,
+              **extra):
+    columns = columns or ['name', 'city', 'age']
+    args = MultiDict([
+        ('draw', '3'),
+        ('start', str(start)),
+        ('length', str(length)),
+        ('search[value]', search),
+        ('search[regex]', 'false'),
+        ('_', '1234'),
+    ])
+    for i, col in enumerate(columns):
+        args.add('columns[{}][data]'.format(i), col)
+        args.add('columns[{}][searchable]'.format(i), 'true')
+        args.add('columns[{}][orderable]'.format(i), 'true')
+        args.add('columns[{}][search][value]'.format(i),
+                 extra.pop('search_{}'.format(col), ''))
+    for i, (col, direction) in enumerate(order or []):
+        args.add('order[{}][column]'.format(i), str(col))
+        args.add('order[{}][dir]'.format(i), direction)
+    for key, val in extra.items():
+        args.add(key, val)
+    return args
+
+
+def names(res):
+    return [row['name'] for row in res['data']]
+
+
+def test_is_request():
+    assert datatables.is_request(make_args())
+    assert not datatables.is_request(MultiDict([('foo', 'bar')]))
+
+
+def test_strip_args():
+    args = make_args(order=[(0, 'asc')], foo='bar')
+    assert datatables.strip_args(args) == MultiDict([('foo', 'bar')])
+    # The original args are unchanged.
+    assert 'draw' in args
+
+
+def test_parse_request():
+    table = datatables.parse_request(
+        make_args(start=5, length=20, search='bo',
+                  order=[(2, 'desc'), (0, 'asc')], search_city='aus'))
+    assert table.draw == 3
+    assert table.start == 5
+    assert table.length == 20
+    assert table.search == 'bo'
+    assert table.order == [(2, True), (0, False)]
+    assert [col.data for col in table.columns] == ['name', 'city', 'age']
+    assert table.columns[1].search == 'aus'
+    assert table.columns[0].searchable
+
+
+@pytest.mark.parametrize('key', ['draw', 'start', 'length'])
+def test_parse_request_invalid(key):
+    args = make_args()
+    args[key] = 'nope'
+    with pytest.raises(ValueError):
+        datatables.parse_request(args)
+
+
+def test_serve_counts():
+    res = datatables.serve(ROWS, make_args(length=2))
+    assert res['draw'] == 3
+    assert res['recordsTotal'] == 4
+    assert res['recordsFiltered'] == 4
+    assert names(res) == ['Bob', 'alice']
+
+
+def test_serve_paging():
+    res = datatables.serve(ROWS, make_args(start=2, length=2))
+    assert names(res) == ['Carl', 'Dana']
+    assert res['recordsTotal'] == 4
+
+
+def test_serve_all_rows():
+    res = datatables.serve(ROWS, make_args(start=1, length=-1))
+    assert names(res) == ['alice', 'Carl', 'Dana']
+
+
+def test_serve_search():
+    res = datatables.serve(ROWS, make_args(search='BOST'))
+    assert names(res) == ['Bob', 'Carl']
+    assert res['recordsTotal'] == 4
+    assert res['recordsFiltered'] == 2
+
+
+def test_serve_column_search():
+    res = datatables.serve(ROWS, make_args(search_city='a'))
+    assert names(res) == ['alice']
+    assert res['recordsFiltered'] == 1
+
+
+@pytest.mark.parametrize('order, expected', [
+    ([(0, 'asc')], ['Bob', 'Carl', 'Dana', 'alice']),
+    ([(2, 'asc')], ['alice', 'Carl', 'Bob', 'Dana']),
+    ([(2, 'desc')], ['Dana', 'Bob', 'Carl', 'alice']),
+    ([(1, 'asc'), (0, 'desc')], ['alice', 'Bob', 'Dana', 'Carl']),
+])
+def test_serve_order(order, expected):
+    res = datatables.serve(ROWS, make_args(order=order))
+    assert names(res) == expected
+
+
+def test_serve_order_paged():
+    res = datatables.serve(ROWS, make_args(start=1, length=2,
+                                           order=[(2, 'desc')]))
+    assert names(res) == ['Bob', 'Carl']
+    res = datatables.serve(ROWS, make_args(start=3, length=-1,
+                                           order=[(2, 'desc')]))
+    assert names(res) == ['alice']
+
+
+def test_serve_order_not_orderable():
+    args = make_args(order=[(0, 'desc')])
+    args['columns[0][orderable]'] = 'false'
+    assert names(datatables.serve(ROWS, args)) == names(
+        datatables.serve(ROWS, make_args()))
+
+
+def test_serve_generator():
+    rows = (dict(name=str(i)) for i in range(100))
+    res = datatables.serve(rows, make_args(start=10, length=2,
+                                           columns=['name']))
+    assert names(res) == ['10', '11']
+    assert res['recordsTotal'] == 100
+    assert res['recordsFiltered'] == 100
+
+
+def test_serve_callable():
+    res = datatables.serve(lambda: iter(ROWS), make_args(length=1))
+    assert names(res) == ['Bob']
+    assert res['recordsTotal'] == 4
+
+
+def test_serve_list_rows():
+    rows = [['b', 2], ['a', 1], ['c', 3]]
+    res = datatables.serve(rows, make_args(order=[(0, 'asc')],
+                                           columns=['0', '1']))
+    assert res['data'] == [['a', 1], ['b', 2], ['c', 3]]
+    res = datatables.serve(rows, make_args(search_1='3', columns=['0', '1']))
+    assert res['data'] == [['c', 3]]
@@ -0,0 +1,85 @@
+import math
+
+import pytest
+
+from flask_jsondash.data_utils import downsample
+
+np = pytest.importorskip('numpy')
+
+
+def test_lttb_small():
+    assert list(downsample.lttb([0, 1, 2], [1, 2, 3], 10)) == [0, 1, 2]
+    assert list(downsample.lttb([0, 1, 2, 3], [1, 2, 3, 4], 2)) == [
+        0, 1, 2, 3]
+
+
+def test_lttb_keeps_ends_and_peaks():
+    x = list(range(1000))
+    y = [0] * 1000
+    y[500] = 100
+    y[250] = -100
+    indices = list(downsample.lttb(x, y, 20))
+    assert len(indices) == 20
+    assert indices[0] == 0
+    assert indices[-1] == 999
+    assert 500 in indices
+    assert 250 in indices
+    assert indices == sorted(indices)
+
+
+def test_lttb_missing_values():
+    y = [float(i % 7) for i in range(100)]
+    y[50] = None
+    indices = list(downsample.lttb(list(range(100)), y, 10))
+    assert len(indices) == 10
+    assert 50 not in indices
+
+
+def test_downsample_line():
+    data = dict(
+        line1=[math.sin(i / 10.0) for i in range(10000)],
+        line2=[math.cos(i / 10.0) for i in range(10000)],
+    )
+    res = downsample.downsample(data, 100)
+    assert len(res['line1']) == len(res['line2'])
+    assert len(res['line1']) <= 100
+    assert res['line1'][0] == data['line1'][0]
+    assert res['line1'][-1] == data['line1'][-1]
+
+
+def test_downsample_timeseries():
+    data = dict(
+        dates=[i * 1000 for i in range(1000)],
+        line1=[i % 10 for i in range(1000)],
+    )
+    res = downsample.downsample(data, 50, chart_type='timeseries')
+    assert len(res['dates']) == len(res['line1']) == 50
+    assert res['dates'][0] == 0
+    assert res['dates'] == sorted(res['dates'])
+
+
+def test_downsample_timeseries_string_dates():
+    data = dict(
+        dates=['2017-01-{:02d}'.format(i + 1) for i in range(30)],
+        line1=list(range(30)),
+    )
+    res = downsample.downsample(data, 10, chart_type='timeseries')
+    assert len(res['dates']) == 10
+    assert res['dates'][-1] == '2017-01-30'
+
+
+def test_downsample_unchanged():
+    data = dict(line1=[1, 2, 3])
+    assert downsample.downsample(data, 10) is data
+    assert downsample.downsample(dict(dates=[1]), 10) == dict(dates=[1])
+
+
+def test_downsample_mismatched_lengths():
+    with pytest.raises(ValueError):
+        downsample.downsample(dict(line1=[1, 2], line2=[1]), 1)
+
+
+def test_downsample_requires_numpy(monkeypatch):
+    monkeypatch.setattr(downsample, 'np', None)
+    with pytest.raises(ImportError):
+        downsample.downsample(dict(line1=[1, 2]), 1)
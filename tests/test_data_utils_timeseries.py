@@ -0,0 +1,41 @@
+import pytest
+
+from flask_jsondash.data_utils import timeseries
+
+
+@pytest.mark.parametrize('since, expected', [
+    ('2017-01-02', dict(dates=['2017-01-03'], line1=[3], line2=[30])),
+    ('2017-01-03', dict(dates=[], line1=[], line2=[])),
+    ('2016-12-31', dict(dates=['2017-01-01', '2017-01-02', '2017-01-03'],
+                        line1=[1, 2, 3], line2=[10, 20, 30])),
+])
+def test_get_delta_timeseries(since, expected):
+    data = dict(
+        dates=['2017-01-01', '2017-01-02', '2017-01-03'],
+        line1=[1, 2, 3],
+        line2=[10, 20, 30],
+    )
+    assert timeseries.get_delta(data, since) == expected
+
+
+def test_get_delta_timeseries_timestamps():
+    data = dict(dates=[900, 1000, 1100], line1=[1, 2, 3])
+    # Numbers are compared as numbers, not strings.
+    res = timeseries.get_delta(data, '950')
+    assert res == dict(dates=[1000, 1100], line1=[2, 3])
+
+
+@pytest.mark.parametrize('since, expected', [
+    ('2', dict(line1=[3], line2=[30])),
+    ('0', dict(line1=[1, 2, 3], line2=[10, 20, 30])),
+    ('-1', dict(line1=[1, 2, 3], line2=[10, 20, 30])),
+    ('5', dict(line1=[], line2=[])),
+])
+def test_get_delta_line(since, expected):
+    data = dict(line1=[1, 2, 3], line2=[10, 20, 30])
+    assert timeseries.get_delta(data, since, chart_type='line') == expected
+
+
+def test_get_delta_line_invalid():
+    with pytest.raises(ValueError):
+        timeseries.get_delta(dict(line1=[1]), 'foo', chart_type='line')
@@ -2,9 +2,13 @@ import json
 
 import pytest
 
+from flask import Flask
+
+from flask_jsondash import charts_builder
 from flask_jsondash import db
 from flask_jsondash import mongo_adapter
 from flask_jsondash import settings
+from flask_jsondash import utils
 
 
 def test_reformat_data():
@@ -50,3 +54,29 @@ def test_get_db_handler_invalid(monkeypatch):
     monkeypatch.setattr(db, 'DB_NAME', 'invaliddb')
     with pytest.raises(NotImplementedError):
         db.get_db_handler()
+
+
+@pytest.mark.parametrize('enabled, expected', [
+    (True, 1),
+    (False, 0),
+    (None, 0),
+])
+def test_ensure_indexes_on_register(monkeypatch, enabled, expected):
+    calls = []
+    monkeypatch.setattr(
+        utils.adapter, 'ensure_indexes', lambda: calls.append(1))
+    app = Flask('test_indexes')
+    # Only when opted in.
+    if enabled is not None:
+        app.config['JSONDASH_ENSURE_INDEXES'] = enabled
+    app.register_blueprint(charts_builder.charts)
+    assert len(calls) == expected
+
+
+def test_ensure_indexes_on_register_db_error(monkeypatch):
+    def ensure_indexes():
+        raise ValueError('No db!')
+    monkeypatch.setattr(utils.adapter, 'ensure_indexes', ensure_indexes)
+    app = Flask('test_indexes_error')
+    app.config['JSONDASH_ENSURE_INDEXES'] = True
+    app.register_blueprint(charts_builder.charts)
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+
+import pytest
+
+from flask_jsondash import export
+
+
+@pytest.fixture
+def exporter(tmpdir):
+    return export.Exporter(str(tmpdir.join('out')))
+
+
+def _read(exporter, name):
+    with open(os.path.join(exporter.path, *name.split('/')), 'rb') as f:
+        return f.read()
+
+
+def test_get_data_name():
+    name = export.get_data_name('abc')
+    assert name == 'data/{}.json'.format(
+        hashlib.sha256(b'abc').hexdigest())
+    # Guids are set by editors, so they can't change the path.
+    assert export.get_data_name('../../x-a-b-c-d').startswith('data/')
+    assert '..' not in export.get_data_name('../../x-a-b-c-d')
+
+
+@pytest.mark.parametrize('url,script_root,name', [
+    ('/jsondash/js/app.js', '', 'jsondash/js/app.js'),
+    ('/app/jsondash/js/app.js', '/app', 'jsondash/js/app.js'),
+    ('/static/font.woff?v=1#foo', '', 'static/font.woff'),
+])
+def test_get_asset_name(url, script_root, name):
+    assert export.get_asset_name(url, script_root) == name
+
+
+def test_export_view():
+    view = dict(id='1', proxy=True, modules=[
+        dict(guid='a', dataSource='http://a.com/a', refresh=True),
+        dict(guid='b', dataSource='http://a.com/b', refresh=True),
+    ])
+    exported = export.export_view(view, dict(a='data/a.json'))
+    assert exported['proxy'] is False
+    first, second = exported['modules']
+    assert first['dataSource'] == 'data/a.json'
+    assert first['refresh'] is False
+    # Modules without exported data are loaded live.
+    assert second['dataSource'] == 'http://a.com/b'
+    assert second['refresh'] is True
+    # The original is unchanged.
+    assert view['proxy'] is True
+    assert view['modules'][0]['dataSource'] == 'http://a.com/a'
+
+
+def test_exporter_write(exporter):
+    assert exporter.write('data/a.json', b'{"foo": 1}')
+    assert _read(exporter, 'data/a.json') == b'{"foo": 1}'
+    assert exporter.written == ['data/a.json']
+    assert exporter.has('data/a.json')
+    assert exporter.finish() == []
+    with open(os.path.join(exporter.path, export.MANIFEST)) as manifest:
+        assert list(json.load(manifest).keys()) == ['data/a.json']
+
+
+@pytest.mark.parametrize('name', ['../x.json', 'data/../../x.json'])
+def test_exporter_write_outside(exporter, name):
+    with pytest.raises(ValueError):
+        exporter.write(name, b'{}')
+    assert exporter.written == []
+
+
+def test_exporter_incremental(exporter):
+    exporter.write('data/a.json', b'{"foo": 1}')
+    exporter.write('data/b.json', b'{"foo": 2}')
+    exporter.write('data/c.json', b'{"foo": 3}')
+    exporter.finish()
+    mtime = os.path.getmtime(os.path.join(exporter.path, 'data', 'a.json'))
+    again = export.Exporter(exporter.path)
+    assert not again.write('data/a.json', b'{"foo": 1}')
+    assert again.write('data/b.json', b'{"foo": 20}')
+    assert again.finish() == ['data/c.json']
+    assert again.written == ['data/b.json']
+    assert again.unchanged == ['data/a.json']
+    assert os.path.getmtime(
+        os.path.join(exporter.path, 'data', 'a.json')) == mtime
+    assert _read(again, 'data/b.json') == b'{"foo": 20}'
+    assert not os.path.exists(os.path.join(exporter.path, 'data', 'c.json'))
+
+
+def test_exporter_rewrites_missing_files(exporter):
+    exporter.write('data/a.json', b'{"foo": 1}')
+    exporter.finish()
+    os.remove(os.path.join(exporter.path, 'data', 'a.json'))
+    again = export.Exporter(exporter.path)
+    assert again.write('data/a.json', b'{"foo": 1}')
+    assert _read(again, 'data/a.json') == b'{"foo": 1}'
+
+
+def test_exporter_invalid_manifest(exporter):
+    with open(os.path.join(exporter.path, export.MANIFEST), 'w') as f:
+        f.write('nope')
+    assert export.Exporter(exporter.path).manifest == dict()
+
+
+def test_export_assets(exporter, tmpdir):
+    static = tmpdir.mkdir('static')
+    static.mkdir('css').join('app.css').write(
+        'a{background: url("../img/bg.png?v=2")}'
+        'b{background: url(/app/static/img/bg.png)}'
+        'i{background: url(data:image/png;base64,AAA=)}')
+    static.mkdir('img').join('bg.png').write_binary(b'png')
+    static.mkdir('js').join('app.js').write('var a = 1;')
+
+    def get_path(url):
+        path = url.split('?')[0]
+        if not path.startswith('/app/static/'):
+            return None
+        path = str(static.join(path[len('/app/static/'):]))
+        return path if os.path.isfile(path) else None
+    html = ('<link rel="stylesheet" href="/app/static/css/app.css">'
+            '<script src="/app/static/js/app.js"></script>'
+            '<script src="//cdn.com/d3.js"></script>'
+            '<a href="/app/charts">Back</a>')
+    html = export.export_assets(
+        exporter, html, get_path, script_root='/app')
+    assert 'href="static/css/app.css"' in html
+    assert 'src="static/js/app.js"' in html
+    assert 'src="//cdn.com/d3.js"' in html
+    assert 'href="/app/charts"' in html
+    css = _read(exporter, 'static/css/app.css').decode('utf-8')
+    assert css.count('url("../img/bg.png?v=2")') == 1
+    assert css.count('url(../img/bg.png)') == 1
+    assert 'url(data:image/png;base64,AAA=)' in css
+    assert _read(exporter, 'static/img/bg.png') == b'png'
+    assert _read(exporter, 'static/js/app.js') == b'var a = 1;'
+    assert sorted(exporter.written) == [
+        'static/css/app.css', 'static/img/bg.png', 'static/js/app.js']
@@ -48,6 +48,23 @@ def test_validate_raw_json_valid_fixed():
     assert app.validate_raw_json(d)
 
 
+@pytest.mark.schema
+@pytest.mark.parametrize('guid', [
+    '../../x-a-b-c-d',
+    'a-b-c-d-e/../..',
+])
+def test_validate_raw_json_invalid_guid(guid):
+    d = _schema(
+        layout='freeform',
+        modules=[
+            dict(guid=guid, name='foo', dataSource='foo',
+                 width=1, height=1, type='line',
+                 family='C3')]
+    )
+    with pytest.raises(app.InvalidSchemaError):
+        app.validate_raw_json(d)
+
+
 @pytest.mark.schema
 @pytest.mark.parametrize('field', [
     'type',
@@ -142,3 +142,19 @@ def test_delete_all_cli(monkeypatch):
     result = runner.invoke(model_factories.insert_dashboards, args)
     assert 'Deleting all records!' in result.output
     assert result.exit_code == 0
+
+
+def test_backfill_cli(monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setattr(_db, 'backfill_summaries', lambda *a, **kw: 3)
+    result = runner.invoke(model_factories.insert_dashboards, ['--backfill'])
+    assert 'Backfilled summaries for 3 dashboard(s).' in result.output
+    assert result.exit_code == 0
+
+
+def test_indexes_cli(monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setattr(_db, 'ensure_indexes', lambda *a, **kw: ['id_1'])
+    result = runner.invoke(model_factories.insert_dashboards, ['--indexes'])
+    assert 'Ensured index: id_1' in result.output
+    assert result.exit_code == 0
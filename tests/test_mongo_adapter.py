@@ -4,6 +4,8 @@ from datetime import datetime
 
 from pymongo.cursor import Cursor as MongoCursor
 
+from flask_jsondash import cache, mongo_adapter
+
 
 def test_create(monkeypatch, adapter):
     monkeypatch.setattr(adapter.coll, 'insert', lambda *args, **kwargs: kwargs)
@@ -73,3 +75,178 @@ def test_delete_one(monkeypatch, adapter):
 def test_delete_all(monkeypatch, adapter):
     monkeypatch.setattr(adapter.coll, 'remove', lambda *args, **kwargs: kwargs)
     assert adapter.delete_all() is None
+
+
+def test_read_all_paginated(monkeypatch, adapter):
+    calls = []
+    monkeypatch.setattr(
+        adapter.coll, 'find', lambda *args, **kwargs: calls.append(kwargs))
+    adapter.read(filter=dict(created_by='foo'), skip=10, limit=5,
+                 sort=[('name', 1)])
+    assert calls[0] == dict(
+        filter=dict(created_by='foo'), skip=10, limit=5, sort=[('name', 1)])
+
+
+def test_count_filter(monkeypatch, adapter):
+    monkeypatch.setattr(adapter.coll, 'count', lambda *args, **kwargs: kwargs)
+    assert adapter.count(filter=dict(id='foo')) == dict(filter=dict(id='foo'))
+
+
+def test_summarize():
+    modules = [dict(family='C3'), dict(family='D3'), dict(family='C3')]
+    assert mongo_adapter.summarize(modules) == dict(
+        module_count=3, families=['C3', 'D3'])
+
+
+def test_summarize_empty():
+    assert mongo_adapter.summarize(None) == dict(
+        module_count=0, families=[])
+
+
+def test_create_adds_summary(monkeypatch, adapter):
+    records = []
+    monkeypatch.setattr(
+        adapter.coll, 'insert', lambda *args, **kwargs: records.append(args))
+    adapter.create(data=dict(modules=[dict(family='C3')]))
+    assert records[0][0]['module_count'] == 1
+    assert records[0][0]['families'] == ['C3']
+
+
+def test_update_adds_summary(monkeypatch, adapter):
+    records = []
+    monkeypatch.setattr(
+        adapter.coll, 'update', lambda *args, **kwargs: records.append(args))
+    data = dict(name='foo', modules=[dict(family='C3'), dict(family='D3')])
+    adapter.update('foo-id', data=data, fmt_charts=False)
+    assert records[0][1]['$set']['module_count'] == 2
+    assert records[0][1]['$set']['families'] == ['C3', 'D3']
+
+
+def test_read_summary(monkeypatch, adapter):
+    calls = []
+    monkeypatch.setattr(
+        adapter.coll, 'find', lambda *args, **kwargs: calls.append(kwargs))
+    adapter.read_summary(skip=5, limit=5)
+    assert calls[0]['projection'] == mongo_adapter.SUMMARY_PROJECTION
+    assert 'modules' not in calls[0]['projection']
+    assert calls[0]['skip'] == 5
+
+
+def test_backfill_summaries(monkeypatch, adapter):
+    updates = []
+    records = [dict(_id=1, modules=[dict(family='C3')]), dict(_id=2)]
+    monkeypatch.setattr(adapter.coll, 'find', lambda *args: records)
+    monkeypatch.setattr(
+        adapter.coll, 'update_one',
+        lambda *args, **kwargs: updates.append(args))
+    assert adapter.backfill_summaries() == 2
+    assert updates[0] == (
+        dict(_id=1), {'$set': dict(module_count=1, families=['C3'])})
+    assert updates[1][1]['$set']['module_count'] == 0
+
+
+def test_ensure_indexes(monkeypatch, adapter):
+    calls = []
+
+    def create_index(keys, **kwargs):
+        calls.append((keys, kwargs))
+        return '_'.join(k for k, _ in keys)
+    monkeypatch.setattr(adapter.coll, 'create_index', create_index)
+    names = adapter.ensure_indexes()
+    assert len(names) == len(mongo_adapter.INDEXES)
+    assert calls[0] == ([('id', 1)], dict(unique=True))
+    assert 'category_name' in names
+
+
+def test_read_one_cached(monkeypatch, adapter):
+    calls = []
+
+    def find_one(*args, **kwargs):
+        calls.append(args)
+        return dict(id='foo', date='d1', modules=[])
+    monkeypatch.setattr(adapter.coll, 'find_one', find_one)
+    adapter.cache = cache.LRUCache()
+    first = adapter.read(c_id='foo')
+    first['modules'].append('mutated')
+    second = adapter.read(c_id='foo')
+    assert len(calls) == 1
+    assert second['modules'] == []
+    assert adapter.cache.stats()['hits'] == 1
+
+
+def test_read_one_cached_missing(monkeypatch, adapter):
+    monkeypatch.setattr(adapter.coll, 'find_one', lambda *a, **kw: None)
+    adapter.cache = cache.LRUCache()
+    assert adapter.read(c_id='foo') is None
+    assert len(adapter.cache) == 0
+
+
+def test_read_one_cached_revalidate(monkeypatch, adapter):
+    calls = []
+    record = dict(id='foo', date='d1')
+
+    def find_one(*args, **kwargs):
+        calls.append(args)
+        return dict(record)
+    monkeypatch.setattr(adapter.coll, 'find_one', find_one)
+    adapter.cache = cache.LRUCache(revalidate=True)
+    adapter.read(c_id='foo')
+    assert adapter.read(c_id='foo')['date'] == 'd1'
+    # Only the date is fetched on a hit.
+    assert len(calls) == 3
+    # Another process updated the record.
+    record.update(date='d2')
+    assert adapter.read(c_id='foo')['date'] == 'd2'
+    assert adapter.cache.stats()['evictions'] == 1
+
+
+def test_writes_invalidate_cache(monkeypatch, adapter):
+    monkeypatch.setattr(adapter.coll, 'update', lambda *a, **kw: None)
+    monkeypatch.setattr(adapter.coll, 'delete_one', lambda *a, **kw: None)
+    monkeypatch.setattr(adapter.coll, 'remove', lambda *a, **kw: None)
+    adapter.cache = cache.LRUCache()
+    adapter.cache.set('foo', dict())
+    adapter.cache.set('bar', dict())
+    adapter.cache.set('baz', dict())
+    adapter.update('foo', data=dict(name='foo'))
+    assert adapter.cache.get('foo') is None
+    adapter.delete('bar')
+    assert adapter.cache.get('bar') is None
+    adapter.delete_all()
+    assert len(adapter.cache) == 0
+
+
+def test_read_version(monkeypatch, adapter):
+    calls = []
+    monkeypatch.setattr(
+        adapter.coll, 'find_one', lambda *args: calls.append(args))
+    adapter.read_version('foo')
+    assert calls[0] == (dict(id='foo'), mongo_adapter.VERSION_PROJECTION)
+
+
+def test_read_version_cached(monkeypatch, adapter):
+    calls = []
+
+    def find_one(*args, **kwargs):
+        calls.append(args)
+        return dict(_id=1, id='foo', date='d1', created_by='bar',
+                    modules=[])
+    monkeypatch.setattr(adapter.coll, 'find_one', find_one)
+    adapter.cache = cache.LRUCache()
+    adapter.read(c_id='foo')
+    assert adapter.read_version('foo') == dict(
+        id='foo', date='d1', created_by='bar')
+    assert len(calls) == 1
+    # Not cached yet.
+    adapter.read_version('bar')
+    assert len(calls) == 2
+
+
+def test_read_version_cached_revalidate(monkeypatch, adapter):
+    calls = []
+    monkeypatch.setattr(
+        adapter.coll, 'find_one', lambda *args: calls.append(args))
+    adapter.cache = cache.LRUCache(revalidate=True)
+    adapter.cache.set('foo', dict(id='foo', date='d1'))
+    adapter.read_version('foo')
+    assert calls[0] == (dict(id='foo'), mongo_adapter.VERSION_PROJECTION)
@@ -90,3 +90,35 @@ def test_create_dashboards_check_paginator_html(monkeypatch, ctx, client):
     dom = pq(res.data)
     assert dom.find(
         '.paginator-status').text() == 'Showing 75-100 of 100 results'
+
+
+def test_paginator_query_count(monkeypatch, client):
+    app, test = client
+    queries = []
+
+    def count(*args, **kwargs):
+        queries.append(kwargs.get('filter'))
+        return 10
+    monkeypatch.setattr(utils.adapter, 'count', count)
+    paginator = utils.paginator(page=0, per_page=5, query=dict(foo='bar'))
+    assert queries == [dict(foo='bar')]
+    assert paginator.count == 10
+
+
+def test_dashboard_reads_only_current_page(monkeypatch, ctx, client):
+    app, test = client
+    monkeypatch.setattr(charts_builder, 'auth', auth_valid)
+    for i in range(30):
+        test.post(url_for('jsondash.create'), data=dict(name=i))
+    reads = []
+
+    def _read(**kwargs):
+        reads.append(kwargs)
+        return read(**kwargs)
+    monkeypatch.setattr(utils.adapter, 'read_summary', _read)
+    res = test.get(url_for('jsondash.dashboard') + '?page=2&per_page=10')
+    dom = pq(res.data)
+    assert reads[0]['skip'] == 10
+    assert reads[0]['limit'] == 10
+    assert reads[0]['sort'] == charts_builder.INDEX_SORT
+    assert len(dom.find('.chart-list-item')) == 10
@@ -0,0 +1,294 @@
+import logging
+import time
+from datetime import datetime as dt
+
+import pytest
+import requests
+from click.testing import CliRunner
+from flask import Flask
+
+from flask_jsondash import charts_builder
+from flask_jsondash import data_proxy
+from flask_jsondash import prewarm
+
+
+class FakeAdapter(object):
+
+    def __init__(self, dashboards):
+        self.dashboards = dashboards
+        self.filters = []
+
+    def read(self, c_id=None, filter=None):
+        if c_id is not None:
+            return next((d for d in self.dashboards if d['id'] == c_id), None)
+        self.filters.append(filter)
+        cats = filter['category']['$in']
+        return [d for d in self.dashboards if d.get('category') in cats]
+
+
+DASHBOARDS = [
+    dict(id='a', category='sales', modules=[
+        dict(guid='1', name='one', family='C3',
+             dataSource='http://a.com/data'),
+        dict(guid='2', name='two', family='C3',
+             dataSource='http://a.com/data'),
+        dict(guid='3', name='html', family='Basic',
+             dataSource='http://a.com/page'),
+    ]),
+    dict(id='b', category='sales', modules=[
+        dict(guid='4', name='four', family='C3', dataSource='/local'),
+    ]),
+    dict(id='c', category='ops', modules=[
+        dict(guid='5', name='five', family='C3',
+             dataSource='http://c.com/data', refresh=True,
+             refreshInterval=5000),
+    ]),
+]
+
+
+@pytest.fixture
+def proxy():
+    return data_proxy.DataProxy(ttl=60)
+
+
+@pytest.mark.parametrize('ids, categories, expected', [
+    (['a'], None, ['a']),
+    (['c', 'x'], None, ['c']),
+    (None, ['sales'], ['a', 'b']),
+    (['b'], ['sales', 'ops'], ['b', 'a', 'c']),
+    (None, None, []),
+])
+def test_get_dashboards(ids, categories, expected):
+    adapter = FakeAdapter(DASHBOARDS)
+    res = prewarm.get_dashboards(adapter, ids=ids, categories=categories)
+    assert [d['id'] for d in res] == expected
+
+
+def test_get_modules():
+    modules = prewarm.get_modules(DASHBOARDS, url_root='http://app.com/')
+    assert [(c_id, module['guid'], url) for c_id, module, url in modules] == [
+        ('a', '1', 'http://a.com/data'),
+        ('a', '2', 'http://a.com/data'),
+        ('b', '4', 'http://app.com/local'),
+        ('c', '5', 'http://c.com/data'),
+    ]
+
+
+def test_prewarm(proxy, requests_mock):
+    a = requests_mock.get('http://a.com/data', json=dict(foo=1))
+    requests_mock.get('http://app.com/local', status_code=404)
+    requests_mock.get('http://c.com/data', exc=requests.ConnectTimeout)
+    results = prewarm.prewarm(
+        proxy, DASHBOARDS, workers=2, url_root='http://app.com/')
+    results = dict((res.guid, res) for res in results)
+    assert sorted(results) == ['1', '2', '4', '5']
+    # Shared urls are fetched once.
+    assert a.call_count == 1
+    assert results['1'].status == 200
+    assert results['1'].size == len(b'{"foo": 1}')
+    assert results['1'].latency >= 0
+    assert results['2'].size == results['1'].size
+    assert results['4'].status == 404
+    assert results['5'].status is None
+    assert results['5'].error
+    # The responses are cached for dashboards to use.
+    assert proxy.fetch('http://a.com/data').status == 200
+    assert a.call_count == 1
+
+
+def test_prewarm_bypasses_cache(proxy, requests_mock):
+    mocked = requests_mock.get('http://a.com/data', json=dict(foo=1))
+    proxy.fetch('http://a.com/data')
+    prewarm.prewarm(proxy, DASHBOARDS[:1])
+    assert mocked.call_count == 2
+
+
+def test_prewarm_ttl(proxy, requests_mock):
+    requests_mock.get('http://a.com/data', json=dict(foo=1))
+    requests_mock.get('http://c.com/data', json=dict(foo=1))
+    prewarm.prewarm(proxy, [DASHBOARDS[0], DASHBOARDS[2]])
+    # Cached for the usual ttl, so dashboards still get current data.
+    assert proxy.cache._entries['http://a.com/data'][2] == pytest.approx(
+        time.time() + 60, abs=5)
+    assert proxy.cache._entries['http://c.com/data'][2] == pytest.approx(
+        time.time() + 5, abs=5)
+
+
+def test_report():
+    results = [
+        prewarm.Result('a', '1', 'one', 'http://a.com/data', 200, 0.25, 10,
+                       None),
+        prewarm.Result('a', '2', None, 'http://a.com/data', 200, 0.25, 10,
+                       None),
+        prewarm.Result('b', '4', 'four', 'http://b.com/data', None, 1.5, None,
+                       'timed out'),
+    ]
+    lines = prewarm.report(results).splitlines()
+    assert len(lines) == 5
+    # Slowest first.
+    assert lines[1].split() == [
+        '1500', '-', 'error', 'b', '/', 'four', '(http://b.com/data):',
+        'timed', 'out']
+    assert lines[3].split()[:3] == ['250', '10', '200']
+    assert '/ 2 (' in lines[3]
+    assert lines[-1] == '3 module(s), 2 url(s), 1 failed, 20 bytes.'
+
+
+@pytest.mark.parametrize('now, expected', [
+    (dt(2017, 1, 1, 6, 0), dt(2017, 1, 1, 7, 30)),
+    (dt(2017, 1, 1, 7, 30), dt(2017, 1, 1, 12, 0)),
+    (dt(2017, 1, 1, 13, 0), dt(2017, 1, 2, 7, 30)),
+])
+def test_get_next_run(now, expected):
+    times = [prewarm.parse_time('12:00'), prewarm.parse_time('07:30')]
+    assert prewarm.get_next_run(times, now) == expected
+
+
+def test_scheduler_run(proxy, requests_mock, caplog):
+    requests_mock.get('http://a.com/data', json=dict(foo=1))
+    requests_mock.get('http://app.com/local', json=dict(foo=1))
+    warmer = prewarm.PrewarmScheduler(
+        proxy, FakeAdapter(DASHBOARDS), ['07:30'], 'http://app.com/',
+        categories=['sales'], logger=logging.getLogger('prewarm'))
+    with caplog.at_level(logging.INFO):
+        results = warmer.run()
+    assert [res.guid for res in results] == ['1', '2', '4']
+    assert warmer.last_results == results
+    assert 'app.com/local' in caplog.text
+    assert proxy.fetch('http://app.com/local').status == 200
+
+
+@pytest.mark.parametrize('now, expected', [
+    # Before the run time.
+    (dt(2017, 1, 1, 6, 0), dt(2017, 1, 1, 7, 30)),
+    # Re-warmed just before the data expires, until the end time.
+    (dt(2017, 1, 1, 7, 30), dt(2017, 1, 1, 7, 30, 54)),
+    (dt(2017, 1, 1, 17, 59, 30), dt(2017, 1, 1, 18, 0, 24)),
+    (dt(2017, 1, 1, 18, 0), dt(2017, 1, 2, 7, 30)),
+])
+def test_scheduler_get_next_run(proxy, now, expected):
+    warmer = prewarm.PrewarmScheduler(
+        proxy, FakeAdapter([]), ['07:30'], 'http://app.com/', until='18:00')
+    assert warmer.get_next_run(now) == expected
+
+
+def test_scheduler_get_next_run_overnight(proxy):
+    warmer = prewarm.PrewarmScheduler(
+        proxy, FakeAdapter([]), ['22:00'], 'http://app.com/', until='02:00')
+    assert warmer.get_next_run(dt(2017, 1, 2, 1, 0)) == dt(
+        2017, 1, 2, 1, 0, 54)
+    assert warmer.get_next_run(dt(2017, 1, 2, 3, 0)) == dt(2017, 1, 2, 22, 0)
+
+
+def test_scheduler_get_next_run_once(proxy):
+    warmer = prewarm.PrewarmScheduler(
+        proxy, FakeAdapter([]), ['07:30'], 'http://app.com/')
+    assert warmer.get_next_run(dt(2017, 1, 1, 7, 30)) == dt(2017, 1, 2, 7, 30)
+    # Data that never expires isn't re-warmed.
+    warmer = prewarm.PrewarmScheduler(
+        data_proxy.DataProxy(ttl=None), FakeAdapter([]), ['07:30'],
+        'http://app.com/', until='18:00')
+    assert warmer.get_next_run(dt(2017, 1, 1, 7, 30)) == dt(2017, 1, 2, 7, 30)
+
+
+@pytest.mark.parametrize('times, until, url_root', [
+    (['7.30am'], '18:00', 'http://app.com/'),
+    (['07:30'], '6pm', 'http://app.com/'),
+    (['07:30'], '18:00', None),
+])
+def test_scheduler_invalid(proxy, times, until, url_root):
+    with pytest.raises(ValueError):
+        prewarm.PrewarmScheduler(
+            proxy, FakeAdapter([]), times, url_root, until=until)
+
+
+def test_scheduler_lock(proxy, tmpdir):
+    assert prewarm.PrewarmScheduler(
+        proxy, FakeAdapter([]), ['07:30'], 'http://app.com/').lock is None
+    # Only one process warms a shared cache.
+    first, second = [prewarm.PrewarmScheduler(
+        data_proxy.DataProxy(cache_dir=str(tmpdir)), FakeAdapter([]),
+        ['07:30'], 'http://app.com/') for _ in range(2)]
+    assert first.lock == str(tmpdir.join('prewarm.lock'))
+    assert first.acquire_lock()
+    assert first.acquire_lock()
+    assert not second.acquire_lock()
+    first.stop()
+    assert second.acquire_lock()
+    second.release_lock()
+
+
+def test_setup_prewarm(monkeypatch):
+    started = []
+    monkeypatch.setattr(prewarm.PrewarmScheduler, 'start',
+                        lambda self: started.append(self))
+    app = Flask('test_prewarm')
+    app.config['JSONDASH_ENSURE_INDEXES'] = False
+    app.config['JSONDASH'] = dict(
+        prewarm=dict(times=['07:30'], categories=['sales']))
+    with pytest.raises(ValueError):
+        app.register_blueprint(charts_builder.charts)
+    app = Flask('test_prewarm')
+    app.config['JSONDASH_ENSURE_INDEXES'] = False
+    app.config['JSONDASH'] = dict(
+        data_proxy=dict(allowed_hosts=['*']), prewarm=dict(
+            times=['07:30'], until='18:00', categories=['sales']))
+    # The url root is required, to fetch relative dataSources.
+    with pytest.raises(ValueError):
+        app.register_blueprint(charts_builder.charts)
+    app = Flask('test_prewarm')
+    app.config['JSONDASH_ENSURE_INDEXES'] = False
+    app.config['SERVER_NAME'] = 'app.com'
+    app.config['JSONDASH'] = dict(
+        data_proxy=dict(allowed_hosts=['*']), prewarm=dict(
+            times=['07:30'], until='18:00', categories=['sales']))
+    app.register_blueprint(charts_builder.charts)
+    warmer = app.extensions['jsondash_prewarm']
+    assert warmer.categories == ['sales']
+    assert warmer.proxy is app.extensions['jsondash_data_proxy']
+    assert warmer.url_root == 'http://app.com/'
+    # Started on the first request, e.g. after forking workers.
+    assert started == []
+    app.test_client().get('/charts/nope')
+    assert started == [warmer]
+
+
+@pytest.mark.parametrize('config, expected', [
+    (dict(), None),
+    (dict(SERVER_NAME='app.com'), 'http://app.com/'),
+    (dict(SERVER_NAME='app.com:8080', PREFERRED_URL_SCHEME='https',
+          APPLICATION_ROOT='/dash/'), 'https://app.com:8080/dash/'),
+])
+def test_get_url_root(config, expected):
+    app = Flask('test_prewarm')
+    app.config.update(config)
+    assert charts_builder.get_url_root(app) == expected
+
+
+def test_cli_requires_dashboards():
+    res = CliRunner().invoke(prewarm.prewarm_dashboards, [])
+    assert res.exit_code != 0
+    assert '--dashboard or --category' in res.output
+
+
+def test_cli(monkeypatch, requests_mock):
+    requests_mock.get('http://a.com/data', json=dict(foo=1))
+    monkeypatch.setattr(prewarm.db, 'get_db_handler',
+                        lambda: FakeAdapter(DASHBOARDS))
+    res = CliRunner().invoke(
+        prewarm.prewarm_dashboards, ['--dashboard', 'a', '--workers', 2])
+    assert res.exit_code == 0
+    assert '2 module(s), 1 url(s), 0 failed, 20 bytes.' in res.output
+
+
+def test_cli_cache_dir(monkeypatch, requests_mock, tmpdir):
+    mocked = requests_mock.get('http://a.com/data', json=dict(foo=1))
+    monkeypatch.setattr(prewarm.db, 'get_db_handler',
+                        lambda: FakeAdapter(DASHBOARDS))
+    res = CliRunner().invoke(prewarm.prewarm_dashboards, [
+        '--dashboard', 'a', '--cache-dir', str(tmpdir)])
+    assert res.exit_code == 0
+    # The app's proxy uses the data, from the shared cache.
+    proxy = data_proxy.DataProxy(cache_dir=str(tmpdir))
+    assert proxy.fetch('http://a.com/data').content == b'{"foo": 1}'
+    assert mocked.call_count == 1
@@ -0,0 +1,126 @@
+import time
+
+import pytest
+import requests
+from flask import Flask
+
+from flask_jsondash import charts_builder
+from flask_jsondash import data_proxy
+from flask_jsondash import scheduler
+
+URL = 'http://a.com/data'
+
+
+@pytest.fixture
+def refresher():
+    refresher = scheduler.RefreshScheduler(data_proxy.DataProxy())
+    # Don't let the background thread run anything during tests.
+    refresher.start = lambda: None
+    return refresher
+
+
+def run_pending(refresher, seconds=1000):
+    for future in refresher.run_pending(now=time.time() + seconds):
+        future.result()
+
+
+def test_subscription_get_timeout():
+    sub = scheduler.Subscription({URL: 1})
+    assert sub.get(timeout=0.01) is None
+    sub.put((URL, None, None))
+    assert sub.get(timeout=0.01) == (URL, None, None)
+
+
+def test_subscribe_min_interval(refresher):
+    refresher.min_interval = 5
+    sub = refresher.subscribe({URL: 1})
+    assert sub.intervals == {URL: 5}
+
+
+def test_refresh_shared_by_subscribers(refresher, requests_mock):
+    mocked = requests_mock.get(URL, json=dict(foo=1))
+    subs = [refresher.subscribe({URL: 10}) for _ in range(3)]
+    run_pending(refresher)
+    assert mocked.call_count == 1
+    for sub in subs:
+        url, payload, error = sub.get(timeout=1)
+        assert url == URL
+        assert payload.content == b'{"foo": 1}'
+        assert error is None
+    # The proxy cache is updated too.
+    assert refresher.proxy.cache.get(URL).content == b'{"foo": 1}'
+
+
+def test_refresh_not_due(refresher, requests_mock):
+    mocked = requests_mock.get(URL, json=dict(foo=1))
+    refresher.subscribe({URL: 10})
+    assert refresher.run_pending() == []
+    run_pending(refresher, seconds=5)
+    assert mocked.call_count == 0
+
+
+def test_refresh_only_sends_changes(refresher, requests_mock):
+    requests_mock.get(URL, json=dict(foo=1))
+    refresher.proxy.fetch(URL)
+    sub = refresher.subscribe({URL: 10})
+    run_pending(refresher)
+    # Same as the data the subscriber already has.
+    assert sub.get(timeout=0.01) is None
+    requests_mock.get(URL, json=dict(foo=2))
+    run_pending(refresher, seconds=2000)
+    assert sub.get(timeout=1)[1].content == b'{"foo": 2}'
+
+
+def test_refresh_error(refresher, requests_mock):
+    requests_mock.get(URL, exc=requests.ConnectionError)
+    sub = refresher.subscribe({URL: 10})
+    run_pending(refresher)
+    url, payload, error = sub.get(timeout=1)
+    assert payload is None
+    assert isinstance(error, requests.ConnectionError)
+
+
+def test_unsubscribe(refresher, requests_mock):
+    mocked = requests_mock.get(URL, json=dict(foo=1))
+    first = refresher.subscribe({URL: 10})
+    second = refresher.subscribe({URL: 5})
+    assert refresher._jobs[URL].interval == 5
+    refresher.unsubscribe(second)
+    assert refresher._jobs[URL].interval == 10
+    refresher.unsubscribe(first)
+    refresher.unsubscribe(first)
+    assert refresher._jobs == {}
+    run_pending(refresher)
+    assert mocked.call_count == 0
+
+
+def test_background_thread(requests_mock):
+    requests_mock.get(URL, json=dict(foo=1))
+    refresher = scheduler.RefreshScheduler(
+        data_proxy.DataProxy(), min_interval=0.01)
+    sub = refresher.subscribe({URL: 0.01})
+    assert sub.get(timeout=5)[1].content == b'{"foo": 1}'
+    refresher.unsubscribe(sub)
+
+
+def test_setup_from_config():
+    app = Flask('test_scheduler')
+    app.config.update(
+        JSONDASH_ENSURE_INDEXES=False,
+        JSONDASH=dict(data_proxy=dict(allowed_hosts=['*']),
+                      push=dict(keepalive=5)),
+    )
+    app.register_blueprint(charts_builder.charts)
+    refresher = app.extensions['jsondash_scheduler']
+    assert refresher.proxy is app.extensions['jsondash_data_proxy']
+    assert refresher.keepalive == 5
+
+
+def test_setup_requires_proxy():
+    app = Flask('test_scheduler_noproxy')
+    app.config.update(
+        JSONDASH_ENSURE_INDEXES=False,
+        JSONDASH=dict(push=dict()),
+    )
+    with pytest.raises(ValueError):
+        app.register_blueprint(charts_builder.charts)
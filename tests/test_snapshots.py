@@ -0,0 +1,77 @@
+import json
+import os
+
+import pytest
+
+from flask_jsondash import snapshots
+
+
+@pytest.fixture
+def store(tmpdir):
+    return snapshots.SnapshotStore(str(tmpdir.join('snapshots')))
+
+
+def test_put_get(store):
+    digest = store.put(b'{"foo": 1}')
+    assert len(digest) == 64
+    assert store.get(digest) == b'{"foo": 1}'
+    # Payloads are stored compressed, under their digest.
+    path = store.get_path(digest)
+    assert path.startswith(os.path.join(store.path, digest[:2]))
+    assert os.path.getsize(path) > 0
+
+
+def test_put_dedupes(store):
+    first = store.put(b'{"foo": 1}')
+    mtime = os.path.getmtime(store.get_path(first))
+    assert store.put(b'{"foo": 1}') == first
+    assert os.path.getmtime(store.get_path(first)) == mtime
+    assert store.put(b'{"foo": 2}') != first
+
+
+def test_compressed(store):
+    content = json.dumps(dict(line1=[1] * 10000)).encode('utf-8')
+    digest = store.put(content)
+    assert os.path.getsize(store.get_path(digest)) < len(content) / 10
+
+
+@pytest.mark.parametrize('digest', [
+    None, '', '../../etc/passwd', 'a' * 63, 'A' * 64,
+])
+def test_invalid_digest(store, digest):
+    with pytest.raises(ValueError):
+        store.get_path(digest)
+    assert store.get(digest) is None
+
+
+def test_get_missing(store):
+    assert store.get('a' * 64) is None
+
+
+def test_get_inline_data(store):
+    snapshot = dict(data=dict(
+        a=store.put(b'{"foo": [1, 2]}'),
+        b=store.put(b'["</script><script>alert(1)</script>"]'),
+        c='b' * 64,
+    ))
+    inlined = store.get_inline_data(snapshot)
+    assert '</script>' not in inlined
+    assert json.loads(inlined) == dict(
+        a=dict(foo=[1, 2]), b=['</script><script>alert(1)</script>'])
+    # Snapshots don't change, so they are only read once.
+    os.remove(store.get_path(snapshot['data']['a']))
+    assert store.get_inline_data(snapshot) == inlined
+
+
+def test_get_inline_data_empty(store):
+    assert store.get_inline_data(dict()) == '{}'
+
+
+@pytest.mark.parametrize('content, expected', [
+    (b'{"foo": 1}', True),
+    (b'[1, 2]', True),
+    (b'<html></html>', False),
+    (b'\xff\xfe', False),
+])
+def test_is_json(content, expected):
+    assert snapshots.is_json(content) == expected
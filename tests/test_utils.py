@@ -1,4 +1,5 @@
 from random import shuffle
+import time
 
 import pytest
 
@@ -151,3 +152,77 @@ def test_get_active_assets_ensure_deps_loaded_first():
     assert active_res['js'][0].endswith('d3.min.js')
     # c3 depends on d3.
     assert active_res['js'][1].endswith('c3.min.js')
+
+
+def test_category_registry_loads_once(monkeypatch):
+    calls = []
+
+    def distinct(key):
+        calls.append(key)
+        return ['foo', 'bar', None, 'uncategorized']
+    monkeypatch.setattr(utils.adapter, 'distinct', distinct)
+    registry = utils.CategoryRegistry()
+    assert registry.get() == frozenset(['foo', 'bar'])
+    assert registry.get() == frozenset(['foo', 'bar'])
+    assert calls == ['category']
+
+
+def test_category_registry_add_and_invalidate(monkeypatch):
+    calls = []
+
+    def distinct(key):
+        calls.append(key)
+        return ['foo']
+    monkeypatch.setattr(utils.adapter, 'distinct', distinct)
+    registry = utils.CategoryRegistry()
+    # Adding before loading does nothing; the db is the source of truth.
+    registry.add('bar')
+    assert registry.get() == frozenset(['foo'])
+    registry.add('bar')
+    registry.add('uncategorized')
+    assert registry.get() == frozenset(['foo', 'bar'])
+    assert len(calls) == 1
+    registry.invalidate()
+    assert registry.get() == frozenset(['foo'])
+    assert len(calls) == 2
+
+
+def test_category_registry_expires(monkeypatch):
+    results = [['foo'], ['foo', 'bar']]
+    monkeypatch.setattr(utils.adapter, 'distinct',
+                        lambda key: results.pop(0))
+    registry = utils.CategoryRegistry(ttl=60)
+    now = time.time()
+    assert registry.get() == frozenset(['foo'])
+    # Added by another process.
+    monkeypatch.setattr(utils.time, 'time', lambda: now + 30)
+    assert registry.get() == frozenset(['foo'])
+    monkeypatch.setattr(utils.time, 'time', lambda: now + 61)
+    assert registry.get() == frozenset(['foo', 'bar'])
+
+
+def test_get_view_etag():
+    version = dict(id='foo', date='2017-01-01', created_by='bar')
+    etag = utils.get_view_etag(version, True, False)
+    assert etag == utils.get_view_etag(dict(version), True, False)
+    assert etag != utils.get_view_etag(version, False, False)
+    assert etag != utils.get_view_etag(
+        dict(version, date='2017-01-02'), True, False)
+
+
+def test_get_files_version(tmpdir):
+    folder = tmpdir.mkdir('static')
+    folder.join('app.js').write('var a = 1;')
+    version = utils.get_files_version(str(folder), None, '/nothing/here')
+    assert version == utils.get_files_version(str(folder))
+    folder.join('app.js').write('var a = 12;')
+    assert utils.get_files_version(str(folder)) != version
+    changed = utils.get_files_version(str(folder))
+    folder.mkdir('css').join('app.css').write('')
+    assert utils.get_files_version(str(folder)) != changed
+    # Only the content matters, not where or when it was written.
+    other = tmpdir.mkdir('other')
+    folder.copy(other)
+    other.join('app.js').setmtime(0)
+    assert utils.get_files_version(str(other)) == utils.get_files_version(
+        str(folder))